@@ -1 +1 @@
-__all__ = ["read"]
+__all__ = ["read", "binary", "ingest", "augment"]
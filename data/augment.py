@@ -0,0 +1,135 @@
+"""Lazy glyph augmentation.
+
+Randomised variants (shifts, small rotations, pixel noise) of the
+inputs of (input, expected) samples are generated per epoch by
+background worker threads or processes instead of being stored.
+Pixels are the flat row-major 0/1 sequences of read.readd."""
+
+import collections, math, random
+from concurrent import futures
+
+__all__ = ["shift", "rotate", "noise", "Augmenter", "Augmented"]
+
+
+def shift(pixels, width, dx, dy, fill=0):
+    """Pixels moved right by dx and down by dy columns/rows,
+    uncovered pixels are set to fill."""
+
+    height = len(pixels) // width
+    result = [fill] * len(pixels)
+    for y in range(max(0, dy), min(height, height + dy)):
+        for x in range(max(0, dx), min(width, width + dx)):
+            result[y*width + x] = pixels[(y - dy)*width + x - dx]
+    return result
+
+def rotate(pixels, width, degrees, fill=0):
+    """Pixels rotated clockwise by degrees around the center
+    (nearest neighbour), pixels from outside are set to fill."""
+
+    height = len(pixels) // width
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    a = math.radians(degrees)
+    cos, sin = math.cos(a), math.sin(a)
+    result = [fill] * len(pixels)
+    for y in range(height):
+        for x in range(width):
+            # the source of the target pixel: the inverse rotation
+            sx = round(cx + (x - cx)*cos + (y - cy)*sin)
+            sy = round(cy - (x - cx)*sin + (y - cy)*cos)
+            if 0 <= sx < width and 0 <= sy < height:
+                result[y*width + x] = pixels[sy*width + sx]
+    return result
+
+def noise(pixels, p, random=random):
+    """Pixels flipped (0 to 1 and back) with probability p each."""
+
+    return [1 - v if random.random() < p else v for v in pixels]
+
+
+class Augmenter(object):
+    """Random glyph transformation: a shift by up to shift pixels in
+    each direction, a rotation by up to degrees in each direction and
+    pixel noise with probability noise, each applied only if not 0."""
+
+    def __init__(self, width, shift=1, degrees=10.0, noise=0.02, fill=0):
+        self.width = width
+        self.shift = shift
+        self.degrees = degrees
+        self.noise = noise
+        self.fill = fill
+
+    def __call__(self, pixels, random):
+        """Variant of pixels drawn from random (a random.Random)."""
+
+        if self.degrees:
+            pixels = rotate(pixels, self.width,
+                            random.uniform(-self.degrees, self.degrees),
+                            self.fill)
+        if self.shift:
+            pixels = shift(pixels, self.width,
+                           random.randint(-self.shift, self.shift),
+                           random.randint(-self.shift, self.shift),
+                           self.fill)
+        if self.noise:
+            pixels = noise(pixels, self.noise, random)
+        return pixels
+
+
+def _augment(augment, seed, epoch, start, samples):
+    variants = []
+    for i, sample in enumerate(samples, start):
+        r = random.Random("%r/%d/%d" % (seed, epoch, i))
+        variants.append((augment(sample[0], r),) + tuple(sample[1:]))
+    return variants
+
+
+class Augmented(object):
+    """Re-iterable dataset of augmented variants of the samples: each
+    iteration (epoch) yields a new variant of every sample in the
+    original order. Variants are generated in chunks of chunkSize
+    samples by workers threads (or processes, if processes is True),
+    at most queueSize chunks are generated ahead of the consumer.
+    Variants depend only on seed, the epoch and the sample index, seed
+    is drawn from random.SystemRandom if None (see the seed attribute).
+    Instances must be closed to release the workers, e.g.
+        with Augmented(dataset, Augmenter(9), seed=1) as augmented:
+            trainer.supervised(algo, augmented, LR, M, epoches)"""
+
+    def __init__(self, dataset, augment, workers=2, processes=False,
+                 chunkSize=64, queueSize=4, seed=None):
+        self.dataset = list(dataset)
+        self.augment = augment
+        self.chunkSize = chunkSize
+        self.queueSize = queueSize
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self.epoch = 0
+        executor = processes and futures.ProcessPoolExecutor or \
+                   futures.ThreadPoolExecutor
+        self._executor = executor(workers)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __iter__(self):
+        epoch = self.epoch
+        self.epoch += 1
+        pending = collections.deque()
+        for start in range(0, len(self.dataset), self.chunkSize):
+            if len(pending) >= self.queueSize:
+                yield from pending.popleft().result()
+            pending.append(self._executor.submit(
+                _augment, self.augment, self.seed, epoch, start,
+                self.dataset[start:start + self.chunkSize]))
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
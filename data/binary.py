@@ -0,0 +1,72 @@
+"""Binary glyph format.
+
+Each record is stored as:
+    - label length, unsigned 2 bytes;
+    - label, utf-8;
+    - number of pixels, unsigned 4 bytes;
+    - pixels packed 8 per byte, the most significant bit first.
+Integers are little-endian. Pixels must be 0 or 1, as produced
+by read.readd."""
+
+import struct
+
+__all__ = ["write", "read", "iread"]
+
+_HEADER = struct.Struct("<H")
+_COUNT = struct.Struct("<I")
+
+
+def pack(pixels):
+    """Packs 0/1 pixels into bytes."""
+
+    packed = bytearray((len(pixels) + 7) // 8)
+    for i, p in enumerate(pixels):
+        if p not in (0, 1):
+            raise ValueError("Binary pixel expected, got %r" % p)
+        if p:
+            packed[i >> 3] |= 0x80 >> (i & 7)
+    return bytes(packed)
+
+def unpack(packed, count):
+    """Unpacks count pixels from bytes."""
+
+    return [(packed[i >> 3] >> (7 - (i & 7))) & 1 for i in range(count)]
+
+def write(records, fp):
+    """Writes (value, pixels) records to the binary file-like fp.
+    Returns the number of written records."""
+
+    n = 0
+    for value, pixels in records:
+        label = str(value).encode("utf-8")
+        fp.write(_HEADER.pack(len(label)))
+        fp.write(label)
+        fp.write(_COUNT.pack(len(pixels)))
+        fp.write(pack(pixels))
+        n += 1
+    return n
+
+def _readn(fp, n):
+    data = fp.read(n)
+    if len(data) != n:
+        raise ValueError("Truncated record, %d bytes expected, got %d" %
+                         (n, len(data)))
+    return data
+
+def iread(fp):
+    """Lazily reads (value, pixels) records from the binary
+    file-like fp."""
+
+    while True:
+        header = fp.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) != _HEADER.size:
+            raise ValueError("Truncated record header")
+        label = _readn(fp, _HEADER.unpack(header)[0]).decode("utf-8")
+        count = _COUNT.unpack(_readn(fp, _COUNT.size))[0]
+        yield label, unpack(_readn(fp, (count + 7) // 8), count)
+
+def read(filename):
+    with open(filename, 'rb') as f:
+        return list(iread(f))
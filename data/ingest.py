@@ -0,0 +1,90 @@
+"""Parallel ingestion of glyph data shards.
+
+Shard files (in the text format of read) are parsed concurrently by a
+pool of worker processes and merged in the sorted order of the file
+names, so the result does not depend on the number of workers. Labels
+are counted in the same pass."""
+
+import collections, glob, io, itertools, os
+from concurrent import futures
+
+from . import read, binary
+
+__all__ = ["shards", "ingest", "Ingested"]
+
+
+def shards(pattern):
+    """Sorted file names of a directory (all files in it) or
+    a glob pattern."""
+
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+    return sorted(f for f in glob.glob(pattern) if os.path.isfile(f))
+
+
+class Ingested(object):
+    """Result of ingestion:
+        - records: (value, pixels) records, None if written out;
+        - labels: record counts by value, sorted by value;
+        - files: number of shard files;
+        - count: number of records."""
+
+    def __init__(self, records, labels, files):
+        self.records = records
+        self.labels = dict(sorted(labels.items()))
+        self.files = files
+        self.count = sum(labels.values())
+
+    def index(self):
+        """Label dictionary: value to index in the sorted values."""
+
+        return {v: i for i, v in enumerate(self.labels)}
+
+    def __repr__(self):
+        return "%d records of %d labels from %d files" % \
+               (self.count, len(self.labels), self.files)
+
+
+def _parse(filename, packed):
+    """Parses the shard, returns (records, label counts), records are
+    in the binary format if packed."""
+
+    records = read.read(filename)
+    labels = collections.Counter(v for v, _ in records)
+    if packed:
+        out = io.BytesIO()
+        binary.write(records, out)
+        records = out.getvalue()
+    return records, labels
+
+def ingest(pattern, out=None, workers=None):
+    """Reads the shards matching pattern (see shards) with workers
+    processes (the number of CPUs by default, 1 reads in this
+    process). If out is given, records are written to the binary
+    file-like out (see binary.write) as soon as their shard and all
+    the shards before it are parsed, instead of being collected.
+    Returns Ingested."""
+
+    files = shards(pattern)
+    packed = out is not None
+    workers = workers or os.cpu_count() or 1
+    records = None
+    if not packed:
+        records = []
+    labels = collections.Counter()
+
+    def merge(results):
+        for rs, ls in results:
+            if packed:
+                out.write(rs)
+            else:
+                records.extend(rs)
+            labels.update(ls)
+
+    flags = itertools.repeat(packed, len(files))
+    if workers == 1:
+        merge(map(_parse, files, flags))
+    else:
+        with futures.ProcessPoolExecutor(workers) as pool:
+            merge(pool.map(_parse, files, flags))
+    return Ingested(records, labels, len(files))
@@ -8,15 +8,20 @@ def readd(iterable):
             data.append(c == ' ' and 1 or 0)
     return data
 
-def readi(iterable):
-    result = []
+def iread(iterable):
+    """Lazily reads (value, data) records, only the current
+    record is kept in memory."""
+
+    iterable = iter(iterable)
     for line in iterable:
         line = line.strip('\r\n')
         if not line:
             continue
         value = line
-        result.append((value, readd(iterable)))
-    return result
+        yield value, readd(iterable)
+
+def readi(iterable):
+    return list(iread(iterable))
 
 def read(filename):
     with open(filename, 'r') as f:
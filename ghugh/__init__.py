@@ -1 +1,16 @@
-__all__ = ["ffann", "backprop", "trainer", "util"]
+import importlib
+
+__all__ = ["ffann", "backprop", "trainer", "util", "activation", "hogwild",
+           "predict", "dataset", "prune", "inference", "evaluation",
+           "crossvalidation", "stream", "backend", "paramserver",
+           "memory"]
+
+
+def __getattr__(name):
+    # submodules are imported on first access, import ghugh is cheap
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,194 @@
+"""Named activation functions.
+
+Each activation carries a scalar form, a vectorized form that
+evaluates a whole layer in one call and a derivative calculated
+from the output value (y=function(x)). Activations are registered
+by name so that layers can be described (and serialised) by the
+activation name only."""
+
+import math
+
+__all__ = ["Activation", "register", "get", "names", "find", "vectorize",
+           "sigmoid", "dsigmoid", "tanh", "dtanh",
+           "relu", "drelu", "leakyRelu", "dleakyRelu",
+           "identity", "didentity"]
+
+
+def vectorize(function):
+    """Returns a function applying the given scalar function
+    to each item of a sequence and returning a list."""
+
+    def vectorized(xs):
+        return list(map(function, xs))
+    return vectorized
+
+
+class Activation(object):
+    """Activation function with its derivative:
+        - function: scalar form, x->y;
+        - dfunction: derivative calculated for the given y=function(x);
+        - vfunction: vectorized form, [x]->[y];
+        - vdfunction: vectorized derivative, [y]->[dy];
+        - expression: optional Python expression of the scalar form
+          as a format string of a variable name ({0}), may use
+          names from the math module. Used to inline the activation
+          in generated code (see inference.compile).
+    vectorized forms are derived from scalar forms if not given."""
+
+    def __init__(self, name, function, dfunction,
+                 vfunction=None, vdfunction=None, expression=None):
+        self.name = name
+        self.function = function
+        self.dfunction = dfunction
+        self.vfunction = vfunction or vectorize(function)
+        self.vdfunction = vdfunction or vectorize(dfunction)
+        self.expression = expression
+
+    def __repr__(self):
+        return "activation[%s]" % (self.name or self.function.__name__)
+
+
+def sigmoid(x):
+    """1/(1 + e^-x)"""
+
+    if x > 36: x = 36
+    elif x < -36: x = -36
+    ret = 1.0 / (1.0 + math.exp(-x))
+    assert ret not in (0.0, 1.0), "Invalid sigmoid value %f->%f" % (x, ret)
+    return ret
+
+def dsigmoid(y):
+    """derivative of sigmoid for the given y=sigmoid(x)"""
+    ret = y*(1.0 - y)
+    assert ret != 0.0, "Invalid sigmoid value %f->%f" % (y, ret)
+    return ret
+
+def _vsigmoid(xs):
+    exp = math.exp
+    return [1.0 / (1.0 + exp(-min(36, max(-36, x)))) for x in xs]
+
+def _vdsigmoid(ys):
+    return [y*(1.0 - y) for y in ys]
+
+def tanh(x):
+    """(e^x - e^-x)/(e^x + e^-x)"""
+
+    return math.tanh(x)
+
+def dtanh(y):
+    """derivative of tanh for the given y=tanh(x)"""
+
+    return 1.0 - y*y
+
+def _vdtanh(ys):
+    return [1.0 - y*y for y in ys]
+
+def relu(x):
+    """max(0, x)"""
+
+    return x > 0.0 and x or 0.0
+
+def drelu(y):
+    """derivative of relu for the given y=relu(x)"""
+
+    return y > 0.0 and 1.0 or 0.0
+
+def _vrelu(xs):
+    return [x > 0.0 and x or 0.0 for x in xs]
+
+def _vdrelu(ys):
+    return [y > 0.0 and 1.0 or 0.0 for y in ys]
+
+LEAK = 0.01
+
+def leakyRelu(x):
+    """x for x > 0, LEAK*x otherwise"""
+
+    return x > 0.0 and x or LEAK*x
+
+def dleakyRelu(y):
+    """derivative of leakyRelu for the given y=leakyRelu(x)"""
+
+    return y > 0.0 and 1.0 or LEAK
+
+def _vleakyRelu(xs):
+    return [x > 0.0 and x or LEAK*x for x in xs]
+
+def _vdleakyRelu(ys):
+    return [y > 0.0 and 1.0 or LEAK for y in ys]
+
+def identity(x):
+    """x"""
+
+    return x
+
+def didentity(y):
+    """derivative of identity"""
+
+    return 1.0
+
+def _videntity(xs):
+    return list(xs)
+
+def _vdidentity(ys):
+    return [1.0] * len(ys)
+
+
+_registry = {}
+
+def register(activation):
+    """Registers the given activation by its name. An activation
+    registered under an existing name replaces the old one."""
+
+    if not activation.name:
+        raise ValueError("Can not register an unnamed activation %r" %
+                         activation)
+    _registry[activation.name] = activation
+    return activation
+
+def get(name):
+    """Returns the activation registered by the given name."""
+
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError("Unknown activation %r, expected one of %s" %
+                         (name, sorted(_registry)))
+
+def names():
+    """Names of the registered activations."""
+
+    return sorted(_registry)
+
+def find(function, dfunction=None):
+    """Resolves an activation from the layer arguments:
+        - an Activation instance is returned as is;
+        - a string is looked up in the registry;
+        - a callable registered as a scalar form (with the same
+          derivative, if dfunction is given) is resolved to the
+          registered activation;
+        - any other callable is wrapped into an unnamed activation
+          with the given dfunction."""
+
+    if isinstance(function, Activation):
+        return function
+    if isinstance(function, str):
+        return get(function)
+    for a in _registry.values():
+        if a.function is function and \
+           (dfunction is None or a.dfunction is dfunction):
+            return a
+    return Activation(None, function, dfunction)
+
+
+register(Activation("sigmoid", sigmoid, dsigmoid, _vsigmoid, _vdsigmoid,
+                    "1.0 / (1.0 + exp(-min(36, max(-36, {0}))))"))
+register(Activation("tanh", tanh, dtanh, vectorize(math.tanh), _vdtanh,
+                    "tanh({0})"))
+register(Activation("relu", relu, drelu, _vrelu, _vdrelu,
+                    "({0} > 0.0 and {0} or 0.0)"))
+register(Activation("leakyRelu", leakyRelu, dleakyRelu,
+                    _vleakyRelu, _vdleakyRelu,
+                    "({0} > 0.0 and {0} or %r*{0})" % LEAK))
+register(Activation("identity", identity, didentity,
+                    _videntity, _vdidentity, "{0}"))
@@ -0,0 +1,73 @@
+"""Compute backends.
+
+A backend stores the weights of the layers of a net and computes the
+weighted sums of the forward pass (see ffann.Net). The available
+backends are:
+    - pure: lists of floats, the default;
+    - array: util.Matrix, flat arrays of doubles with memoryview rows
+             and columns, compact storage;
+    - numpy: NumPy arrays, matrix-vector products.
+Backends are imported on first use, so NumPy is not loaded unless the
+numpy backend is selected. The default backend is set by the
+GHUGH_BACKEND environment variable.
+
+A backend module provides:
+    - matrix(rows): mutable weight rows storage, a copy of the rows;
+    - zeros(rows, columns): mutable zero rows storage;
+    - dot(matrix, values): sums of the values weighted by each row.
+
+A backend updating whole weight matrices in backpropagation (see
+backprop.Weighted) also provides, for the storage it owns (buffers
+of the weight changes are indexed as the transposed weights):
+    - owns(storage): True if the storage was made by the backend;
+    - tdot(matrix, values): sums of the values weighted by each column;
+    - update(matrix, momentum, outputs, deltas, LR, M): online update
+      of the weights and of the previous weight changes (momentum,
+      None if not kept), returns tdot(matrix, deltas) before the
+      update;
+    - accumulate(matrix, accumulator, outputs, deltas): adds the weight
+      changes to the accumulator, returns tdot(matrix, deltas);
+    - apply(matrix, momentum, accumulator, LR, M): batch update of the
+      weights by the accumulated changes, which are reset.
+Other backends are updated element by element.
+
+A backend computing the gradients of a batch of samples at once (see
+backprop.gradients) also provides, batches are lists of rows:
+    - batchDot(matrix, batch): dot of each row of the batch;
+    - batchTdot(matrix, batch): tdot of each row of the batch;
+    - outerSum(batch, deltas): sum of the outer products of the rows,
+      storage indexed as the transposed weights;
+    - add(storage, other): adds other to the storage in place.
+The numpy backend releases the GIL in the matrix products, so threads
+sharing a net compute in parallel (see
+backprop.ParallelBackpropagation)."""
+
+import importlib, os
+
+__all__ = ["get", "names", "ENVIRONMENT"]
+
+ENVIRONMENT = "GHUGH_BACKEND"
+
+_MODULES = {"pure": "ghugh.backends.pure",
+            "array": "ghugh.backends.array",
+            "numpy": "ghugh.backends.numpy"}
+
+
+def names():
+    """Names of the available backends."""
+
+    return sorted(_MODULES)
+
+def get(name=None):
+    """Backend module by the name, the backend given by the
+    environment variable (or pure) if name is None. Backend
+    modules are returned as is."""
+
+    if name is None:
+        name = os.environ.get(ENVIRONMENT) or "pure"
+    if not isinstance(name, str):
+        return name
+    if name not in _MODULES:
+        raise ValueError("Unknown backend %r, one of %s expected" %
+                         (name, ", ".join(names())))
+    return importlib.import_module(_MODULES[name])
@@ -0,0 +1,2 @@
+"""Compute backend implementations, imported on demand by
+ghugh.backend."""
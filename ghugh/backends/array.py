@@ -0,0 +1,23 @@
+"""array module backend: weights of a layer are stored in a
+util.Matrix, one flat array of doubles (8 bytes per weight) with
+memoryview rows and strided memoryview columns."""
+
+import operator
+
+from .. import util
+
+NAME = "array"
+
+
+def matrix(rows):
+    """Weight rows storage, a copy of the rows."""
+
+    return util.Matrix(rows)
+
+def zeros(rows, columns):
+    return util.Matrix.zeros(rows, columns)
+
+def dot(matrix, values):
+    """Sums of the values weighted by each row."""
+
+    return [sum(map(operator.mul, values, ws)) for ws in matrix]
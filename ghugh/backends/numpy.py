@@ -0,0 +1,84 @@
+"""NumPy backend: weights of a layer are stored in a 2-dim array of
+doubles, rows are views of it. The weighted sums of a layer are one
+matrix-vector product."""
+
+import numpy
+
+NAME = "numpy"
+
+
+def matrix(rows):
+    """Weight rows storage, a copy of the rows."""
+
+    if not len(rows):
+        return numpy.zeros((0, 0))
+    return numpy.array([list(ws) for ws in rows], dtype=float)
+
+def zeros(rows, columns):
+    return numpy.zeros((rows, columns))
+
+def dot(matrix, values):
+    """Sums of the values weighted by each row."""
+
+    return (numpy.asarray(matrix, dtype=float) @
+            numpy.asarray(values, dtype=float)).tolist()
+
+def owns(storage):
+    return isinstance(storage, numpy.ndarray)
+
+def tdot(matrix, values):
+    """Sums of the values weighted by each column."""
+
+    return (numpy.asarray(values, dtype=float) @ matrix).tolist()
+
+def update(matrix, momentum, outputs, deltas, LR, M):
+    """Online weight update (see backprop.Weighted.doWeights), returns
+    the sums of the deltas weighted by each column before the
+    update."""
+
+    deltas = numpy.asarray(deltas, dtype=float)
+    errors = (deltas @ matrix).tolist()
+    changes = numpy.outer(numpy.multiply(LR, outputs), deltas)
+    if momentum is not None:
+        changes += M*momentum
+        momentum[...] = changes
+    matrix += changes.T
+    return errors
+
+def accumulate(matrix, accumulator, outputs, deltas):
+    """Accumulates the weight changes for a batch update, returns the
+    sums of the deltas weighted by each column."""
+
+    deltas = numpy.asarray(deltas, dtype=float)
+    accumulator += numpy.outer(outputs, deltas)
+    return (deltas @ matrix).tolist()
+
+def apply(matrix, momentum, accumulator, LR, M):
+    """Batch weight update by the accumulated changes."""
+
+    changes = LR*accumulator
+    if momentum is not None:
+        changes += M*momentum
+        momentum[...] = changes
+    matrix += changes.T
+    accumulator.fill(0.0)
+
+def batchDot(matrix, batch):
+    """dot of each row of the batch, a list of rows."""
+
+    return (numpy.asarray(batch, dtype=float) @ matrix.T).tolist()
+
+def batchTdot(matrix, batch):
+    """tdot of each row of the batch, a list of rows."""
+
+    return (numpy.asarray(batch, dtype=float) @ matrix).tolist()
+
+def outerSum(batch, deltas):
+    """Sum of the outer products of the rows of the batch and the
+    deltas, indexed as the transposed weights."""
+
+    return numpy.asarray(batch, dtype=float).T @ \
+        numpy.asarray(deltas, dtype=float)
+
+def add(storage, other):
+    storage += other
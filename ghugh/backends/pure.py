@@ -0,0 +1,21 @@
+"""Pure Python backend: weight rows are lists of floats."""
+
+import operator
+
+NAME = "pure"
+
+
+def matrix(rows):
+    """Weight rows storage, list rows are used as is."""
+
+    if all(type(ws) is list for ws in rows):
+        return rows
+    return [list(ws) for ws in rows]
+
+def zeros(rows, columns):
+    return [[0.0] * columns for _ in range(rows)]
+
+def dot(matrix, values):
+    """Sums of the values weighted by each row."""
+
+    return [sum(map(operator.mul, values, ws)) for ws in matrix]
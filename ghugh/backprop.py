@@ -1,60 +1,361 @@
+import os, itertools, operator, random
 from abc import abstractmethod
+from concurrent import futures
 
 from .trainer import Algo
+from . import util
+from . import activation
+from . import ffann
+from . import dataset as _dataset
 
 class Backpropagation(Algo):
     """Backpropagation algorithm using gradient descent.
     Instances of this class are stateful."""
 
-    def __init__(self, net, batch=False):
+    def __init__(self, net, batch=False, cache=None):
         """Initializes an algorithm instance for training the 
         given net instance. If batch is True the full dataset 
         is applied before adjusting the weights in the net
         as opposed to the online training mode (batch=False)
-        when weights are updated after each training data."""
+        when weights are updated after each training data.
+        Weights of frozen layers (see ffann.Net.setTrainable, the
+        flags are read here) are not changed, errors are propagated
+        down to the lowest trainable layer only. If cache is given,
+        the output signals of the lowest trainable layer (of the layer
+        below it if it is convolutional, its kernels are trained) are
+        cached for up to cache inputs across epochs, so only the
+        layers above are activated for cached inputs.
+        The cache is not invalidated, frozen weights must not be
+        changed while training."""
 
         super().__init__()
         self.batch = batch
         self.net = net
-        self.input = Input(self.net.layers()[0],
-                           self.net.layers()[1].inputSize(), batch)
+        layers = self.net.layers()
+        self.input = _trainer(Input, layers[0], layers[1], batch,
+                              errors=False)
         self.hiddens = []
-        for i in range(1, len(net.layers())-1):
-            nextLen = net.layers()[i+1].inputSize()
-            self.hiddens.append(Hidden(net.layers()[i], nextLen, batch))
-        self.output = Output(self.net.layers()[-1])
+        for i in range(1, len(layers)-1):
+            self.hiddens.append(_trainer(Hidden, layers[i], layers[i+1],
+                                         batch))
+        self.output = Output(layers[-1])
+        trainers = self.trainers()
+        self._lowest = next((k for k, t in enumerate(trainers)
+                             if not t.frozen()), len(trainers))
+        # the outputs of the layer below a trainable convolutional layer
+        # are cached, its own outputs change with its kernels
+        self._cached = self._lowest
+        if self._lowest < len(trainers) and \
+           isinstance(layers[self._lowest], ffann.ConvLayer):
+            self._cached -= 1
+        self._cache = None
+        if cache and 0 < self._cached and self._lowest < len(trainers):
+            self._cache = util.LRUCache(cache)
 
     def train(self, dataset, LR, M):
         """Trains the net against the given dataset
-        (a sequence of 2-element tuples) with LR
+        (a sequence of 2-element tuples, or weighted 3-element
+        tuples, see dataset.compact) with LR
         learning rate and M momentum.
         Returns the average error."""
 
         n = 0
         merror = 0.0
-        for input, expected in dataset:
-            merror += self.propagate(input, expected, LR, M)
-            n += 1
+        for input, expected, weight in _dataset.weighted(dataset):
+            merror += self.propagate(input, expected, LR, M, weight)
+            n += weight
         if self.batch:
-            for h in self.hiddens:
-                h.updateWeights(LR, M)
-            self.input.updateWeights(LR, M)
+            self.updateWeights(LR, M)
         return merror/n
 
-    def propagate(self, input, expected, LR, M):
+    def updateWeights(self, LR, M):
+        """Applies the weight changes accumulated in batch mode."""
+
+        for h in self.hiddens:
+            h.updateWeights(LR, M)
+        self.input.updateWeights(LR, M)
+        self.net.touch()
+
+    def trainers(self):
+        """Weighted layer trainers ordered as the layers in the net."""
+
+        return [self.input] + self.hiddens
+
+    def footprint(self):
+        """Memory footprint of each weighted layer ordered as the
+        layers in the net (see Weighted.footprint), the layer
+        description is added as "layer"."""
+
+        return [dict(t.footprint(), layer=repr(t._layer))
+                for t in self.trainers()]
+
+    def propagate(self, input, expected, LR, M, weight=1):
         """backpropagation for a single data.
-        Returns the squere error."""
+        weight scales the error of the data: in batch mode it
+        is the same as weight copies of the data, in online
+        mode the same as weight times the learning rate.
+        Returns the squere error (scaled by weight)."""
 
-        self.net.feed(input)
-        error = self.output.propagate(expected)
+        self._activate(input)
+        error = self.output.propagate(expected, weight)
         deltas = self.output.deltas()
-        for h in self.hiddens:
+        lowest = self._lowest
+        for h in reversed(self.hiddens[max(lowest - 1, 0):]):
             h.update(deltas, LR, M)
             deltas = h.deltas()
-        self.input.update(deltas, LR, M)
+        if not lowest:
+            self.input.update(deltas, LR, M)
+        if not self.batch:
+            self.net.touch()
         return error
-        
-        
+
+    def _activate(self, input):
+        cache = self._cache
+        if cache is None:
+            self.net.activate(input)
+            return
+        key = util.digest(input)
+        outputs = cache.get(key)
+        if outputs is None:
+            self.net.activate(input)
+            cache.put(key, list(self.net.layers()[self._cached]))
+        else:
+            self.net.activateFrom(self._cached, outputs)
+
+    def cache(self):
+        """The cache of the frozen layers outputs, see util.LRUCache,
+        None if not enabled."""
+
+        return self._cache
+
+
+class MiningBackpropagation(Backpropagation):
+    """Online backpropagation skipping well-learned samples (hard
+    example mining). The error of each sample is kept by its index in
+    the dataset, which must keep its order across epochs. A sample
+    whose last error (per unit of weight) is below threshold is
+    skipped, unless drawn with probability keep. Every given epochs
+    (and on the first one) all samples are propagated to recheck the
+    skipped ones. The error of a skipped sample is its last error, so
+    the returned error still covers all the samples, updated on the
+    recheck epochs. Instances of this class are stateful."""
+
+    def __init__(self, net, threshold=0.001, every=5, keep=0.0, seed=None):
+        """Initializes the algorithm for the given net. every is the
+        number of epochs between rechecks, no rechecks if None.
+        keep is the probability to propagate a skipped sample anyway,
+        drawn from random.Random(seed)."""
+
+        super().__init__(net)
+        self.threshold = threshold
+        self.every = every
+        self.keep = keep
+        self.skipped = 0
+        self._errors = []
+        self._epoch = 0
+        self._random = random.Random(seed)
+
+    def train(self, dataset, LR, M):
+        """See Backpropagation.train, skipped is set to the number
+        of samples (counting the weights) skipped in the epoch."""
+
+        recheck = self._epoch == 0 or \
+                  self.every and self._epoch % self.every == 0
+        self._epoch += 1
+        self.skipped = 0
+        errors = self._errors
+        k = 0
+        n = 0
+        merror = 0.0
+        for input, expected, weight in _dataset.weighted(dataset):
+            if k == len(errors):
+                errors.append(None)
+            error = errors[k]
+            if recheck or error is None or \
+               error >= self.threshold*weight or \
+               self.keep and self._random.random() < self.keep:
+                error = errors[k] = self.propagate(input, expected,
+                                                   LR, M, weight)
+            else:
+                self.skipped += weight
+            merror += error
+            n += weight
+            k += 1
+        del errors[k:]
+        return merror/n
+
+
+class ParallelBackpropagation(Backpropagation):
+    """Batch backpropagation splitting each mini-batch across a thread
+    pool. The threads share the net: each computes the gradients for
+    its shard (see gradients) without changing the net, the shard
+    gradients are reduced and applied once per mini-batch, so the
+    model is never copied. The threads run in parallel in the matrix
+    products of a backend with batch kernels (the numpy backend, see
+    backend module), which release the GIL, otherwise they are
+    serialized by the GIL. Instances of this class are stateful and
+    must be closed to release the pool. Nets with spatial layers (see
+    ffann.ConvLayer) are not supported."""
+
+    def __init__(self, net, threads=None, batchSize=None):
+        """Initializes the algorithm for the given net. threads is the
+        pool size, the number of CPUs by default, a single thread
+        computes in the calling thread. batchSize is the number of
+        samples per weight update, if None the full dataset is one
+        batch as in batch mode."""
+
+        super().__init__(net, True)
+        self.batchSize = batchSize
+        self.threads = threads or os.cpu_count() or 1
+        self._pool = None
+        if self.threads > 1:
+            self._pool = futures.ThreadPoolExecutor(self.threads)
+
+    def train(self, dataset, LR, M):
+        n = 0
+        merror = 0.0
+        samples = _dataset.weighted(dataset)
+        while True:
+            batch = list(itertools.islice(samples, self.batchSize))
+            if not batch:
+                break
+            merror += self.propagateBatch(batch, LR, M)
+            n += _dataset.size(batch)
+        return merror/n
+
+    def propagateBatch(self, batch, LR, M):
+        """Backpropagation for a mini-batch, updates weights.
+        Returns the sum of square errors."""
+
+        if self._pool is None:
+            results = [gradients(self.net, batch)]
+        else:
+            size = -(-len(batch) // self.threads)
+            shards = [batch[i:i + size] for i in range(0, len(batch), size)]
+            results = self._pool.map(gradients, itertools.repeat(self.net),
+                                     shards)
+        error = 0.0
+        trainers = self.trainers()
+        for e, grads in results:
+            error += e
+            for t, g in zip(trainers, grads):
+                if not t.frozen():
+                    t.accumulate(g)
+        self.updateWeights(LR, M)
+        return error
+
+    def close(self):
+        """Stops the threads."""
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def gradients(net, dataset):
+    """Computes the error gradients of the net weights over the dataset
+    without changing the net. Returns a tuple of (error, gradients)
+    where error is the sum of square errors and gradients are
+    accumulated output[i]*output_delta[j] per weighted layer, indexed
+    as gradients[layer][i][j] (see Weighted.doWeights), None for frozen
+    layers (see ffann.Net.setTrainable). Errors are propagated down to
+    the lowest trainable layer only. If the backend of the net has
+    batch kernels (see backend module) and owns the weights, the
+    samples are computed as one batch and the gradients are stored
+    by the backend. Dense nets only."""
+
+    layers = net.layers()
+    weighted = layers[:-1]
+    trainable = [l.trainable() for l in weighted]
+    lowest = trainable.index(True) if True in trainable else len(weighted)
+    samples = list(_dataset.weighted(dataset))
+    kernels = _kernels(weighted)
+    if kernels is not None and samples:
+        return _batchGradients(kernels, layers, samples, trainable, lowest)
+    grads = [t and [[0.0] * layers[k+1].inputSize() for _ in l] or None
+             for k, (l, t) in enumerate(zip(weighted, trainable))]
+    vdfs = [None] + [_vdfunction(l) for l in layers[1:]]
+    error = 0.0
+    for input, expected, weight in samples:
+        outputs = [layers[0].evaluate(input)]
+        for l, p in zip(layers[1:], layers):
+            outputs.append(l.evaluate(outputs[-1], p))
+        errors = [e - a for a, e in zip(outputs[-1], expected)]
+        error += weight*sum(e*e for e in errors)/2.0
+        deltas = [weight*d*e for d, e in
+                  zip(vdfs[-1](outputs[-1]), errors)]
+        for k in range(len(weighted) - 1, lowest - 1, -1):
+            layer = weighted[k]
+            if grads[k] is None:
+                errors = [sum(map(operator.mul, deltas, layer.weightsAt(i)))
+                          for i in range(len(outputs[k]))]
+            else:
+                errors = []
+                for i, (o, g) in enumerate(zip(outputs[k], grads[k])):
+                    e = 0.0
+                    for j, (d, w) in enumerate(zip(deltas,
+                                                   layer.weightsAt(i))):
+                        e += d*w
+                        g[j] += o*d
+                    errors.append(e)
+            if k > lowest:
+                shift = layer.bias() and 1 or 0
+                deltas = [d*e for d, e in zip(vdfs[k](outputs[k][shift:]),
+                                              errors[shift:])]
+    return error, grads
+
+def _kernels(layers):
+    """The backend of the layers if it has batch kernels (see backend
+    module) and owns all their weights, None otherwise."""
+
+    backend = layers and layers[0].backend()
+    if getattr(backend, "outerSum", None) is None:
+        return None
+    if all(l.backend() is backend and backend.owns(l.weights())
+           for l in layers):
+        return backend
+    return None
+
+def _batchGradients(kernels, layers, samples, trainable, lowest):
+    weighted = layers[:-1]
+    outputs = [[layers[0].evaluate(input) for input, _, _ in samples]]
+    for l, p in zip(layers[1:], weighted):
+        vf = l.activation().vfunction
+        values = [list(vf(s)) for s in
+                  kernels.batchDot(p.weights(), outputs[-1])]
+        bias = getattr(l, "bias", None)
+        if bias is not None and bias():
+            for v in values:
+                v.insert(0, l[0])
+        outputs.append(values)
+    vdfs = [None] + [_vdfunction(l) for l in layers[1:]]
+    error = 0.0
+    deltas = []
+    for o, (_, expected, weight) in zip(outputs[-1], samples):
+        errors = [e - a for a, e in zip(o, expected)]
+        error += weight*sum(e*e for e in errors)/2.0
+        deltas.append([weight*d*e for d, e in zip(vdfs[-1](o), errors)])
+    grads = [None] * len(weighted)
+    for k in range(len(weighted) - 1, lowest - 1, -1):
+        layer = weighted[k]
+        if trainable[k]:
+            grads[k] = kernels.outerSum(outputs[k], deltas)
+        if k > lowest:
+            shift = layer.bias() and 1 or 0
+            vdf = vdfs[k]
+            deltas = [[d*e for d, e in zip(vdf(o[shift:]), es[shift:])]
+                      for o, es in
+                      zip(outputs[k], kernels.batchTdot(layer.weights(),
+                                                        deltas))]
+    return error, grads
+
+
 class Weighted(object):
     """Backpropagation for a weighted layer.
        For batch training, updateWeights method 
@@ -66,14 +367,62 @@ class Weighted(object):
         """Initializes a trainer for the given layer.
         cNextLayer is the number of neurons for the next
         layer in the net. batch is a boolean flag indicating
-        batch training mode."""
+        batch training mode. The previous weight changes (for
+        momentum) and the accumulated weight changes (for batch
+        mode) are allocated on first use, i.e. never with zero
+        momentum in online mode. Weight changes made with zero
+        momentum are not kept, momentum starts from zero changes."""
 
         self._layer = layer
-        self._oldWDeltas = [[0.0] * cNextLayer for _ in layer]
+        self._cNextLayer = cNextLayer
+        self._oldWDeltas = None
         self._batch = batch
-        if batch:
-            self._wDeltas = [[0.0] * cNextLayer for _ in layer]
+        self._wDeltas = None
+        # a row of scratch previous weight changes when momentum is 0
+        self._scratch = [0.0] * cNextLayer
+        trainable = getattr(layer, "trainable", None)
+        self._frozen = trainable is not None and not trainable()
+        self._pruned = None
+
+    def _momentum(self, M):
+        """Rows of the previous weight changes, allocated if M is not 0,
+        otherwise a scratch row repeated if not allocated yet."""
+
+        if self._oldWDeltas is None:
+            if not M:
+                return itertools.repeat(self._scratch, len(self._layer))
+            self._oldWDeltas = _zeros(self._layer, self._cNextLayer)
+        return self._oldWDeltas
+
+    def _accumulator(self):
+        if self._wDeltas is None:
+            self._wDeltas = _zeros(self._layer, self._cNextLayer)
+        return self._wDeltas
+
+    def frozen(self):
+        """True if the layer weights are frozen (see
+        ffann.Net.setTrainable) when the trainer was created."""
+
+        return self._frozen
+
+    def footprint(self):
+        """Approximate memory size in bytes of the layer weights,
+        the previous weight changes and the accumulated weight
+        changes (0 if not allocated), see util.nbytes."""
+
+        layer = self._layer
+        weights = [layer.weightsTo(j) for j in range(self._cNextLayer)]
+        return {"weights": util.nbytes(weights),
+                "momentum": util.nbytes(self._oldWDeltas),
+                "accumulator": util.nbytes(self._wDeltas)}
     
+    def bindMomentum(self, rows):
+        """Replaces the storage of the previous weight changes (used
+        for momentum) with the given mutable rows indexed as the
+        layer weightsAt. Rows are used as is, not copied."""
+
+        self._oldWDeltas = rows
+
     def doWeights(self, index, o, odelta, weights, oldDeltas, LR, M):
         """Updates the weight by the index according to the
         following formulae:
@@ -107,6 +456,19 @@ class Weighted(object):
 
         deltas[index] += o*odelta
 
+    def accumulate(self, gradients):
+        """Adds gradients (indexed as the layer weightsAt) to the
+        weight changes accumulated in batch mode."""
+
+        accumulator = self._accumulator()
+        backend = self._vectorized(None, accumulator)
+        if backend is not None and backend.owns(gradients):
+            backend.add(accumulator, gradients)
+            return
+        for dws, gs in zip(accumulator, gradients):
+            for j, g in enumerate(gs):
+                dws[j] += g
+
     @abstractmethod
     def doDeltas(self, index, delta):
         """Stores the backpropagated error for the 
@@ -117,11 +479,70 @@ class Weighted(object):
         """Backpropagates the errors from the next layer, calculates
         and stores errors for the current layer. In online training mode,
         updates layer weights. For batch mode, accumulates weight
-        changes to apply after the full dataset is exhausted."""
+        changes to apply after the full dataset is exhausted.
+        Frozen weights are not changed."""
+
+        if self._frozen:
+            self._backpropagate(odeltas)
+            return
+        self._train(odeltas, LR, M)
+        if self._pruned and not self._batch:
+            self._prune()
 
-        dws = self._batch and self.doWeights_batch or self.doWeights
-        oldWDeltas = self._batch and self._wDeltas or self._oldWDeltas
-        self._update(odeltas, oldWDeltas, self.doDeltas, dws, LR, M)
+    def _train(self, odeltas, LR, M):
+        layer = self._layer
+        if self._batch:
+            accumulator = self._accumulator()
+            backend = self._vectorized(Weighted.doWeights_batch,
+                                       accumulator)
+            if backend is None:
+                self._update(odeltas, accumulator, self.doDeltas,
+                             self.doWeights_batch, LR, M)
+                return
+            errors = backend.accumulate(layer.weights(), accumulator,
+                                        list(layer), odeltas)
+        else:
+            momentum = self._momentum(M)
+            backend = self._vectorized(Weighted.doWeights,
+                                       self._oldWDeltas)
+            if backend is None:
+                self._update(odeltas, momentum, self.doDeltas,
+                             self.doWeights, LR, M)
+                return
+            errors = backend.update(layer.weights(), self._oldWDeltas,
+                                    list(layer), odeltas, LR, M)
+        for i, (o, e) in enumerate(zip(layer, errors)):
+            self.doDeltas(i, o, e)
+
+    def _vectorized(self, hook, *buffers):
+        """The backend of the layer if it updates whole matrices (see
+        backend module) and owns the weights and the buffers (None
+        buffers are not allocated), unless the hook (a doWeights
+        method, or None) is overridden. None otherwise, weights are
+        updated element by element."""
+
+        backend = getattr(self._layer, "backend", None)
+        backend = backend and backend()
+        owns = getattr(backend, "owns", None)
+        if owns is None or \
+           hook is not None and getattr(type(self), hook.__name__) is not hook:
+            return None
+        if owns(self._layer.weights()) and \
+           all(b is None or owns(b) for b in buffers):
+            return backend
+        return None
+
+    def _backpropagate(self, odeltas):
+        layer = self._layer
+        backend = self._vectorized(None)
+        if backend is not None:
+            errors = backend.tdot(layer.weights(), odeltas)
+            for i, (o, e) in enumerate(zip(layer, errors)):
+                self.doDeltas(i, o, e)
+            return
+        for i, o in enumerate(layer):
+            self.doDeltas(i, o, sum(map(operator.mul, odeltas,
+                                        layer.weightsAt(i))))
 
     def _update(self, odeltas, oldWDeltas, doDeltas, doWeights, LR, M):
         layer = self._layer
@@ -137,13 +558,40 @@ class Weighted(object):
         """Updates weights in batch training mode. Must be called
         when the full dataset is examined by `update'"""
         assert self._batch
-        for i,(dws,odws) in enumerate(zip(self._wDeltas, self._oldWDeltas)):
-            ws = self._layer.weightsAt(i)
-            for j, (dw, odw) in enumerate(zip(dws, odws)):
-                dw = LR*dw + M*odw
-                ws[j] += dw
-                odws[j] = dw
-                dws[j] = 0.0
+        if self._frozen:
+            return
+        oldWDeltas = self._momentum(M)
+        backend = self._vectorized(None, self._accumulator(),
+                                   self._oldWDeltas)
+        if backend is not None:
+            backend.apply(self._layer.weights(), self._oldWDeltas,
+                          self._accumulator(), LR, M)
+        else:
+            for i, (dws, odws) in enumerate(zip(self._accumulator(),
+                                                oldWDeltas)):
+                ws = self._layer.weightsAt(i)
+                for j, (dw, odw) in enumerate(zip(dws, odws)):
+                    dw = LR*dw + M*odw
+                    ws[j] += dw
+                    odws[j] = dw
+                    dws[j] = 0.0
+        if self._pruned:
+            self._prune()
+
+    def setMask(self, pruned):
+        """Keeps the weights at the given (j, i) positions (see
+        _OLayer.weightsTo) at zero: they and their previous changes
+        are zeroed after each weight update. None removes the mask."""
+
+        self._pruned = pruned
+
+    def _prune(self):
+        weights = self._layer.weights()
+        momentum = self._oldWDeltas
+        for j, i in self._pruned:
+            weights[j][i] = 0.0
+            if momentum is not None:
+                momentum[i][j] = 0.0
         
 
 class Input(Weighted):
@@ -159,43 +607,218 @@ class Hidden(Weighted):
     def __init__(self, layer, cNextLayer, batch):
         super().__init__(layer, cNextLayer, batch)
 
-        # remembet that if the layer has bias, then deltas[0]
-        # must be omitted when returning deltas
-        df = layer.dfunction()
-        if layer.bias():
-            self._deltas = [0.0] * (len(layer) - 1)
-            def doDeltas(index, output, error):
-                if index > 0:
-                    self._deltas[index-1] = df(output) * error
-            self.doDeltas = doDeltas
-        else:
-            self._deltas = [0.0] * len(layer)
-            def doDeltas(index, output, error):
-                self._deltas[index] = df(output)*error
-            self.doDeltas = doDeltas
+        # remember that if the layer has bias, then the bias unit
+        # error must be omitted when returning deltas
+        self._shift = layer.bias() and 1 or 0
+        self._errors = [0.0] * len(layer)
+        self._deltas = [0.0] * (len(layer) - self._shift)
+        self._vdf = _vdfunction(layer)
+
+    def doDeltas(self, index, output, error):
+        self._errors[index] = error
+
+    def update(self, odeltas, LR, M):
+        """Backpropagates the errors from the next layer and
+        calculates deltas for the whole layer in one call."""
+
+        super().update(odeltas, LR, M)
+        shift = self._shift
+        outputs = self._layer[shift:] if shift else self._layer
+        self._deltas = [d*e for d, e in
+                        zip(self._vdf(outputs), self._errors[shift:])]
 
     def deltas(self):
         return self._deltas
 
+class _Spatial(Weighted):
+    """A mixin for backpropagation of spatial layers (see
+    ffann.ConvLayer). Unlike Hidden, deltas are the errors at the
+    inputs of the layer, the previous spatial layer multiplies them
+    by its own derivative."""
+
+    def __init__(self, layer, cNextLayer, batch, errors=True):
+        """errors is False if the errors at the inputs of the
+        layer are not needed, i.e. the layer is the first layer."""
+
+        super().__init__(layer, cNextLayer, batch)
+        self._shift = layer.bias() and 1 or 0
+        self._errors = [0.0] * len(layer)
+        self._inputErrors = errors
+        self._deltas = [0.0] * len(layer.inputs())
+
+    def doDeltas(self, index, output, error):
+        self._errors[index] = error
+
+    def _outputErrors(self, odeltas, LR, M):
+        """Errors at the outputs of the layer: backpropagated through
+        (and updating) the dense weights, if any, otherwise odeltas
+        are the errors at the inputs of the next spatial layer."""
+
+        if not self._layer.dense():
+            return odeltas
+        super().update(odeltas, LR, M)
+        return self._errors[self._shift:]
+
+    def updateWeights(self, LR, M):
+        if self._layer.dense():
+            super().updateWeights(LR, M)
+
+    def deltas(self):
+        return self._deltas
+
+
+class Conv(_Spatial):
+    """Backpropagation for convolutional layers. Kernel weights are
+    shared by all positions of the output channel, so their changes
+    are the sums over the positions:
+        deltaK[c][0] = LR*sumOf(delta[c][p]) + M*oldDeltaK[c][0]
+        deltaK[c][k] = LR*sumOf(delta[c][p]*input[field[p][k-1]]) +
+                       M*oldDeltaK[c][k]
+    where delta[c][p] is the error at the output p of the channel c
+    times the derivative of the activation (see Weighted.doWeights)."""
+
+    def __init__(self, layer, cNextLayer, batch, errors=True):
+        super().__init__(layer, cNextLayer, batch, errors)
+        self._vdf = _vdfunction(layer)
+        # allocated on first use, see Weighted
+        self._oldKDeltas = None
+        self._kDeltas = None
+
+    def _kernelBuffer(self):
+        return [[0.0] * len(ws) for ws in self._layer.kernels()]
+
+    def update(self, odeltas, LR, M):
+        layer = self._layer
+        errors = self._outputErrors(odeltas, LR, M)
+        shift = self._shift
+        outputs = layer[shift:] if shift else layer
+        deltas = [d*e for d, e in zip(self._vdf(outputs), errors)]
+        inputs = layer.inputs()
+        fields = layer.fields()
+        positions = len(fields)
+        ierrors = self._inputErrors and [0.0] * len(inputs)
+        frozen = self._frozen
+        grads = []
+        for c, ws in enumerate(layer.kernels()):
+            g = [0.0] * len(ws)
+            for field, d in zip(fields, deltas[c*positions:]):
+                if not d:
+                    continue
+                if not frozen:
+                    g[0] += d
+                    for k, i in enumerate(field, 1):
+                        g[k] += d*inputs[i]
+                if ierrors:
+                    for k, i in enumerate(field, 1):
+                        ierrors[i] += d*ws[k]
+            grads.append(g)
+        if ierrors:
+            self._deltas = ierrors
+        if frozen:
+            return
+        if self._batch:
+            if self._kDeltas is None:
+                self._kDeltas = self._kernelBuffer()
+            for dks, g in zip(self._kDeltas, grads):
+                for k, gk in enumerate(g):
+                    dks[k] += gk
+        else:
+            self._updateKernels(grads, LR, M)
+
+    def _updateKernels(self, grads, LR, M):
+        if self._oldKDeltas is None:
+            if not M:
+                for ws, g in zip(self._layer.kernels(), grads):
+                    for k, gk in enumerate(g):
+                        ws[k] += LR*gk
+                return
+            self._oldKDeltas = self._kernelBuffer()
+        for ws, odks, g in zip(self._layer.kernels(), self._oldKDeltas,
+                               grads):
+            for k, gk in enumerate(g):
+                dk = LR*gk + M*odks[k]
+                ws[k] += dk
+                odks[k] = dk
+
+    def footprint(self):
+        footprint = super().footprint()
+        footprint["weights"] += util.nbytes(self._layer.kernels())
+        footprint["momentum"] += util.nbytes(self._oldKDeltas)
+        footprint["accumulator"] += util.nbytes(self._kDeltas)
+        return footprint
+
+    def updateWeights(self, LR, M):
+        super().updateWeights(LR, M)
+        if self._frozen:
+            return
+        if self._kDeltas is None:
+            return
+        self._updateKernels(self._kDeltas, LR, M)
+        for dks in self._kDeltas:
+            dks[:] = [0.0] * len(dks)
+
+
+class Pool(_Spatial):
+    """Backpropagation for max pooling layers: the error at each
+    output is routed to the input selected by the last activation
+    (see ffann.PoolLayer.argmax), other inputs get no error."""
+
+    def update(self, odeltas, LR, M):
+        errors = self._outputErrors(odeltas, LR, M)
+        if self._inputErrors:
+            ierrors = [0.0] * len(self._deltas)
+            for i, e in zip(self._layer.argmax(), errors):
+                ierrors[i] += e
+            self._deltas = ierrors
+
+
 class Output(object):
     """Backpropagation for output layer."""
 
     def __init__(self, layer):
         self._deltas = [0.0] * len(layer)
         self._layer = layer
+        self._vdf = _vdfunction(layer)
 
-    def propagate(self, expected):
+    def propagate(self, expected, weight=1):
         """Calculates output deltas for each
         neuron in output layer and returns 1/2 of
-        the squere error."""
+        the squere error. Deltas and the error are
+        scaled by weight."""
 
-        df = self._layer.dfunction()
-        se = 0.0
-        for i,(a,e) in enumerate(zip(self._layer, expected)):
-            error = e - a
-            self._deltas[i] = df(a)*error
-            se += error * error
-        return se/2.0
+        errors = [e - a for a, e in zip(self._layer, expected)]
+        self._deltas = [weight*d*error for d, error in
+                        zip(self._vdf(self._layer), errors)]
+        return weight*sum(error * error for error in errors)/2.0
 
     def deltas(self):
         return self._deltas
+
+
+def _zeros(layer, count):
+    """len(layer) rows of count zeros stored by the backend of the
+    layer (see ffann.Net), lists for layers without a backend."""
+
+    backend = getattr(layer, "backend", None)
+    if backend is None:
+        return [[0.0] * count for _ in layer]
+    return backend().zeros(len(layer), count)
+
+def _trainer(cls, layer, next, batch, errors=True):
+    """Trainer for the layer: Conv and Pool for spatial layers
+    (errors is passed to them), otherwise cls."""
+
+    if isinstance(layer, (ffann.ConvLayer, ffann.PoolLayer)):
+        spatial = isinstance(layer, ffann.ConvLayer) and Conv or Pool
+        return spatial(layer, layer.dense() and next.inputSize() or 0,
+                       batch, errors)
+    return cls(layer, next.inputSize(), batch)
+
+def _vdfunction(layer):
+    """Vectorized derivative of the layer activation. Layers
+    providing the scalar derivative only are vectorized here."""
+
+    vdf = getattr(layer, "vdfunction", None)
+    if vdf is not None:
+        return vdf()
+    return activation.vectorize(layer.dfunction())
@@ -0,0 +1,140 @@
+"""K-fold cross-validation.
+
+The dataset is partitioned into k folds, k nets are trained each on
+all folds but one and evaluated on the held-out fold. Folds run
+concurrently on a pool of forked worker processes, the workers share
+the dataset inherited on fork, only fold indices and the scores are
+sent between the processes."""
+
+import copy, os, random, time
+import multiprocessing
+from concurrent import futures
+
+from . import trainer
+from . import backprop
+from . import evaluation
+
+__all__ = ["partition", "crossValidate", "Fold", "Report"]
+
+
+def partition(dataset, k, seed=None):
+    """Splits the sample indices of the dataset into k folds of
+    (almost) equal size, shuffled by random.Random(seed) unless seed
+    is None. Returns a list of k lists of indices."""
+
+    if not 1 < k <= len(dataset):
+        raise ValueError("k must be in [2, %d], got %r" % (len(dataset), k))
+    indices = list(range(len(dataset)))
+    if seed is not None:
+        random.Random(seed).shuffle(indices)
+    return [indices[i::k] for i in range(k)]
+
+
+class Fold(object):
+    """Results of one fold:
+        - index: the fold index;
+        - converged, error, reason, epochs: training results (see
+          trainer.Result);
+        - evaluation: evaluation.Evaluation over the held-out fold;
+        - seconds: training and evaluation time."""
+
+    def __init__(self, index, result, evaluation, seconds):
+        self.index = index
+        self.converged, self.error = result
+        self.reason = result.reason
+        self.epochs = result.epochs
+        self.evaluation = evaluation
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "fold %d: training error %.6f (%s after %d epochs), " \
+               "%r, %.3fs" % (self.index, self.error, self.reason,
+                              self.epochs, self.evaluation, self.seconds)
+
+
+class Report(object):
+    """Results of cross-validation: folds (a list of Fold) and the
+    elapsed wall time in seconds."""
+
+    def __init__(self, folds, seconds):
+        self.folds = folds
+        self.seconds = seconds
+
+    def _mean(self, values):
+        values = list(values)
+        return sum(values) / len(values)
+
+    def error(self):
+        """Mean validation error of the folds."""
+
+        return self._mean(f.evaluation.error() for f in self.folds)
+
+    def accuracy(self):
+        """Mean validation accuracy of the folds."""
+
+        return self._mean(f.evaluation.accuracy() for f in self.folds)
+
+    def trainingError(self):
+        """Mean training error of the folds."""
+
+        return self._mean(f.error for f in self.folds)
+
+    def speedup(self):
+        """Sum of the fold times over the wall time."""
+
+        return self.seconds and \
+               sum(f.seconds for f in self.folds) / self.seconds or 0.0
+
+    def __repr__(self):
+        lines = [repr(f) for f in self.folds]
+        lines.append("mean: training error %.6f, validation error %.6f, "
+                     "accuracy %.4f, %.3fs (speedup %.1f)" %
+                     (self.trainingError(), self.error(), self.accuracy(),
+                      self.seconds, self.speedup()))
+        return "\n".join(lines)
+
+
+# the cross-validation run, inherited by the workers on fork
+_run = None
+
+def _fold(index):
+    build, algo, dataset, folds, args, options = _run
+    start = time.perf_counter()
+    held = set(folds[index])
+    training = [s for i, s in enumerate(dataset) if i not in held]
+    validation = [dataset[i] for i in folds[index]]
+    net = build()
+    learningRate, momentum, epoches = copy.deepcopy(args)
+    result = trainer.supervised(algo(net), training,
+                                learningRate, momentum, epoches, **options)
+    return Fold(index, result, evaluation.evaluate(net, validation),
+                time.perf_counter() - start)
+
+def crossValidate(build, dataset, k, learningRate, momentum, epoches,
+                  algo=backprop.Backpropagation, processes=None, seed=None,
+                  **options):
+    """Runs k-fold cross-validation (see partition). build is a
+    function returning a new net, algo is a function of the net
+    returning the training algorithm. learningRate (a copy of it for
+    each fold, if a Schedule), momentum, epoches and options are passed
+    to trainer.supervised. processes is the number of worker processes,
+    k or the number of CPUs if less by default, the folds are run
+    sequentially in this process if it is 1. Returns Report."""
+
+    global _run
+    dataset = list(dataset)
+    folds = partition(dataset, k, seed)
+    processes = processes or min(k, os.cpu_count() or 1)
+    start = time.perf_counter()
+    _run = (build, algo, dataset, folds,
+            (learningRate, momentum, epoches), options)
+    try:
+        if processes == 1:
+            results = [_fold(i) for i in range(k)]
+        else:
+            context = multiprocessing.get_context("fork")
+            with futures.ProcessPoolExecutor(processes, context) as pool:
+                results = list(pool.map(_fold, range(k)))
+    finally:
+        _run = None
+    return Report(results, time.perf_counter() - start)
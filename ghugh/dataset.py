@@ -0,0 +1,40 @@
+"""Dataset helpers.
+
+A dataset is a sequence of (input, expected) samples. A sample may
+carry a third item, an integer weight, counting it as that many
+identical samples (see compact)."""
+
+__all__ = ["compact", "weighted", "size"]
+
+
+def weighted(dataset):
+    """Iterates (input, expected, weight) triples of the dataset,
+    samples without weight have weight 1."""
+
+    for sample in dataset:
+        if len(sample) > 2:
+            yield sample[0], sample[1], sample[2]
+        else:
+            yield sample[0], sample[1], 1
+
+def size(dataset):
+    """Number of samples in the dataset counting the weights."""
+
+    return sum(w for _, _, w in weighted(dataset))
+
+def compact(dataset):
+    """Collapses identical (input, expected) samples into one
+    weighted sample. Returns a list of (input, expected, weight)
+    triples ordered by the first occurrence of each sample."""
+
+    index = {}
+    result = []
+    for input, expected, weight in weighted(dataset):
+        key = (tuple(input), tuple(expected))
+        i = index.get(key)
+        if i is None:
+            index[key] = len(result)
+            result.append([input, expected, weight])
+        else:
+            result[i][2] += weight
+    return [tuple(s) for s in result]
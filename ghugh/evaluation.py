@@ -0,0 +1,165 @@
+"""Net evaluation over a dataset.
+
+Scores error, accuracy and the confusion matrix of a net with the
+fast inference function (see inference.compile). The dataset may be
+split into batches scored by a pool of forked worker processes, so a
+held-out dataset can be evaluated during training (see
+trainer.supervised)."""
+
+import multiprocessing
+from concurrent import futures
+
+from . import ffann
+from . import inference
+from . import util
+from . import dataset as _dataset
+
+__all__ = ["Evaluation", "Evaluator", "evaluate"]
+
+
+class Evaluation(object):
+    """Scores of a net over a dataset. Samples are counted with their
+    weights (see dataset.weighted):
+        - count: number of samples;
+        - confusion: confusion[expected][predicted] number of samples,
+          where expected and predicted are the indices of the maximal
+          expected and output signals."""
+
+    def __init__(self, outputs):
+        self.count = 0
+        self.confusion = [[0] * outputs for _ in range(outputs)]
+        self._error = 0.0
+
+    def add(self, outputs, expected, weight=1):
+        """Scores the output signals of a sample."""
+
+        self._error += weight*sum((e - o)**2
+                                  for o, e in zip(outputs, expected))/2.0
+        row = self.confusion[util.argmax(expected)]
+        row[util.argmax(outputs)] += weight
+        self.count += weight
+
+    def merge(self, other):
+        """Adds the scores of another evaluation, returns self."""
+
+        self._error += other._error
+        self.count += other.count
+        for row, orow in zip(self.confusion, other.confusion):
+            for i, n in enumerate(orow):
+                row[i] += n
+        return self
+
+    def error(self):
+        """Mean half square error, as returned by Algo.train."""
+
+        return self.count and self._error / self.count or 0.0
+
+    def accuracy(self):
+        """Fraction of samples with the maximal output signal at the
+        maximal expected signal."""
+
+        correct = sum(row[i] for i, row in enumerate(self.confusion))
+        return self.count and correct / self.count or 0.0
+
+    def __repr__(self):
+        return "error %.6f, accuracy %.4f over %d samples" % \
+               (self.error(), self.accuracy(), self.count)
+
+
+def _model(net, feed=None):
+    """Scoring function of the net: feed (a previous result for the
+    net) bound to the current weights, see inference.compile."""
+
+    # spatial nets (see ffann.ConvLayer) are not compiled
+    if not isinstance(net.layers()[0], ffann.InputLayer):
+        return net.activate
+    if feed is None:
+        return inference.compile(net, bound=True)
+    feed.bind(net)
+    return feed
+
+def _score(model, outputs, batch):
+    evaluation = Evaluation(outputs)
+    for input, expected, weight in batch:
+        evaluation.add(model(input), expected, weight)
+    return evaluation
+
+
+# state of the worker processes, inherited on fork
+_net = None
+_batches = None
+_weights = None
+_feed = None
+_version = None
+
+def _init(net, batches, weights):
+    global _net, _batches, _weights
+    _net = net
+    _batches = batches
+    _weights = weights
+
+def _scoreBatch(index):
+    global _feed, _version
+    _weights.sync(_net)
+    if _net.version() != _version:
+        _feed = _model(_net, _feed)
+        _version = _net.version()
+    return _score(_feed, len(_net.layers()[-1]), _batches[index])
+
+
+class Evaluator(object):
+    """Evaluates the net over a fixed dataset with the current weights
+    on each call. If processes is given, batches of batchSize samples
+    are scored by that many forked worker processes. The current
+    weights are published to the workers in shared memory once per
+    call when changed (see util.SharedSnapshot and ffann.Net.touch).
+    The scoring function of dense nets is generated once and bound to
+    the current weights on each call (see inference.compile).
+    Instances must be closed to release the processes."""
+
+    def __init__(self, net, dataset, batchSize=1024, processes=None):
+        self.net = net
+        samples = list(_dataset.weighted(dataset))
+        self._batches = [samples[i:i + batchSize]
+                         for i in range(0, len(samples), batchSize)]
+        self._outputs = len(net.layers()[-1])
+        self._feed = None
+        self._pool = None
+        if processes is not None:
+            self._weights = util.SharedSnapshot(net)
+            self._pool = futures.ProcessPoolExecutor(
+                processes, multiprocessing.get_context("fork"),
+                initializer=_init,
+                initargs=(net, self._batches, self._weights))
+
+    def __call__(self):
+        """Returns Evaluation of the net."""
+
+        evaluation = Evaluation(self._outputs)
+        if self._pool is None:
+            self._feed = _model(self.net, self._feed)
+            for batch in self._batches:
+                evaluation.merge(_score(self._feed, self._outputs, batch))
+            return evaluation
+        self._weights.publish(self.net)
+        for e in self._pool.map(_scoreBatch, range(len(self._batches))):
+            evaluation.merge(e)
+        return evaluation
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def evaluate(net, dataset, batchSize=1024, processes=None):
+    """Returns Evaluation of the net over the dataset (see Evaluator)."""
+
+    with Evaluator(net, dataset, batchSize, processes) as evaluator:
+        return evaluator()
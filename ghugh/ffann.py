@@ -1,8 +1,12 @@
-import math, random, collections, numbers
+import json, random, collections, numbers
 from . import util
+from . import activation
+from . import backend as _backend
+from . import inference
+from .activation import sigmoid, dsigmoid
 
 
-def network(*neurons, bias=None):
+def network(*neurons, bias=None, backend=None):
     """helper function to build a network by the
     neuron numbers in each layer and bias mode."""
 
@@ -13,22 +17,30 @@ def network(*neurons, bias=None):
     for i in range(1, len(neurons)-1):
         layers.append(HiddenLayer(neurons[i], neurons[i+1], bias=bias))
     layers.append(OutputLayer(neurons[-1]))
-    return Net(*layers)
-
-def sigmoid(x):
-    """1/(1 + e^-x)"""
-
-    if x > 36: x = 36
-    elif x < -36: x = -36
-    ret = 1.0 / (1.0 + math.exp(-x))
-    assert ret not in (0.0, 1.0), "Invalid sigmoid value %f->%f" % (x, ret)
-    return ret
-
-def dsigmoid(y):
-    """derivative of sigmoid for the given y=sigmoid(x)"""
-    ret = y*(1.0 - y)
-    assert ret != 0.0, "Invalid sigmoid value %f->%f" % (y, ret)
-    return ret
+    return Net(*layers, backend=backend)
+
+def _initialWeights(iweights, rows, count):
+    """rows x count matrix of initial weights (see _OLayer)."""
+
+    if iweights is None:
+        return [[random.uniform(-1.0, 1.0)] * count
+                for _ in range(rows)]
+    elif isinstance(iweights, numbers.Number):
+        return [[iweights] * count
+                for _ in range(rows)]
+    elif isinstance(iweights, collections.Sequence):
+        if len(iweights) != 2:
+            raise ValueError("Two-element sequence is needed for"
+                             "initial weights, got %r" % iweights)
+        return [[random.uniform(iweights[0], iweights[1])] * count
+                for _ in range(rows)]
+    elif isinstance(iweights, collections.Iterable):
+        iweights = iter(iweights)
+        return [[next(iweights) for _ in range(count)]
+                for _ in range(rows)]
+    elif isinstance(iweights, collections.Callable):
+        return [[iweights() for _ in range(count)]
+                for _ in range(rows)]
 
 class _Layer(collections.Sequence):
     """A mixin for layers. Holds
@@ -44,6 +56,12 @@ class _Layer(collections.Sequence):
     def __getitem__(self, index):
         return self._outputs[index]
 
+    def _snapshot(self):
+        return None
+
+    def _restore(self, snapshot):
+        pass
+
 class _OLayer(_Layer):
     """A mixin for layers bound to an output layer.
     In addition to output values held by _Layer (inherited)
@@ -74,27 +92,69 @@ class _OLayer(_Layer):
         self._bias = bias
         if bias: count += 1
         super().__init__(count)
-        if iweights is None:
-            self._weights = [[random.uniform(-1.0, 1.0)] * count
-                                for _ in range(ocount)]
-        elif isinstance(iweights, numbers.Number):
-            self._weights = [[iweights] * count
-                                for _ in range(ocount)]
-        elif isinstance(iweights, collections.Sequence):
-            if len(iweights) != 2:
-                raise ValueError("Two-element sequence is needed for"
-                                 "initial weights, got %r" % iweights)
-            self._weights = [[random.uniform(iweights[0], iweights[1])] * \
-                                   count
-                             for _ in range(ocount)]
-        elif isinstance(iweights, collections.Iterable):
-            iweights = iter(iweights)
-            self._weights = [[next(iweights) for _ in range(count)]
-                             for _ in range(ocount)]
-        elif isinstance(iweights, collections.Callable):
-            self._weights = [[iweights() for _ in range(count)]
-                             for _ in range(ocount)]
+        self._backend = _backend.get("pure")
+        self._weights = _initialWeights(iweights, ocount, count)
         self._weightsAt = util.transposed(self._weights)
+        self._trainable = True
+
+    def useBackend(self, backend):
+        """Moves the weights to the storage of the backend (see
+        backend module)."""
+
+        self.bindWeights(backend.matrix(self._weights))
+        self._backend = backend
+
+    def backend(self):
+        return self._backend
+
+    def trainable(self):
+        """False if the weights are frozen, see setTrainable."""
+
+        return self._trainable
+
+    def setTrainable(self, trainable=True):
+        """Freezes (trainable False) or unfreezes the weights of the
+        layer (including kernels) for training algorithms (see
+        backprop.Backpropagation)."""
+
+        self._trainable = trainable
+
+    def sums(self, values):
+        """Sums of the values (output signals of this layer, including
+        the bias unit) weighted by the weights to each neuron in the
+        next layer."""
+
+        if values is self:
+            values = self._outputs
+        return self._backend.dot(self._weights, values)
+
+    def bindWeights(self, rows):
+        """Replaces the weight storage with the given mutable rows
+        (e.g. views on a shared buffer), rows[j][i] is the weight of
+        the connection from the ith neuron in this layer to the jth
+        neuron in the next layer. Rows are used as is, not copied."""
+
+        if len(rows) != len(self._weights) or \
+           any(len(r) != len(self) for r in rows):
+            raise ValueError("%d rows of %d weights needed" %
+                             (len(self._weights), len(self)))
+        self._weights = rows
+        self._weightsAt = util.transposed(self._weights)
+
+    def _weightsState(self):
+        return [list(ws) for ws in self._weights]
+
+    def _snapshot(self):
+        return self._weightsState()
+
+    def _restore(self, snapshot):
+        # in place, the rows may be bound views (see bindWeights)
+        for ws, saved in zip(self._weights, snapshot):
+            for i, w in enumerate(saved):
+                ws[i] = w
+
+    def _biasState(self):
+        return self._outputs[0] if self._bias else None
 
     def inputSize(self):
         """number of neuron that have input connections."""
@@ -108,6 +168,11 @@ class _OLayer(_Layer):
 
         return self._bias
 
+    def weights(self):
+        """The weight rows storage, see bindWeights."""
+
+        return self._weights
+
     def weightsTo(self, index):
         """Mutable sequence of outbound connection weights to the
         index-th neuron in the next layer."""
@@ -136,6 +201,8 @@ class InputLayer(_OLayer):
 
         super().__init__(count, ocount, iweights, bias=bias is not None)
         if bias is not None: self._outputs[0] = bias
+        if isinstance(function, (str, activation.Activation)):
+            function = activation.find(function).function
         self._function = function
     
     def activate(self, inputs_):
@@ -148,6 +215,40 @@ class InputLayer(_OLayer):
             self._outputs[i] = self._function and self._function(ii) or ii
         return self
 
+    def function(self):
+        """Function applied to input signals, None for identity."""
+
+        return self._function
+
+    def evaluate(self, inputs):
+        """Returns output signals (including the bias unit) for
+        the given inputs without changing the layer state."""
+
+        f = self._function
+        outputs = [f and f(i) or i for i in inputs]
+        if self._bias:
+            outputs.insert(0, self._outputs[0])
+        return outputs
+
+    def state(self):
+        """Serialisable description of the layer."""
+
+        function = self._function
+        if function is not None:
+            function = _activationName(activation.find(function))
+        return {"layer": "input",
+                "count": self.inputSize(),
+                "ocount": len(self._weights),
+                "bias": self._biasState(),
+                "function": function,
+                "weights": self._weightsState()}
+
+    @classmethod
+    def fromState(cls, state):
+        return cls(state["count"], state["ocount"],
+                   iweights=_flatten(state["weights"]),
+                   function=state["function"], bias=state["bias"])
+
     def __repr__(self):
         return "input[%d, bias=%r]" % (len(self), self._bias)
 
@@ -158,29 +259,61 @@ class _ILayer(_Layer):
 
     def __init__(self, count, function=sigmoid, dfunction=dsigmoid):
         """Initializes mixin. dfunction must calculate the derivative
-        of the given function for y=function(x)."""
+        of the given function for y=function(x). function may also be
+        the name of a registered activation (see activation module),
+        then dfunction is ignored."""
 
         super().__init__(count)
-        self._function = function
-        self._dfunction = dfunction
+        self._setActivation(function, dfunction)
+
+    def _setActivation(self, function, dfunction):
+        self._activation = activation.find(function, dfunction)
+        self._function = self._activation.function
+        self._dfunction = self._activation.dfunction
+        self._vfunction = self._activation.vfunction
+
+    def activation(self):
+        return self._activation
 
     def dfunction(self):
         return self._dfunction
 
+    def vdfunction(self):
+        """Derivative evaluated for the whole layer outputs
+        in one call."""
+
+        return self._activation.vdfunction
+
     def activate(self, inputs):
         return self._activate(inputs, len(self), 0)
 
+    def evaluate(self, values, inputs):
+        """Returns output signals for the given output values of
+        the previous layer, using the inbound weights held by the
+        inputs layer, without changing the layer state."""
+
+        return self._evaluate(values, inputs, len(self), 0)
+
+    def _sums(self, values, inputs, count):
+        sums = getattr(inputs, "sums", None)
+        if sums is not None:
+            return sums(values)
+        return [sum(i*w for i,w in zip(values, inputs.weightsTo(o)))
+                for o in range(0, count)]
+
     def _activate(self, inputs, count, shift):
         """Activates count number of neurons started at shift index."""
 
-        for o in range(0, count):
-            s = sum(i*w
-                                                  for i,w in
-                                                  zip(inputs,
-                                                      inputs.weightsTo(o)))
-            self._outputs[o + shift] = self._function(s)
+        sums = self._sums(inputs, inputs, count)
+        self._outputs[shift:shift + count] = self._vfunction(sums)
         return self
 
+    def _evaluate(self, values, inputs, count, shift):
+        outputs = list(self._vfunction(self._sums(values, inputs, count)))
+        if shift:
+            outputs.insert(0, self._outputs[0])
+        return outputs
+
 
 class HiddenLayer(_OLayer, _ILayer):
     """Hidden layer.
@@ -195,8 +328,7 @@ class HiddenLayer(_OLayer, _ILayer):
 
         super().__init__(count, ocount, iweights,
                          bias=bias is not None)
-        self._function = function
-        self._dfunction = dfunction
+        self._setActivation(function, dfunction)
         if bias is not None: self._outputs[0] = bias
 
     def activate(self, inputs):
@@ -207,10 +339,266 @@ class HiddenLayer(_OLayer, _ILayer):
             shift = 1
         return self._activate(inputs, count, shift)
 
+    def evaluate(self, values, inputs):
+        shift = self._bias and 1 or 0
+        return self._evaluate(values, inputs, len(self) - shift, shift)
+
+    def state(self):
+        """Serialisable description of the layer."""
+
+        return {"layer": "hidden",
+                "count": self.inputSize(),
+                "ocount": len(self._weights),
+                "bias": self._biasState(),
+                "function": _activationName(self._activation),
+                "weights": self._weightsState()}
+
+    @classmethod
+    def fromState(cls, state):
+        return cls(state["count"], state["ocount"],
+                   iweights=_flatten(state["weights"]),
+                   function=state["function"], bias=state["bias"])
+
     def __repr__(self):
         return "hidden[%d, bias=%r]" % (len(self), self._bias)
 
 
+def _pair(value):
+    if isinstance(value, numbers.Number):
+        return value, value
+    return tuple(value)
+
+def _shape(shape):
+    """(height, width, channels) of the given 2 or 3-element shape."""
+
+    if len(shape) == 2:
+        return tuple(shape) + (1,)
+    return tuple(shape)
+
+
+class _SpatialLayer(_OLayer):
+    """A mixin for layers over 2-dim inputs with channels, such as
+    glyphs. Inputs and outputs are flat sequences in the
+    channel-major, row-major order: index = c*height*width + y*width + x.
+    The layer is bound to the next layer with dense outbound weights
+    only if ocount is given, otherwise the next layer must be a
+    ConvLayer or PoolLayer. Spatial layers can not follow dense layers:
+    they are the first layers of the net, the first one takes the net
+    inputs in place of InputLayer, e.g.
+        Net(ConvLayer((16, 16), 3, 4),
+            PoolLayer((14, 14, 4), 2, ocount=10, bias=1.0),
+            HiddenLayer(10, 26, bias=1.0),
+            OutputLayer(26))"""
+
+    def __init__(self, ishape, shape, ocount, iweights, bias):
+        if ocount is None and bias is not None:
+            raise ValueError("Bias unit needs outbound weights (ocount)")
+        if min(shape) < 1:
+            raise ValueError("Empty output %r for input %r" %
+                             (shape, ishape))
+        self._ishape = ishape
+        self._shape = shape
+        super().__init__(shape[0] * shape[1] * shape[2], ocount or 0,
+                         iweights, bias=bias is not None)
+        if bias is not None: self._outputs[0] = bias
+        self._inputs = [0.0] * (ishape[0] * ishape[1] * ishape[2])
+
+    def inputShape(self):
+        """(height, width, channels) of the inputs."""
+
+        return self._ishape
+
+    def shape(self):
+        """(height, width, channels) of the outputs."""
+
+        return self._shape
+
+    def dense(self):
+        """True if the layer has outbound weights to the next layer."""
+
+        return len(self._weights) > 0
+
+    def inputs(self):
+        """Input values of the last activation."""
+
+        return self._inputs
+
+    def _values(self, inputs):
+        values = list(inputs)
+        if len(values) != len(self._inputs):
+            raise ValueError("%d inputs expected, got %d" %
+                             (len(self._inputs), len(values)))
+        self._inputs = values
+        return values
+
+    def _ocount(self):
+        return self.dense() and len(self._weights) or None
+
+
+class ConvLayer(_SpatialLayer, _ILayer):
+    """Convolutional layer. Each output channel (feature map) is
+    calculated by sliding a kernel over the input with the given
+    stride:
+        output[c][y][x] = function(kernel[c][0] +
+                                   sumOf(kernel[c][k]*input[field[y][x][k]]))
+    where the field is the kernel-sized window of all input channels at
+    (y*stride, x*stride) and kernel[c][0] is the kernel bias weight."""
+
+    def __init__(self, shape, kernel, channels, ocount=None, stride=1,
+                 iweights=None, kweights=None,
+                 function=sigmoid, dfunction=dsigmoid, bias=None):
+        """Initializes convolutional layer.
+        - shape: (height, width) or (height, width, channels) of the
+                 inputs;
+        - kernel: kernel size, a number or (height, width);
+        - channels: number of output channels;
+        - ocount: number of neurons in the next dense layer, None if the
+                  next layer is a ConvLayer or PoolLayer;
+        - stride: a number or (vertical, horizontal) steps;
+        - iweights: initial outbound weights (see _OLayer);
+        - kweights: initial kernel weights, as iweights for a matrix of
+                    channels rows and 1 + kernel size * input channels
+                    columns, random numbers between [-1, 1] by default;
+        - bias: if not None, a bias unit is added to the layer and its
+                output value is set to bias (needs ocount)."""
+
+        ishape = _shape(shape)
+        kh, kw = _pair(kernel)
+        sh, sw = _pair(stride)
+        super().__init__(ishape,
+                         ((ishape[0] - kh)//sh + 1, (ishape[1] - kw)//sw + 1,
+                          channels),
+                         ocount, iweights, bias)
+        self._setActivation(function, dfunction)
+        self._kernel = (kh, kw)
+        self._stride = (sh, sw)
+        if kweights is None:
+            kweights = lambda: random.uniform(-1.0, 1.0)
+        self._kernels = _initialWeights(kweights, channels,
+                                        1 + kh*kw*ishape[2])
+        height, width, ichannels = ishape
+        self._fields = [[c*height*width + (y*sh + dy)*width + x*sw + dx
+                         for c in range(ichannels)
+                         for dy in range(kh)
+                         for dx in range(kw)]
+                        for y in range(self._shape[0])
+                        for x in range(self._shape[1])]
+
+    def kernels(self):
+        """Mutable kernel weights, a row per output channel, the
+        first weight is the kernel bias weight."""
+
+        return self._kernels
+
+    def fields(self):
+        """Input indices of each output position (see kernels)."""
+
+        return self._fields
+
+    def _snapshot(self):
+        return super()._snapshot(), [list(ws) for ws in self._kernels]
+
+    def _restore(self, snapshot):
+        super()._restore(snapshot[0])
+        for ws, saved in zip(self._kernels, snapshot[1]):
+            ws[:] = saved
+
+    def activate(self, inputs):
+        values = self._values(inputs)
+        sums = []
+        for ws in self._kernels:
+            b, ws = ws[0], ws[1:]
+            sums.extend(b + sum(values[i]*w for i, w in zip(field, ws))
+                        for field in self._fields)
+        self._outputs[self._bias and 1 or 0:] = self._vfunction(sums)
+        return self
+
+    def state(self):
+        """Serialisable description of the layer."""
+
+        return {"layer": "conv",
+                "shape": list(self._ishape),
+                "kernel": list(self._kernel),
+                "channels": self._shape[2],
+                "ocount": self._ocount(),
+                "stride": list(self._stride),
+                "bias": self._biasState(),
+                "function": _activationName(self._activation),
+                "weights": self._weightsState(),
+                "kernels": [list(ws) for ws in self._kernels]}
+
+    @classmethod
+    def fromState(cls, state):
+        return cls(state["shape"], state["kernel"], state["channels"],
+                   ocount=state["ocount"], stride=state["stride"],
+                   iweights=_flatten(state["weights"]),
+                   kweights=_flatten(state["kernels"]),
+                   function=state["function"], bias=state["bias"])
+
+    def __repr__(self):
+        return "conv[%dx%dx%d->%dx%dx%d, bias=%r]" % \
+               (self._ishape + self._shape + (self._bias,))
+
+
+class PoolLayer(_SpatialLayer):
+    """Max pooling layer. Each channel of the input is split into
+    size x size windows, the output is the maximal value of the window.
+    Rows and columns not covered by a full window are ignored."""
+
+    def __init__(self, shape, size, ocount=None, iweights=None, bias=None):
+        """Initializes pooling layer. shape is (height, width) or
+        (height, width, channels) of the inputs, size is the window
+        size. ocount, iweights and bias are the same as for ConvLayer."""
+
+        ishape = _shape(shape)
+        super().__init__(ishape,
+                         (ishape[0]//size, ishape[1]//size, ishape[2]),
+                         ocount, iweights, bias)
+        self._size = size
+        height, width, _ = ishape
+        oh, ow, channels = self._shape
+        self._windows = [[c*height*width + (y*size + dy)*width + x*size + dx
+                          for dy in range(size) for dx in range(size)]
+                         for c in range(channels)
+                         for y in range(oh)
+                         for x in range(ow)]
+        self._argmax = [w[0] for w in self._windows]
+
+    def argmax(self):
+        """Input index of the maximal value of each window
+        in the last activation."""
+
+        return self._argmax
+
+    def activate(self, inputs):
+        values = self._values(inputs)
+        shift = self._bias and 1 or 0
+        for p, window in enumerate(self._windows):
+            i = max(window, key=values.__getitem__)
+            self._argmax[p] = i
+            self._outputs[p + shift] = values[i]
+        return self
+
+    def state(self):
+        """Serialisable description of the layer."""
+
+        return {"layer": "pool",
+                "shape": list(self._ishape),
+                "size": self._size,
+                "ocount": self._ocount(),
+                "bias": self._biasState(),
+                "weights": self._weightsState()}
+
+    @classmethod
+    def fromState(cls, state):
+        return cls(state["shape"], state["size"], ocount=state["ocount"],
+                   iweights=_flatten(state["weights"]), bias=state["bias"])
+
+    def __repr__(self):
+        return "pool[%dx%dx%d->%dx%dx%d, bias=%r]" % \
+               (self._ishape + self._shape + (self._bias,))
+
+
 class OutputLayer(_ILayer):
     """Output layer.
     """
@@ -221,30 +609,194 @@ class OutputLayer(_ILayer):
     def inputSize(self):
         return len(self)
 
+    def state(self):
+        """Serialisable description of the layer."""
+
+        return {"layer": "output",
+                "count": len(self),
+                "function": _activationName(self._activation)}
+
+    @classmethod
+    def fromState(cls, state):
+        return cls(state["count"], function=state["function"])
+
     def __repr__(self):
         return "output[%d] x->%s" % (len(self), self._function.__name__)
-        
+
+
+def _activationName(a):
+    if a.name is None:
+        raise ValueError("Can not serialise unregistered activation %r, "
+                         "see activation.register" % a)
+    return a.name
+
+def _flatten(weights):
+    return (w for ws in weights for w in ws)
+
+
 class Net(object):
     """Feed-forward neural network.
     """
 
-    def __init__(self, *layers):
-        """Composes a network from the layers."""
+    def __init__(self, *layers, backend=None):
+        """Composes a network from the layers. The weights are moved to
+        the storage of the backend (a name or a module, see backend
+        module), the default backend if None."""
 
         super().__init__()
         if not layers or len(layers) < 2:
             raise ValueError("At least two layers needed, got %d" % 
                              len(layers))
         self._layers = tuple(layers)
+        self._backend = _backend.get(backend)
+        for l in self._layers:
+            if isinstance(l, _OLayer):
+                l.useBackend(self._backend)
         self._feed = util.compose(*tuple(l.activate for l in self._layers))
+        self._version = 0
+        self._cache = None
+        # the weights version of the cached outputs
+        self._cacheVersion = None
+        self._frozen = None
 
     def layers(self):
         return self._layers
 
-    def feed(self, data):
-        """Feeds data to the input layer and returns the output layer."""
+    def backend(self):
+        return self._backend
+
+    def activate(self, data):
+        """Feeds data to the input layer and returns the output layer.
+        Unlike feed the layers are always activated, so their outputs
+        are available for training."""
 
         return self._feed(data)
 
+    def activateFrom(self, index, outputs):
+        """Sets the output signals (including the bias unit) of the
+        index-th layer to outputs and activates the layers above it
+        only. Returns the output layer."""
+
+        layer = self._layers[index]
+        layer._outputs[:] = outputs
+        for l in self._layers[index + 1:]:
+            layer = l.activate(layer)
+        return layer
+
+    def setTrainable(self, top=None):
+        """Makes the weights of the top weighted layers trainable and
+        freezes the weights of the layers below them (see
+        _OLayer.setTrainable), all are trainable if top is None."""
+
+        weighted = [l for l in self._layers if isinstance(l, _OLayer)]
+        frozen = top is not None and max(len(weighted) - top, 0) or 0
+        for k, l in enumerate(weighted):
+            l.setTrainable(k >= frozen)
+
+    def feed(self, data):
+        """Feeds data to the input layer and returns the output layer.
+        If the inference cache is enabled (see cache), repeated inputs
+        are answered from the cache: the output signals of the output
+        layer are set to the cached ones, the layers are not
+        activated."""
+
+        cache = self._cache
+        if cache is None:
+            return self._feed(data)
+        if self._cacheVersion != self._version:
+            cache.clear()
+            self._cacheVersion = self._version
+        key = util.digest(data)
+        outputs = cache.get(key)
+        if outputs is None:
+            output = self._feed(data)
+            cache.put(key, tuple(output))
+            return output
+        output = self._layers[-1]
+        output._outputs[:] = outputs
+        return output
+
+    def cache(self, size=1024):
+        """Enables the bounded LRU inference cache for feed holding
+        up to size outputs, size of None or 0 disables the cache.
+        The cache is keyed by the weights version: it is invalidated
+        by touch, which must be called after the weights are changed
+        outside of the training algorithms, otherwise stale outputs
+        are returned. Returns the cache, its info method reports
+        hit/miss statistics."""
+
+        self._cache = None
+        if size:
+            self._cache = util.LRUCache(size)
+            self._cacheVersion = self._version
+        return self._cache
+
+    def freeze(self):
+        """Returns a plain function of the inputs returning a tuple of
+        output signals, generated for the current weights (see
+        inference.compile). The function is cached per weights
+        version (see touch)."""
+
+        if self._frozen is None or self._frozen[0] != self._version:
+            self._frozen = (self._version, inference.compile(self))
+        return self._frozen[1]
+
+    def touch(self):
+        """Marks the weights as changed. Must be called after the
+        weights are modified outside of the training algorithms."""
+
+        self._version += 1
+
+    def version(self):
+        """Weights version, incremented by touch."""
+
+        return self._version
+
+    def snapshot(self):
+        """Copy of the current weights, see restore."""
+
+        return [l._snapshot() for l in self._layers]
+
+    def restore(self, snapshot):
+        """Sets the weights of the net in place to the snapshot taken
+        by the snapshot method."""
+
+        for l, s in zip(self._layers, snapshot):
+            l._restore(s)
+        self.touch()
+
     def __repr__(self):
         return " ".join(str(l) for l in self._layers)
+
+    def state(self):
+        """Serialisable description of the net: layer descriptions
+        including weights and activation names."""
+
+        return {"layers": [l.state() for l in self._layers]}
+
+    @classmethod
+    def fromState(cls, state, backend=None):
+        return cls(*(_LAYERS[l["layer"]].fromState(l)
+                     for l in state["layers"]), backend=backend)
+
+
+_LAYERS = {"input": InputLayer,
+           "hidden": HiddenLayer,
+           "conv": ConvLayer,
+           "pool": PoolLayer,
+           "output": OutputLayer}
+
+def dump(net, fp):
+    """Serialises the net as a JSON document to the file-like fp."""
+
+    json.dump(net.state(), fp)
+
+def load(fp, backend=None, trainable=None):
+    """Loads a net serialised by dump from the file-like fp,
+    the weights are stored by the backend (see Net). For warm start
+    fine-tuning only the top trainable weighted layers are trainable,
+    see Net.setTrainable."""
+
+    net = Net.fromState(json.load(fp), backend)
+    net.setTrainable(trainable)
+    return net
@@ -0,0 +1,158 @@
+"""Hogwild-style asynchronous online training.
+
+Weights and momentum buffers of the net are moved into a single
+multiprocessing.shared_memory block, worker processes run online
+backpropagation over disjoint shards of the dataset and update the
+shared weights without locks."""
+
+import os
+import multiprocessing
+from multiprocessing import shared_memory
+
+from .trainer import Algo
+from .backprop import Backpropagation
+from . import dataset as _dataset
+
+__all__ = ["Hogwild"]
+
+
+def _rows(view, offset, count, size):
+    """count rows of size doubles from the view started at offset."""
+
+    return [view[offset + i*size:offset + (i+1)*size] for i in range(count)]
+
+
+class Hogwild(Algo):
+    """Asynchronous lock-free online backpropagation.
+    Each call of train runs `every' online epochs on every worker
+    concurrently, then evaluates the error of the net over the full
+    dataset, so the returned error is consistent for the convergence
+    check in trainer.supervised. Worker processes are forked on the
+    first call of train and kept until close. Instances of this class
+    are stateful and must be closed to copy the weights back to the
+    net and release the shared memory."""
+
+    def __init__(self, net, workers=None, every=1):
+        """Initializes the algorithm for the given net. workers is the
+        number of worker processes, the number of CPUs by default,
+        every is the number of asynchronous epochs per train call."""
+
+        super().__init__()
+        self.net = net
+        self.workers = workers or os.cpu_count() or 1
+        self.every = every
+        self._shm = None
+        self._procs = []
+        self._tasks = []
+        self._dataset = None
+
+    def _weighted(self):
+        """(layer, number of neurons in the next layer) pairs."""
+
+        layers = self.net.layers()
+        return [(l, n.inputSize()) for l, n in zip(layers, layers[1:])]
+
+    def _share(self):
+        weighted = self._weighted()
+        size = sum(len(l) * ocount for l, ocount in weighted)
+        # weights and momentum for each layer, the block is zero filled
+        self._shm = shared_memory.SharedMemory(create=True,
+                                               size=max(16 * size, 1))
+        self._view = self._shm.buf.cast('d')
+        self._momentum = []
+        offset = 0
+        for l, ocount in weighted:
+            rows = _rows(self._view, offset, ocount, len(l))
+            for j, r in enumerate(rows):
+                for i, w in enumerate(l.weightsTo(j)):
+                    r[i] = w
+            l.bindWeights(rows)
+            offset += len(l) * ocount
+            self._momentum.append(_rows(self._view, offset, len(l), ocount))
+            offset += len(l) * ocount
+
+    def _start(self, dataset):
+        self.close()
+        self._share()
+        self._dataset = dataset
+        dataset = list(dataset)
+        context = multiprocessing.get_context("fork")
+        self._tasks = []
+        self._results = context.Queue()
+        for w in range(self.workers):
+            tasks = context.SimpleQueue()
+            p = context.Process(target=self._work,
+                                args=(dataset[w::self.workers],
+                                      tasks, self._results),
+                                daemon=True)
+            p.start()
+            self._tasks.append(tasks)
+            self._procs.append(p)
+
+    def _work(self, shard, tasks, results):
+        algo = Backpropagation(self.net, False)
+        for t, momentum in zip(algo.trainers(), self._momentum):
+            t.bindMomentum(momentum)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            LR, M, epoches = task
+            error = 0.0
+            for _ in range(epoches):
+                error = shard and algo.train(shard, LR, M) or 0.0
+            results.put(error)
+
+    def train(self, dataset, LR, M):
+        """Trains the net against the given dataset (a sequence of
+        2-element tuples) with LR learning rate and M momentum.
+        Returns the average error over the dataset."""
+
+        if dataset is not self._dataset:
+            self._start(dataset)
+        for tasks in self._tasks:
+            tasks.put((LR, M, self.every))
+        for _ in self._tasks:
+            self._results.get()
+        self.net.touch()
+        return self.error(dataset)
+
+    def error(self, dataset):
+        """Average error of the net over the dataset."""
+
+        n = 0
+        merror = 0.0
+        for input, expected, weight in _dataset.weighted(dataset):
+            merror += weight*sum((e - a)*(e - a) for a, e in
+                                 zip(self.net.feed(input), expected))/2.0
+            n += weight
+        return merror/n
+
+    def close(self):
+        """Stops the workers, copies the weights back to the net and
+        releases the shared memory."""
+
+        for tasks in self._tasks:
+            tasks.put(None)
+        for p in self._procs:
+            p.join()
+        self._procs = []
+        self._tasks = []
+        self._dataset = None
+        if self._shm is None:
+            return
+        # copies the weights back to the storage of the backend
+        for l, _ in self._weighted():
+            l.useBackend(l.backend())
+        self._momentum = None
+        self._view.release()
+        self._view = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
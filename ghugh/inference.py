@@ -0,0 +1,501 @@
+"""Inference models.
+
+Read-only representations of a trained net specialised for scoring.
+A model is built from a net and keeps no reference to it, the net
+may be trained further or discarded."""
+
+import array, json, math, mmap, operator, struct, time
+
+from . import activation
+from . import util
+from . import dataset as _dataset
+
+__all__ = ["Sparse", "Float32", "Int8", "Mapped", "save", "load",
+           "compile", "compare"]
+
+
+def _biasValue(layer):
+    """Output value of the bias unit, None if there is no bias."""
+
+    bias = getattr(layer, "bias", None)
+    if bias is None or not bias():
+        return None
+    return layer[0]
+
+
+def _numpy():
+    """The numpy module, None if not installed."""
+
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def _views(data, count, size):
+    """count rows of size items, views of the flat data."""
+
+    view = memoryview(data)
+    return [view[j*size:(j+1)*size] for j in range(count)]
+
+
+class _Model(object):
+    """Base for inference models. Captures the input function,
+    bias units and activations of the net, subclasses hold the weights
+    and provide _sums(k, values): weighted sums for the neurons of the
+    (k+1)th layer given output values of the kth layer. Subclasses
+    holding dense weights provide _matrix(numpy, k): the weights of
+    the kth layer as a NumPy array on their storage, used to score
+    batches (see feedMany)."""
+
+    def __init__(self, net):
+        layers = net.layers()
+        self._function = layers[0].function()
+        self._bias = _biasValue(layers[0])
+        self._stages = [(l.activation().vfunction, _biasValue(l))
+                        for l in layers[1:]]
+
+    def feed(self, inputs):
+        """Returns a tuple of output signals for the given inputs."""
+
+        values = self._inputs(inputs)
+        for k, (vf, bias) in enumerate(self._stages):
+            values = list(vf(self._sums(k, values)))
+            if bias is not None:
+                values.insert(0, bias)
+        return tuple(values)
+
+    def _inputs(self, inputs):
+        f = self._function
+        values = f and [f(i) for i in inputs] or list(inputs)
+        if self._bias is not None:
+            values.insert(0, self._bias)
+        return values
+
+    def _matrix(self, numpy, k):
+        return None
+
+    def _batchSums(self, numpy, k, batch):
+        """Weighted sums for the batch (a 2-dim array of values of the
+        kth layer), a 2-dim array."""
+
+        return batch @ self._matrix(numpy, k).T
+
+    def feedMany(self, inputs):
+        """Returns a list of output tuples for the inputs sequence.
+        If NumPy is installed and the model holds dense weights, the
+        inputs are scored as a batch: the weighted sums of each layer
+        are one matrix product, activations are applied per sample."""
+
+        numpy = _numpy()
+        if numpy is None or self._matrix(numpy, 0) is None:
+            feed = self.feed
+            return [feed(i) for i in inputs]
+        batch = [self._inputs(i) for i in inputs]
+        if not batch:
+            return []
+        for k, (vf, bias) in enumerate(self._stages):
+            sums = self._batchSums(numpy, k, numpy.array(batch, dtype=float))
+            batch = [list(vf(s)) for s in sums.tolist()]
+            if bias is not None:
+                for values in batch:
+                    values.insert(0, bias)
+        return [tuple(values) for values in batch]
+
+
+def _rows(net):
+    """Weight rows of each weighted layer (see _OLayer.weightsTo)."""
+
+    layers = net.layers()
+    return [[l.weightsTo(j) for j in range(n.inputSize())]
+            for l, n in zip(layers, layers[1:])]
+
+
+class Sparse(_Model):
+    """Inference model holding the weights of each layer in the
+    compressed sparse row (CSR) format, zero weights are skipped.
+    Rows are the inbound weights of the neurons in the next layer
+    (see _OLayer.weightsTo)."""
+
+    def __init__(self, net):
+        super().__init__(net)
+        self._layers = []
+        self._total = 0
+        layers = net.layers()
+        for l, n in zip(layers, layers[1:]):
+            indptr = array.array('l', [0])
+            indices = array.array('l')
+            data = array.array('d')
+            for j in range(n.inputSize()):
+                for i, w in enumerate(l.weightsTo(j)):
+                    if w:
+                        indices.append(i)
+                        data.append(w)
+                indptr.append(len(data))
+            self._total += len(l) * n.inputSize()
+            self._layers.append((indptr, indices, data))
+
+    def _sums(self, k, values):
+        indptr, indices, data = self._layers[k]
+        mul = operator.mul
+        get = values.__getitem__
+        return [sum(map(mul, map(get, indices[indptr[j]:indptr[j+1]]),
+                        data[indptr[j]:indptr[j+1]]))
+                for j in range(len(indptr) - 1)]
+
+    def nnz(self):
+        """Number of stored (non-zero) weights."""
+
+        return sum(len(data) for _, _, data in self._layers)
+
+    def density(self):
+        """Fraction of non-zero weights."""
+
+        return self._total and self.nnz() / self._total or 0.0
+
+    def nbytes(self):
+        """Size of the stored weights and indices in bytes."""
+
+        return sum(a.itemsize * len(a) for layer in self._layers
+                   for a in layer)
+
+
+_MAGIC = b"GHUGHW1\n"
+_LENGTH = struct.Struct("<Q")
+
+def _name(a):
+    if a.name is None:
+        raise ValueError("Can not store unregistered activation %r, "
+                         "see activation.register" % a)
+    return a.name
+
+def _header(net):
+    """Description of the net without weights: activation names,
+    bias values and the weight matrix shapes (rows, columns)."""
+
+    layers = net.layers()
+    f = layers[0].function()
+    return {"function": f and _name(activation.find(f)),
+            "bias": _biasValue(layers[0]),
+            "stages": [[_name(l.activation()), _biasValue(l)]
+                       for l in layers[1:]],
+            "shapes": [[n.inputSize(), len(l)]
+                       for l, n in zip(layers, layers[1:])]}
+
+
+class Mapped(_Model):
+    """Read-only inference model holding all weights in one buffer of
+    doubles: an anonymous shared memory mapping or a memory mapped file
+    (see save and load). There are no Python objects per weight, so
+    processes forked after the model is built (or mapping the same
+    file) share one physical copy of the weights. Must be closed to
+    release the mapping."""
+
+    def __init__(self, net):
+        """Copies the weights of the net into an anonymous shared
+        mapping."""
+
+        rows = [r for rs in _rows(net) for r in rs]
+        mapping = mmap.mmap(-1, max(8 * sum(map(len, rows)), 8))
+        view = memoryview(mapping).cast('d')
+        offset = 0
+        for r in rows:
+            view[offset:offset + len(r)] = array.array('d', r)
+            offset += len(r)
+        view.release()
+        self._setup(_header(net), mapping, 0)
+
+    @classmethod
+    def _open(cls, header, mapping, offset):
+        model = cls.__new__(cls)
+        model._setup(header, mapping, offset)
+        return model
+
+    def _setup(self, header, mapping, offset):
+        self._header = header
+        self._function = header["function"] and \
+                         activation.get(header["function"]).function
+        self._bias = header["bias"]
+        self._stages = [(activation.get(name).vfunction, bias)
+                        for name, bias in header["stages"]]
+        self._mapping = mapping
+        self._view = memoryview(mapping)[offset:].cast('d')
+        self._layers = []
+        self._offsets = []
+        offset = 0
+        for count, size in header["shapes"]:
+            self._layers.append([self._view[offset + j*size:
+                                            offset + (j+1)*size]
+                                 for j in range(count)])
+            self._offsets.append(offset)
+            offset += count * size
+
+    def _sums(self, k, values):
+        mul = operator.mul
+        return [sum(map(mul, values, ws)) for ws in self._layers[k]]
+
+    def _matrix(self, numpy, k):
+        count, size = self._header["shapes"][k]
+        return numpy.frombuffer(self._view, float, count * size,
+                                8 * self._offsets[k]).reshape(count, size)
+
+    def nbytes(self):
+        """Size of the stored weights in bytes."""
+
+        return self._view.nbytes
+
+    def save(self, path):
+        """Writes the model to the file (see load)."""
+
+        header = json.dumps(self._header).encode("utf-8")
+        offset = len(_MAGIC) + _LENGTH.size + len(header)
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_LENGTH.pack(len(header)))
+            f.write(header)
+            f.write(b"\0" * (-offset % 8))
+            f.write(self._view)
+
+    def close(self):
+        for rows in self._layers:
+            for r in rows:
+                r.release()
+        self._layers = []
+        self._view.release()
+        self._mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def save(net, path):
+    """Writes the weights and structure of the net to the file in a
+    binary format, which can be memory mapped by load."""
+
+    with Mapped(net) as model:
+        model.save(path)
+
+def load(path):
+    """Memory maps the file written by save. Returns Mapped."""
+
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("%s is not a model file" % path)
+        length = _LENGTH.unpack(f.read(_LENGTH.size))[0]
+        header = json.loads(f.read(length).decode("utf-8"))
+        offset = len(_MAGIC) + _LENGTH.size + length
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Mapped._open(header, mapping, offset + (-offset % 8))
+
+
+class Float32(_Model):
+    """Inference model holding the weights as single precision floats,
+    i.e. half of the memory of the double precision weights. The
+    weighted sums are calculated in double precision. Fed sample by
+    sample the model is not faster than the net, batches scored by
+    feedMany are when NumPy is installed."""
+
+    def __init__(self, net):
+        super().__init__(net)
+        self._layers = []
+        for rows in _rows(net):
+            size = rows and len(rows[0]) or 0
+            data = array.array('f', (w for ws in rows for w in ws))
+            self._layers.append((data, _views(data, len(rows), size)))
+
+    def _sums(self, k, values):
+        mul = operator.mul
+        return [sum(map(mul, values, ws)) for ws in self._layers[k][1]]
+
+    def _matrix(self, numpy, k):
+        data, rows = self._layers[k]
+        return numpy.frombuffer(data, numpy.float32).reshape(
+            len(rows), rows and len(rows[0]) or 0)
+
+    def nbytes(self):
+        """Size of the stored weights in bytes."""
+
+        return sum(data.itemsize * len(data) for data, _ in self._layers)
+
+
+class Int8(_Model):
+    """Inference model holding the weights quantized to 8-bit integers
+    with a scale per layer: w ~ q*scale, q in [-127, 127]. The inputs
+    of each layer are quantized the same way with scales calibrated
+    on a sample dataset (the maximal absolute output value of the
+    layer), the weighted sums are calculated in integers and scaled
+    back to floats before activation."""
+
+    def __init__(self, net, dataset):
+        """Quantizes the net, dataset is a sample dataset
+        (see dataset module) for calibration."""
+
+        super().__init__(net)
+        layers = net.layers()
+        maxima = [0.0] * (len(layers) - 1)
+        for input, _, _ in _dataset.weighted(dataset):
+            net.activate(input)
+            for k, l in enumerate(layers[:-1]):
+                maxima[k] = max(maxima[k], max(abs(o) for o in l))
+        self._scales = [m and m/127.0 or 1.0 for m in maxima]
+        self._layers = []
+        for rows in _rows(net):
+            m = max((abs(w) for ws in rows for w in ws), default=0.0)
+            scale = m and m/127.0 or 1.0
+            size = rows and len(rows[0]) or 0
+            data = array.array('b', (round(w/scale)
+                                     for ws in rows for w in ws))
+            self._layers.append((scale, data,
+                                 _views(data, len(rows), size)))
+
+    def _sums(self, k, values):
+        scale = self._scales[k]
+        qvalues = [max(-127, min(127, round(v/scale))) for v in values]
+        wscale, _, rows = self._layers[k]
+        scale *= wscale
+        mul = operator.mul
+        return [scale*sum(map(mul, qvalues, ws)) for ws in rows]
+
+    def _matrix(self, numpy, k):
+        _, data, rows = self._layers[k]
+        return numpy.frombuffer(data, numpy.int8).reshape(
+            len(rows), rows and len(rows[0]) or 0)
+
+    def _batchSums(self, numpy, k, batch):
+        scale = self._scales[k]
+        qbatch = numpy.clip(numpy.rint(batch/scale), -127, 127)
+        wscale = self._layers[k][0]
+        weights = self._matrix(numpy, k).astype(numpy.int64)
+        return (scale*wscale)*(qbatch.astype(numpy.int64) @ weights.T)
+
+    def nbytes(self):
+        """Size of the stored weights in bytes."""
+
+        return sum(data.itemsize * len(data) for _, data, _ in self._layers)
+
+
+def compile(net, bound=False):
+    """Generates and compiles straight-line Python source of the feed
+    function of the net with the current weights baked in as
+    constants. Registered activations with an expression are inlined,
+    zero weights are skipped. Returns a plain function of the inputs
+    sequence returning a tuple of output signals, the generated source
+    is available as its source attribute. The function keeps no
+    reference to the net, later weight changes are not seen.
+    If bound is True the weights (zero weights included) are global
+    names of the function instead, set to the weights of a net of the
+    same structure by its bind(net) attribute, so the function is
+    generated once for changing weights."""
+
+    layers = net.layers()
+    namespace = {name: getattr(math, name) for name in dir(math)
+                 if not name.startswith("_")}
+    lines = ["def feed(inputs):"]
+    names = ["x%d" % i for i in range(layers[0].inputSize())]
+    lines.append("    %s, = inputs" % ", ".join(names))
+    f = layers[0].function()
+    if f is not None:
+        namespace["f"] = f
+        lines.extend("    %s = f(%s)" % (x, x) for x in names)
+    # values are variable names or constants (bias units)
+    bias = _biasValue(layers[0])
+    values = bias is not None and [bias] + names or names
+    for k, (l, n) in enumerate(zip(layers, layers[1:]), 1):
+        a = n.activation()
+        expression = a.expression
+        if expression is None:
+            namespace["a%d" % k] = a.function
+            expression = "a%d({0})" % k
+        outputs = []
+        for j in range(n.inputSize()):
+            terms = []
+            for i, (v, w) in enumerate(zip(values, l.weightsTo(j))):
+                if bound:
+                    if not isinstance(v, str):
+                        v = repr(float(v))
+                    terms.append("%s*w%d_%d_%d" % (v, k, j, i))
+                elif not w:
+                    continue
+                elif isinstance(v, str):
+                    terms.append("%s*%r" % (v, float(w)))
+                else:
+                    terms.append(repr(float(v*w)))
+            lines.append("    s = %s" % (" + ".join(terms) or "0.0"))
+            outputs.append("h%d_%d" % (k, j))
+            lines.append("    %s = %s" % (outputs[-1], expression.format("s")))
+        bias = _biasValue(n)
+        values = bias is not None and [bias] + outputs or outputs
+    lines.append("    return (%s,)" % ", ".join(outputs))
+    source = "\n".join(lines) + "\n"
+    exec(source, namespace)
+    feed = namespace["feed"]
+    feed.source = source
+    if bound:
+        def bind(net):
+            layers = net.layers()
+            for k, (l, n) in enumerate(zip(layers, layers[1:]), 1):
+                for j in range(n.inputSize()):
+                    for i, w in enumerate(l.weightsTo(j)):
+                        namespace["w%d_%d_%d" % (k, j, i)] = float(w)
+        feed.bind = bind
+        bind(net)
+    return feed
+
+
+def compare(reference, model, dataset):
+    """Compares the model with the reference (e.g. the net the model is
+    built from) over the dataset (see dataset module). Returns
+    a dict of:
+        - error, referenceError: average errors (1/2 of the square
+          error) of the model and the reference;
+        - accuracy, referenceAccuracy: fraction of samples where the
+          maximal output matches the maximal expected value;
+        - accuracyDelta: accuracy - referenceAccuracy;
+        - agreement: fraction of samples where the model and the
+          reference maximal outputs match;
+        - maxDifference: maximal absolute output difference;
+        - seconds, referenceSeconds: scoring time;
+        - speedup: referenceSeconds/seconds.
+    A model providing feedMany (e.g. Float32) is scored in one batch,
+    otherwise each sample is fed separately."""
+
+    dataset = list(_dataset.weighted(dataset))
+    inputs = [input for input, _, _ in dataset]
+    _numpy()  # imported before timing feedMany
+    results = []
+    for m in (reference, model):
+        feedMany = getattr(m, "feedMany", None)
+        start = time.perf_counter()
+        if feedMany is None:
+            outputs = [tuple(m.feed(input)) for input in inputs]
+        else:
+            outputs = feedMany(inputs)
+        results.append((outputs, time.perf_counter() - start))
+    (routputs, rseconds), (outputs, seconds) = results
+
+    def error(outputs):
+        return sum(w*sum((e - a)*(e - a) for a, e in zip(o, expected))/2.0
+                   for o, (_, expected, w) in zip(outputs, dataset))
+
+    def accuracy(outputs):
+        return sum(w for o, (_, expected, w) in zip(outputs, dataset)
+                   if util.argmax(o) == util.argmax(expected))
+
+    n = sum(w for _, _, w in dataset) or 1
+    return {"error": error(outputs)/n,
+            "referenceError": error(routputs)/n,
+            "accuracy": accuracy(outputs)/n,
+            "referenceAccuracy": accuracy(routputs)/n,
+            "accuracyDelta": (accuracy(outputs) - accuracy(routputs))/n,
+            "agreement": sum(w for o, r, (_, _, w) in
+                             zip(outputs, routputs, dataset)
+                             if util.argmax(o) == util.argmax(r))/n,
+            "maxDifference": max((abs(a - b) for o, r in
+                                  zip(outputs, routputs)
+                                  for a, b in zip(o, r)), default=0.0),
+            "seconds": seconds,
+            "referenceSeconds": rseconds,
+            "speedup": seconds and rseconds/seconds or 0.0}
@@ -0,0 +1,202 @@
+"""Memory accounting for training and inference.
+
+Structural sizing estimates the bytes held by each layer of a net (the
+weights, the transposed views of them and the outputs), by a training
+algorithm (the previous and accumulated weight changes, see
+backprop.Weighted.footprint) and by a dataset. Profiled wraps a
+training algorithm and measures the peak of the memory allocated by
+each epoch with tracemalloc, measure does the same for any call (e.g.
+of net.activate). Sizes are approximate: shared objects are
+counted once, interpreter caches are not accounted. Tracing is slow,
+the functions generated by ffann.Net.freeze are orders of magnitude
+slower when traced (e.g. evaluation of nets with an InputLayer)."""
+
+import sys, tracemalloc
+
+from .trainer import Algo
+from . import util
+
+__all__ = ["sizeof", "layer", "Report", "Profiled", "measure"]
+
+
+def sizeof(obj):
+    """Approximate bytes of obj and of the objects it contains (lists,
+    tuples, sets, dicts, util.Matrix), each object counted once."""
+
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif isinstance(o, util.Matrix):
+            size += util.nbytes(o)
+    return size
+
+def _object(o):
+    return sys.getsizeof(o) + sys.getsizeof(getattr(o, "__dict__", {}))
+
+def _views(weights, columns):
+    """Bytes of the views of the weights: the _Cursor objects of a
+    _Transposed, the row and column memoryviews of a util.Matrix."""
+
+    if isinstance(weights, util.Matrix):
+        return sum(sys.getsizeof(v) for v in weights) + \
+               sum(sys.getsizeof(v) for v in columns) + \
+               sys.getsizeof(tuple(weights)) + sys.getsizeof(columns)
+    if isinstance(columns, util._Transposed):
+        return _object(columns) + sys.getsizeof(columns.columns) + \
+               sum(_object(c) for c in columns.columns)
+    return 0
+
+def layer(l):
+    """Bytes of the layer by component: "weights" (including the
+    kernels of a ffann.ConvLayer), "views" (see util.transposed)
+    and "outputs"."""
+
+    weights = getattr(l, "_weights", None)
+    kernels = getattr(l, "kernels", None)
+    result = {"weights": util.nbytes(weights),
+              "views": weights is not None and
+                       _views(weights, l._weightsAt) or 0,
+              "outputs": sizeof(l._outputs)}
+    if kernels is not None:
+        result["weights"] += util.nbytes(kernels())
+    return result
+
+
+def _format(size):
+    if size < 1024:
+        return "%dB" % size
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024.0
+        if size < 1024 or unit == "GB":
+            return "%.1f%s" % (size, unit)
+
+
+class Report(object):
+    """Memory accounting of a net, optionally with its training
+    algorithm (see Profiled) and dataset:
+        - layers: per layer dictionaries of bytes by component, see
+          layer, with an algorithm providing footprint (e.g.
+          backprop.Backpropagation) also "momentum" and
+          "accumulator"; the layer description is "layer";
+        - components: total bytes by component, including "dataset";
+        - peaks: per epoch peaks of a Profiled algorithm, or None."""
+
+    COMPONENTS = ("weights", "views", "outputs", "momentum",
+                  "accumulator")
+
+    def __init__(self, net, algo=None, dataset=None):
+        self.peaks = None
+        if isinstance(algo, Profiled):
+            self.peaks = list(algo.peaks)
+        footprint = getattr(algo, "footprint", None)
+        footprint = footprint and footprint() or []
+        self.layers = []
+        for i, l in enumerate(net.layers()):
+            sizes = dict.fromkeys(self.COMPONENTS, 0)
+            sizes.update(layer(l))
+            if i < len(footprint):
+                sizes["momentum"] = footprint[i]["momentum"]
+                sizes["accumulator"] = footprint[i]["accumulator"]
+            sizes["layer"] = repr(l)
+            self.layers.append(sizes)
+        self.components = {c: sum(l[c] for l in self.layers)
+                           for c in self.COMPONENTS}
+        self.components["dataset"] = dataset is not None and \
+                                     sizeof(dataset) or 0
+
+    def total(self):
+        """Total accounted bytes."""
+
+        return sum(self.components.values())
+
+    def __repr__(self):
+        width = max(len(l["layer"]) for l in self.layers + [{"layer": ""}])
+        lines = ["%-*s %s" % (width, "layer",
+                              " ".join("%11s" % c for c in self.COMPONENTS))]
+        for l in self.layers:
+            lines.append("%-*s %s" % (width, l["layer"],
+                                      " ".join("%11s" % _format(l[c])
+                                               for c in self.COMPONENTS)))
+        lines.append(", ".join("%s %s" % (c, _format(n))
+                               for c, n in self.components.items()) +
+                     ", total %s" % _format(self.total()))
+        if self.peaks:
+            lines.append("epoch peaks: max %s, last %s over %d epochs" %
+                         (_format(max(self.peaks)), _format(self.peaks[-1]),
+                          len(self.peaks)))
+        return "\n".join(lines)
+
+
+class Profiled(Algo):
+    """Training algorithm measuring the memory allocated by each
+    epoch (train call) of algo with tracemalloc, in this process only:
+        - peaks: per epoch peak of the traced memory over its start;
+        - retained: per epoch traced memory at its end over its start.
+    Tracing is started on the first epoch if needed and slows down
+    the training, instances must be closed to stop it."""
+
+    def __init__(self, algo):
+        super().__init__()
+        self.algo = algo
+        self.net = getattr(algo, "net", None)
+        self.peaks = []
+        self.retained = []
+        self._started = False
+
+    def train(self, dataset, LR, M):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        error = self.algo.train(dataset, LR, M)
+        current, peak = tracemalloc.get_traced_memory()
+        self.peaks.append(peak - start)
+        self.retained.append(current - start)
+        return error
+
+    def footprint(self):
+        return self.algo.footprint()
+
+    def close(self):
+        """Stops tracing if started by this instance."""
+
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def measure(function, *args, **kwargs):
+    """Calls the function with the arguments, returns a tuple of its
+    result and the peak of the memory allocated by the call in bytes
+    (measured by tracemalloc)."""
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        result = function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        return result, peak - start
+    finally:
+        if started:
+            tracemalloc.stop()
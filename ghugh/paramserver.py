@@ -0,0 +1,297 @@
+"""Data-parallel training with a parameter server.
+
+The parameter server owns the weights and the momentum of the net, it
+runs in the training process and serves worker nodes over TCP. Each
+worker holds a shard of the dataset, pulls the weights, computes the
+gradients of its mini-batches (see backprop.gradients) and pushes them
+to the server, which applies them with the learning rate and momentum.
+In the synchronous mode the gradients of all the workers are summed
+and applied once per step, in the asynchronous mode each push is
+applied as it arrives unless computed with weights older than the
+staleness bound. Workers are local processes by default, remote nodes
+run work (see main.py worker). Messages are pickled, so nodes must
+trust each other. Dense nets only."""
+
+import os, itertools, pickle, socket, threading
+import multiprocessing
+
+from .trainer import Algo
+from . import backprop
+from . import ffann
+from . import dataset as _dataset
+
+__all__ = ["ParameterServer", "work", "SYNC", "ASYNC"]
+
+SYNC = "sync"
+ASYNC = "async"
+
+
+def _call(f, message):
+    """Sends the message to the file-like connection f and returns
+    the reply."""
+
+    pickle.dump(message, f)
+    f.flush()
+    return pickle.load(f)
+
+def _batches(shard, batchSize):
+    shard = iter(shard)
+    while True:
+        batch = list(itertools.islice(shard, batchSize))
+        if not batch:
+            return
+        yield batch
+
+
+def work(address):
+    """Runs a worker node: connects to the parameter server at address
+    (a (host, port) pair) and trains until the server stops."""
+
+    with socket.create_connection(address) as sock, \
+         sock.makefile("rwb") as f:
+        state, trainable, shard, batchSize = _call(f, ("hello",))
+        net = ffann.Net.fromState(state)
+        for l, t in zip(net.layers(), trainable):
+            l.setTrainable(t)
+        while True:
+            reply = _call(f, ("next",))
+            if reply[0] == "stop":
+                break
+            _, version, snapshot = reply
+            net.restore(snapshot)
+            for batch in _batches(shard, batchSize):
+                count = _dataset.size(batch)
+                while True:
+                    error, grads = backprop.gradients(net, batch)
+                    status, v, snapshot = _call(
+                        f, ("push", version, error, count, grads))
+                    if snapshot is not None:
+                        net.restore(snapshot)
+                        version = v
+                    # stale gradients are recomputed with the new weights
+                    if status == "ok":
+                        break
+            _call(f, ("done",))
+
+
+class ParameterServer(Algo):
+    """Backpropagation by worker nodes around a parameter server.
+    Each call of train is one epoch: every worker trains over its
+    shard (the samples w::workers of the dataset) in mini-batches of
+    batchSize samples, the whole shard if None. The returned error is
+    the mean error of the pushed gradients, as in batch mode.
+        - SYNC mode: each step waits for the gradients of all the
+          workers with a batch left, their sum is one weight update,
+          so with batchSize None an epoch is a batch Backpropagation
+          epoch;
+        - ASYNC mode: each push is one weight update. Gradients
+          computed with weights more than staleness updates old are
+          rejected and recomputed, workers pull the weights when they
+          are staleness updates old.
+    The server listens on (host, port), any free port if 0, see
+    address. If spawn is True the workers are forked local processes,
+    otherwise workers remote nodes must connect (see work). The
+    server is started on the first call of train and kept until
+    close, instances of this class are stateful and must be closed to
+    release the workers."""
+
+    def __init__(self, net, workers=None, mode=SYNC, staleness=0,
+                 batchSize=None, host="127.0.0.1", port=0, spawn=True):
+        super().__init__()
+        if mode not in (SYNC, ASYNC):
+            raise ValueError("unknown mode %r" % (mode,))
+        self.net = net
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.staleness = staleness
+        self.batchSize = batchSize
+        self.address = None
+        self._host = host
+        self._port = port
+        self._spawn = spawn
+        self._algo = backprop.Backpropagation(net, True)
+        self._cond = threading.Condition()
+        self._listener = None
+        self._dataset = None
+        self._threads = []
+        self._procs = []
+
+    def start(self, dataset):
+        """Starts the server (and the local workers) for the dataset,
+        called by train for a new dataset. Remote workers may connect
+        to address once started."""
+
+        self.close()
+        self._dataset = dataset
+        dataset = list(dataset)
+        self._shards = [dataset[w::self.workers]
+                        for w in range(self.workers)]
+        self._state = self.net.state()
+        # frozen layers (see ffann.Net.setTrainable) get no gradients
+        self._trainable = [not t.frozen() for t in self._algo.trainers()]
+        self._epoch = 0
+        self._version = 0
+        self._active = 0
+        self._pending = 0
+        self._stopped = False
+        self._lost = False
+        self._listener = socket.create_server((self._host, self._port))
+        self.address = self._listener.getsockname()[:2]
+        if self._spawn:
+            # forked before the server threads are started
+            context = multiprocessing.get_context("fork")
+            for _ in range(self.workers):
+                p = context.Process(target=work, args=(self.address,),
+                                    daemon=True)
+                p.start()
+                self._procs.append(p)
+        accept = threading.Thread(target=self._accept, daemon=True)
+        accept.start()
+        self._threads = [accept]
+
+    def _accept(self):
+        for index in range(self.workers):
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                # closed
+                return
+            t = threading.Thread(target=self._serve, args=(sock, index),
+                                 daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _serve(self, sock, index):
+        epoch = 0
+        busy = False
+        with sock, sock.makefile("rwb") as f:
+            try:
+                while True:
+                    message = pickle.load(f)
+                    kind = message[0]
+                    if kind == "hello":
+                        reply = (self._state, self._trainable,
+                                 self._shards[index], self.batchSize)
+                    elif kind == "next":
+                        epoch, reply = self._next(epoch)
+                        if reply[0] == "stop":
+                            pickle.dump(reply, f)
+                            f.flush()
+                            return
+                        busy = True
+                    elif kind == "push":
+                        reply = self._push(*message[1:])
+                    else:
+                        self._done()
+                        busy = False
+                        reply = None
+                    pickle.dump(reply, f)
+                    f.flush()
+            except (EOFError, OSError):
+                with self._cond:
+                    self._lost = True
+                    if busy:
+                        self._done()
+                    self._cond.notify_all()
+
+    def _next(self, epoch):
+        """Waits for an epoch after the given one, returns the epoch
+        and the reply."""
+
+        with self._cond:
+            self._cond.wait_for(lambda: self._stopped or
+                                        self._epoch > epoch)
+            if self._stopped:
+                return epoch, ("stop",)
+            return self._epoch, ("epoch", self._version,
+                                 self.net.snapshot())
+
+    def _apply(self):
+        self._algo.updateWeights(self._LR, self._M)
+        self._version += 1
+        self._pending = 0
+        self._cond.notify_all()
+
+    def _push(self, version, error, count, grads):
+        with self._cond:
+            if self.mode == ASYNC and \
+               self._version - version > self.staleness:
+                return ("stale", self._version, self.net.snapshot())
+            for t, g in zip(self._algo.trainers(), grads):
+                if not t.frozen():
+                    t.accumulate(g)
+            self._error += error
+            self._count += count
+            if self.mode == ASYNC:
+                self._apply()
+                pull = self._version - version > self.staleness
+                return ("ok", self._version,
+                        pull and self.net.snapshot() or None)
+            step = self._version
+            self._pending += 1
+            if self._pending == self._active:
+                self._apply()
+            else:
+                self._cond.wait_for(lambda: self._version != step or
+                                            self._lost)
+            return ("ok", self._version, self.net.snapshot())
+
+    def _done(self):
+        with self._cond:
+            self._active -= 1
+            # the step waited for this worker
+            if self._pending and self._pending == self._active:
+                self._apply()
+            self._cond.notify_all()
+
+    def train(self, dataset, LR, M):
+        """Trains the net against the given dataset (a sequence of
+        2-element tuples, or weighted 3-element tuples, see
+        dataset.compact) with LR learning rate and M momentum for
+        one epoch. Returns the average error."""
+
+        if dataset is not self._dataset:
+            self.start(dataset)
+        with self._cond:
+            if self._lost:
+                raise RuntimeError("a worker node was lost")
+            self._LR = LR
+            self._M = M
+            self._error = 0.0
+            self._count = 0
+            self._active = self.workers
+            self._epoch += 1
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._active == 0 or self._lost)
+            if self._lost:
+                raise RuntimeError("a worker node was lost")
+            return self._error / self._count
+
+    def close(self):
+        """Stops the workers and the server."""
+
+        if self._listener is None:
+            return
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        try:
+            # wakes up the accept of missing workers
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        self._listener = None
+        for p in self._procs:
+            p.join()
+        for t in self._threads:
+            t.join()
+        self._procs = []
+        self._threads = []
+        self._dataset = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,87 @@
+"""Bulk prediction.
+
+Streams records through a net in fixed-size batches and writes the
+results incrementally, so memory use does not depend on the number
+of records."""
+
+import itertools, time
+
+from . import ffann
+from . import util
+
+__all__ = ["predict", "Throughput"]
+
+
+class Throughput(object):
+    """Number of processed records, the elapsed time and the time
+    spent scoring them (without reading and writing)."""
+
+    def __init__(self, count, seconds, scoring=0.0):
+        self.count = count
+        self.seconds = seconds
+        self.scoring = scoring
+
+    def rate(self):
+        """Records per second."""
+
+        return self.seconds and self.count / self.seconds or 0.0
+
+    def scoringRate(self):
+        """Records scored per second."""
+
+        return self.scoring and self.count / self.scoring or 0.0
+
+    def __repr__(self):
+        return "%d records in %.3fs (%.1f records/s, scoring " \
+               "%.1f records/s)" % (self.count, self.seconds, self.rate(),
+                                    self.scoringRate())
+
+
+def _scorer(net):
+    """Scoring function of a list of inputs: feedMany of an inference
+    model (see inference module), the feed function of a dense net
+    compiled once (see ffann.Net.freeze), spatial nets (see
+    ffann.ConvLayer) are fed input by input."""
+
+    feedMany = getattr(net, "feedMany", None)
+    if feedMany is not None:
+        return feedMany
+    if isinstance(net.layers()[0], ffann.InputLayer):
+        feed = net.freeze()
+    else:
+        feed = lambda input: tuple(net.feed(input))
+    return lambda inputs: [feed(i) for i in inputs]
+
+def predict(net, records, out, batchSize=1024, labels=None):
+    """Scores (value, input) records by the net, or an inference
+    model with feedMany (see inference module), and writes a line
+    per record to the file-like out:
+        value<TAB>label<TAB>outputs
+    where label is the index of the maximal output (or labels[index],
+    if labels is given) and outputs are the space separated output
+    signals. Records are read, scored and written batchSize at a time,
+    a dense net is compiled once (see ffann.Net.freeze), so its
+    weights must not change while predicting. Returns Throughput."""
+
+    start = time.perf_counter()
+    scoring = 0.0
+    count = 0
+    score = _scorer(net)
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batchSize))
+        if not batch:
+            break
+        started = time.perf_counter()
+        results = score([input for _, input in batch])
+        scoring += time.perf_counter() - started
+        lines = []
+        for (value, _), outputs in zip(batch, results):
+            label = util.argmax(outputs)
+            if labels is not None:
+                label = labels[label]
+            lines.append("%s\t%s\t%s\n" %
+                         (value, label, " ".join(map(repr, outputs))))
+        out.writelines(lines)
+        count += len(batch)
+    return Throughput(count, time.perf_counter() - start, scoring)
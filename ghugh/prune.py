@@ -0,0 +1,165 @@
+"""Weight and neuron pruning.
+
+Magnitude pruning zeroes small weights of a trained net. The pruned
+weights are described by a mask, which keeps them at zero while the
+net is fine-tuned (see Masked). Pruned nets are scored efficiently by
+inference.Sparse.
+
+Neuron pruning removes the weakest hidden neurons and builds a new,
+smaller net (see neurons)."""
+
+import math
+
+from .trainer import Algo
+from . import ffann
+from . import dataset as _dataset
+
+__all__ = ["magnitude", "apply", "sparsity", "Masked", "scores", "neurons"]
+
+
+def _weighted(net):
+    """(layer, number of neurons in the next layer) pairs."""
+
+    layers = net.layers()
+    return [(l, n.inputSize()) for l, n in zip(layers, layers[1:])]
+
+def magnitude(net, threshold=None, topk=None):
+    """Zeroes weights of the net with absolute values below the
+    threshold and/or all but topk largest (by absolute value) inbound
+    weights of each neuron. Weights of bias units are kept.
+    Returns the mask: for each weighted layer, rows of booleans
+    shaped as the layer weights (see _OLayer.weightsTo), True for
+    kept weights."""
+
+    if threshold is None and topk is None:
+        raise ValueError("threshold or topk needed")
+    mask = []
+    for l, ocount in _weighted(net):
+        shift = l.bias() and 1 or 0
+        rows = []
+        for j in range(ocount):
+            ws = l.weightsTo(j)
+            keep = [True] * len(ws)
+            candidates = range(shift, len(ws))
+            if threshold is not None:
+                for i in candidates:
+                    keep[i] = abs(ws[i]) >= threshold
+            if topk is not None:
+                ranked = sorted(candidates, key=lambda i: -abs(ws[i]))
+                for i in ranked[topk:]:
+                    keep[i] = False
+            rows.append(keep)
+        mask.append(rows)
+    apply(net, mask)
+    return mask
+
+def apply(net, mask):
+    """Zeroes the weights of the net not kept by the mask."""
+
+    for (l, ocount), rows in zip(_weighted(net), mask):
+        for j, keep in zip(range(ocount), rows):
+            ws = l.weightsTo(j)
+            for i, k in enumerate(keep):
+                if not k:
+                    ws[i] = 0.0
+    net.touch()
+
+def sparsity(mask):
+    """Fraction of pruned weights."""
+
+    kept = [k for rows in mask for keep in rows for k in keep]
+    return kept and kept.count(False) / len(kept) or 0.0
+
+
+class Masked(Algo):
+    """Training algorithm keeping pruned weights at zero. With an
+    algorithm providing weight trainers (e.g. backprop.Backpropagation,
+    see Weighted.setMask) the weights not kept by the mask and their
+    previous changes (momentum) are zeroed after each weight update,
+    otherwise the weights are zeroed after each epoch of the wrapped
+    algorithm. Used for fine-tuning pruned nets, e.g.
+        mask = prune.magnitude(net, topk=10)
+        algo = prune.Masked(backprop.Backpropagation(net), mask)
+        trainer.supervised(algo, dataset, LR, M, epoches)"""
+
+    def __init__(self, algo, mask):
+        super().__init__()
+        self.algo = algo
+        self.net = algo.net
+        self.mask = mask
+        trainers = getattr(algo, "trainers", None)
+        for t, rows in zip(trainers and trainers() or [], mask):
+            t.setMask([(j, i) for j, keep in enumerate(rows)
+                       for i, k in enumerate(keep) if not k] or None)
+
+    def train(self, dataset, LR, M):
+        error = self.algo.train(dataset, LR, M)
+        apply(self.net, self.mask)
+        return error
+
+
+def scores(net, by="weights", dataset=None):
+    """Scores hidden neurons (bias units excluded) of the net, returns
+    a list of scores per hidden layer. by is:
+        - "weights": the norm of the outbound weights of the neuron
+          (see _OLayer.weightsAt);
+        - "activations": the mean absolute contribution of the neuron
+          to the next layer over the dataset, i.e. the mean absolute
+          output times the norm of the outbound weights."""
+
+    if by not in ("weights", "activations"):
+        raise ValueError("Unknown score %r" % by)
+    if by == "activations" and dataset is None:
+        raise ValueError("dataset needed to score activations")
+    layers = net.layers()
+    result = []
+    for k in range(1, len(layers) - 1):
+        l = layers[k]
+        shift = l.bias() and 1 or 0
+        result.append([math.sqrt(sum(w*w for w in l.weightsAt(i)))
+                       for i in range(shift, len(l))])
+    if by == "activations":
+        means = [[0.0] * len(s) for s in result]
+        n = 0
+        for input, _, weight in _dataset.weighted(dataset):
+            net.activate(input)
+            for k, m in enumerate(means):
+                l = layers[k + 1]
+                shift = l.bias() and 1 or 0
+                for i in range(len(m)):
+                    m[i] += weight*abs(l[i + shift])
+            n += weight
+        result = [[mean/n*norm for mean, norm in zip(m, s)]
+                  for m, s in zip(means, result)]
+    return result
+
+def neurons(net, remove, by="weights", dataset=None):
+    """Builds a new net without the remove weakest (see scores)
+    neurons of each hidden layer. remove is a number for all hidden
+    layers or a sequence of numbers, one per hidden layer. At least
+    one neuron is kept in each layer. Layer activations must be
+    registered (see activation.register)."""
+
+    ss = scores(net, by, dataset)
+    if not hasattr(remove, "__len__"):
+        remove = [remove] * len(ss)
+    if len(remove) != len(ss):
+        raise ValueError("%d numbers needed, got %r" % (len(ss), remove))
+    state = net.state()
+    layers = state["layers"]
+    for k, (s, r) in enumerate(zip(ss, remove), 1):
+        r = min(r, len(s) - 1)
+        removed = set(sorted(range(len(s)), key=s.__getitem__)[:r])
+        if not removed:
+            continue
+        previous, current = layers[k - 1], layers[k]
+        previous["weights"] = [ws for j, ws in
+                               enumerate(previous["weights"])
+                               if j not in removed]
+        previous["ocount"] -= len(removed)
+        shift = current["bias"] is not None and 1 or 0
+        current["weights"] = [[w for i, w in enumerate(ws)
+                               if i - shift not in removed]
+                              for ws in current["weights"]]
+        current["count"] -= len(removed)
+    return ffann.Net.fromState(state)
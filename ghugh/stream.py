@@ -0,0 +1,118 @@
+"""Continual training over unbounded streams.
+
+Samples are consumed from an iterator as they arrive and trained in
+mini-batches by any training algorithm (see trainer.Algo). Each batch
+is followed by samples replayed from a bounded reservoir of the past
+stream, so older samples are not forgotten. Memory use does not depend
+on the length of the stream."""
+
+import collections, itertools, random, time
+
+from . import trainer
+from . import dataset as _dataset
+
+__all__ = ["Reservoir", "Progress", "train"]
+
+
+class Reservoir(object):
+    """Uniform random sample of at most capacity items of a stream
+    (reservoir sampling): after n added items each of them is kept
+    with probability capacity/n."""
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = capacity
+        self.seen = 0
+        self._items = []
+        self._random = random.Random(seed)
+
+    def add(self, item):
+        self.seen += 1
+        if len(self._items) < self.capacity:
+            self._items.append(item)
+        else:
+            i = self._random.randrange(self.seen)
+            if i < self.capacity:
+                self._items[i] = item
+
+    def sample(self, count):
+        """count (or less, if not enough) random items."""
+
+        return self._random.sample(self._items, min(count, len(self._items)))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Progress(object):
+    """Progress of the streaming training:
+        - samples: number of trained stream samples (counting the
+          weights, see dataset.weighted);
+        - updates: number of trained batches;
+        - seconds: elapsed time.
+    The rolling error is the mean error of the stream samples over the
+    last window batches."""
+
+    def __init__(self, window):
+        self.samples = 0
+        self.updates = 0
+        self.seconds = 0.0
+        self._window = collections.deque(maxlen=window)
+        self._start = time.perf_counter()
+
+    def add(self, error, count):
+        """Records the mean error of a batch of count samples."""
+
+        self._window.append((error*count, count))
+        self.samples += count
+        self.updates += 1
+        self.seconds = time.perf_counter() - self._start
+
+    def error(self):
+        """Rolling error, None before the first batch."""
+
+        if not self._window:
+            return None
+        return sum(e for e, _ in self._window) / \
+               sum(n for _, n in self._window)
+
+    def __repr__(self):
+        error = self.error()
+        return "%d samples in %d updates, %.3fs, rolling error %s" % \
+               (self.samples, self.updates, self.seconds,
+                error is None and "-" or "%.6f" % error)
+
+
+def train(algo, stream, learningRate, momentum, batchSize=1, replay=1.0,
+          capacity=1024, window=100, every=None, callback=None, seed=None):
+    """Trains the net of the algorithm by the samples of the stream (an
+    iterable, possibly unbounded) until it is exhausted. Each batch of
+    batchSize new samples is trained by algo.train (one weights update
+    in batch mode) and followed by a batch of replay*batchSize samples
+    drawn from the reservoir of capacity past samples. learningRate is
+    a number or a trainer.Schedule, its epoch is the number of updates
+    and its error is the rolling error. The rolling error is the mean
+    training error of new samples over the last window batches, i.e.
+    measured before the replay. If callback is given, it is called with
+    Progress every given updates. Returns Progress."""
+
+    schedule = learningRate
+    if not isinstance(schedule, trainer.Schedule):
+        schedule = trainer.Constant(learningRate)
+    reservoir = Reservoir(capacity, seed)
+    progress = Progress(window)
+    stream = iter(stream)
+    while True:
+        batch = list(itertools.islice(stream, batchSize))
+        if not batch:
+            break
+        LR = schedule.rate(progress.updates, progress.error())
+        progress.add(algo.train(batch, LR, momentum), _dataset.size(batch))
+        replayed = reservoir.sample(round(replay * len(batch)))
+        if replayed:
+            algo.train(replayed, LR, momentum)
+        for sample in batch:
+            reservoir.add(sample)
+        if callback is not None and every and \
+           progress.updates % every == 0:
+            callback(progress)
+    return progress
@@ -1,3 +1,4 @@
+import math
 from abc import abstractmethod
 
 class Algo(object):
@@ -7,14 +8,189 @@ class Algo(object):
     def train(self, dataset, LR, M):
         raise NotImplementedError
 
+
+class Schedule(object):
+    """Learning rate schedule interface. Instances are stateful,
+    a new instance is needed for each training."""
+
+    def __init__(self, LR):
+        self.LR = LR
+
+    @abstractmethod
+    def rate(self, epoch, error):
+        """Learning rate for the epoch (counted from 0), error is
+        the error of the previous epoch (None for the first one)."""
+        raise NotImplementedError
+
+
+class Constant(Schedule):
+    """Constant learning rate."""
+
+    def rate(self, epoch, error):
+        return self.LR
+
+
+class Step(Schedule):
+    """Learning rate multiplied by factor every given epochs."""
+
+    def __init__(self, LR, every, factor=0.5):
+        super().__init__(LR)
+        self.every = every
+        self.factor = factor
+
+    def rate(self, epoch, error):
+        return self.LR * self.factor ** (epoch // self.every)
+
+
+class Exponential(Schedule):
+    """Learning rate decayed as LR*decay**epoch."""
+
+    def __init__(self, LR, decay):
+        super().__init__(LR)
+        self.decay = decay
+
+    def rate(self, epoch, error):
+        return self.LR * self.decay ** epoch
+
+
+class Cosine(Schedule):
+    """Learning rate annealed from LR to minimum along the half
+    cosine wave over the given epoches."""
+
+    def __init__(self, LR, epoches, minimum=0.0):
+        super().__init__(LR)
+        self.epoches = epoches
+        self.minimum = minimum
+
+    def rate(self, epoch, error):
+        t = min(epoch, self.epoches) / self.epoches
+        return self.minimum + \
+               (self.LR - self.minimum) * (1.0 + math.cos(math.pi * t)) / 2.0
+
+
+class Plateau(Schedule):
+    """Learning rate multiplied by factor (down to minimum) when the
+    error does not improve by more than minDelta for patience
+    epochs."""
+
+    def __init__(self, LR, factor=0.5, patience=10, minDelta=0.0,
+                 minimum=0.0):
+        super().__init__(LR)
+        self.factor = factor
+        self.patience = patience
+        self.minDelta = minDelta
+        self.minimum = minimum
+        self._best = None
+        self._wait = 0
+
+    def rate(self, epoch, error):
+        if error is None:
+            return self.LR
+        if self._best is None or error < self._best - self.minDelta:
+            self._best = error
+            self._wait = 0
+        else:
+            self._wait += 1
+            if self._wait >= self.patience:
+                self.LR = max(self.minimum, self.LR * self.factor)
+                self._wait = 0
+        return self.LR
+
+
+CONVERGED = "converged"
+EPOCHES = "epoches"
+PLATEAU = "plateau"
+DIVERGED = "diverged"
+
+class Result(tuple):
+    """(converged, error) tuple returned by supervised with details
+    of the training:
+        - reason: why the training stopped, one of CONVERGED, EPOCHES,
+                  PLATEAU or DIVERGED;
+        - epochs: number of trained epochs;
+        - best: the lowest epoch error, validation error if validated;
+        - restored: True if the weights of the best epoch
+                    were restored;
+        - validation: the last validation evaluation (see
+                      evaluation.Evaluation), of the best epoch if
+                      restored, None without validation."""
+
+    def __new__(cls, converged, error, reason, epochs, best,
+                restored=False, validation=None):
+        result = super().__new__(cls, (converged, error))
+        result.reason = reason
+        result.epochs = epochs
+        result.best = best
+        result.restored = restored
+        result.validation = validation
+        return result
+
+    def __repr__(self):
+        return "Result(converged=%r, error=%r, reason=%r, epochs=%d)" % \
+               (self[0], self[1], self.reason, self.epochs)
+
+
 def supervised(algo, dataset,
                learningRate, momentum,
-               epoches, E=0.001):
+               epoches, E=0.001,
+               patience=None, minDelta=0.0, divergence=None,
+               restore=False, validation=None, every=1):
     """Supervised training on the given dataset (a sequence of
-    2-element tuples). Returns a tuple of (converged, error)."""
+    2-element tuples). learningRate is a number or a Schedule.
+    Training stops early when:
+        - the error is below E (converged);
+        - patience is not None and the error has not improved by
+          more than minDelta for patience epochs (plateau);
+        - divergence is not None and the error exceeds divergence
+          times the lowest error so far or is not a number (diverged).
+    validation is a callable returning an evaluation of the net over a
+    held-out dataset (see evaluation.Evaluator), called every given
+    epochs. If given, plateau, divergence and the best epoch are
+    detected by the validation error, checked on validated epochs.
+    If restore is True, the weights of the best epoch are restored at
+    the end (see ffann.Net.snapshot) and the training error of that
+    epoch is returned. Returns a Result, a tuple of (converged, error)."""
 
+    schedule = learningRate
+    if not isinstance(schedule, Schedule):
+        schedule = Constant(learningRate)
+    net = restore and algo.net or None
+    best = lowest = snapshot = e = None
+    bestError = bestEvaluation = evaluation = monitored = None
+    bestEpoch = 0
+    reason = EPOCHES
+    epochs = 0
     for i in range(epoches):
-        e = algo.train(dataset, learningRate, momentum)
+        e = algo.train(dataset, schedule.rate(i, e), momentum)
+        epochs = i + 1
         if e <= E:
-            return True, e
-    return False, e
+            if validation is not None:
+                evaluation = validation()
+            return Result(True, e, CONVERGED, epochs, e,
+                          validation=evaluation)
+        if validation is None:
+            monitored = e
+        elif epochs % every:
+            continue
+        else:
+            evaluation = validation()
+            monitored = evaluation.error()
+        if lowest is None or monitored < lowest:
+            lowest = monitored
+        if divergence is not None and best is not None and \
+           not monitored <= divergence * best:
+            reason = DIVERGED
+            break
+        if best is None or monitored < best - minDelta:
+            best, bestEpoch = monitored, i
+            bestError, bestEvaluation = e, evaluation
+            if net is not None:
+                snapshot = net.snapshot()
+        elif patience is not None and i - bestEpoch >= patience:
+            reason = PLATEAU
+            break
+    restored = snapshot is not None and not monitored <= best
+    if restored:
+        net.restore(snapshot)
+        e, evaluation = bestError, bestEvaluation
+    return Result(False, e, reason, epochs, lowest, restored, evaluation)
@@ -1,4 +1,4 @@
-import itertools, functools, collections
+import itertools, functools, collections, array, hashlib, operator, sys
 
 def compose(*functions, unpack=False):
     """Function composition as:
@@ -15,6 +15,11 @@ def compose(*functions, unpack=False):
                          functions[0](*args, **kwargs))
     return f
 
+def argmax(values):
+    """Index of the maximal value, the first one if repeated."""
+
+    return max(range(len(values)), key=values.__getitem__)
+
 class _Cursor(collections.MutableSequence):
     """Mutable orthogonal view (e.g. a column in 2-dim matrix represented
     as a list of rows):
@@ -58,8 +63,8 @@ class _Transposed(collections.Sequence):
     """
 
     def __init__(self, target):
-        self.columns = tuple(_Cursor(target, i)
-                             for i in range(len(target[0])))
+        count = len(target) and len(target[0]) or 0
+        self.columns = tuple(_Cursor(target, i) for i in range(count))
 
     def __len__(self):
         return len(self.columns)
@@ -67,7 +72,220 @@ class _Transposed(collections.Sequence):
     def __getitem__(self, i):
         return self.columns[i]
 
+class Matrix(collections.Sequence):
+    """2-dim matrix of doubles stored row-major in a flat array('d').
+    Items are mutable row views, columns are mutable strided views,
+    both memoryviews sharing the storage (no copies):
+    m = Matrix([[1, 2, 3],
+                [4, 5, 6]])
+    m[1][2] = 7     # m == [[1, 2, 3], [4, 5, 7]]
+    m.column(0)[1]  # 4.0
+    """
+
+    def __init__(self, rows):
+        """Copies the rows (sequences of equal length) of numbers."""
+
+        self.shape = (len(rows), len(rows) and len(rows[0]) or 0)
+        if any(len(r) != self.shape[1] for r in rows):
+            raise ValueError("Rows of %d numbers expected" % self.shape[1])
+        self._data = array.array('d', (x for r in rows for x in r))
+        self._setup()
+
+    @classmethod
+    def zeros(cls, rows, columns):
+        m = cls.__new__(cls)
+        m.shape = (rows, columns)
+        m._data = array.array('d', bytes(8 * rows * columns))
+        m._setup()
+        return m
+
+    def _setup(self):
+        count, size = self.shape
+        self._view = memoryview(self._data)
+        self._rows = tuple(self._view[i*size:(i + 1)*size]
+                           for i in range(count))
+        self._columns = tuple(self._view[j::size] for j in range(size))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        return self._rows[index]
+
+    def column(self, index):
+        return self._columns[index]
+
+    def transposed(self):
+        """Column views, indexed as a transposed matrix."""
+
+        return self._columns
+
+    def data(self):
+        """The flat storage, row-major."""
+
+        return self._data
+
+    def fill(self, value):
+        self._view[:] = array.array('d', [value]) * len(self._data)
+
+    def axpy(self, a, x):
+        """self = self + a*x, x is a matrix of the same shape."""
+
+        if x.shape != self.shape:
+            raise ValueError("%r shape expected, got %r" %
+                             (self.shape, x.shape))
+        self._view[:] = array.array('d', map(lambda s, v: s + a*v,
+                                             self._data, x._data))
+
+    def dot(self, values):
+        """Product with the column vector values: sums of the values
+        weighted by each row."""
+
+        return [sum(map(operator.mul, values, r)) for r in self._rows]
+
+    def tdot(self, values):
+        """Product of the row vector values and the matrix: sums of
+        the values weighted by each column."""
+
+        return [sum(map(operator.mul, values, c)) for c in self._columns]
+
+    def tolist(self):
+        return [r.tolist() for r in self._rows]
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.Sequence) or \
+           len(other) != len(self):
+            return False
+        return all(len(r) == len(o) and all(map(operator.eq, r, o))
+                   for r, o in zip(self._rows, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Matrix(%r)" % self.tolist()
+
+
+def nbytes(matrix):
+    """Approximate memory size in bytes of the storage of a matrix:
+    the array of a Matrix, the buffers of arrays and memoryviews (e.g.
+    NumPy arrays) or the lists and boxed floats of nested lists.
+    0 for None."""
+
+    if matrix is None:
+        return 0
+    if isinstance(matrix, Matrix):
+        return matrix.data().itemsize * len(matrix.data())
+    size = getattr(matrix, "nbytes", None)
+    if isinstance(size, int):
+        return size
+    size = sys.getsizeof(matrix)
+    for row in matrix:
+        rsize = getattr(row, "nbytes", None)
+        if isinstance(rsize, int):
+            size += rsize
+        else:
+            size += sys.getsizeof(row) + len(row) * sys.getsizeof(0.0)
+    return size
+
 def transposed(matrix):
-    """2-dim matrix transposition."""
+    """2-dim matrix transposition. The columns of a Matrix are
+    its strided views, otherwise _Cursor views."""
 
+    if isinstance(matrix, Matrix):
+        return matrix.transposed()
     return _Transposed(matrix)
+
+def digest(values):
+    """Compact hash of a numeric vector: 16 bytes digest of the
+    values packed as doubles."""
+
+    return hashlib.blake2b(array.array('d', values).tobytes(),
+                           digest_size=16).digest()
+
+class LRUCache(object):
+    """Bounded mapping discarding the least recently used items
+    when full. Counts hits and misses of get."""
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """Discards the items, statistics are kept."""
+
+        self._items.clear()
+
+    def info(self):
+        """Returns a dict of hits, misses, size and current size."""
+
+        return {"hits": self.hits, "misses": self.misses,
+                "size": self.size, "currsize": len(self._items)}
+
+
+def _flatten(nested, values):
+    for x in nested:
+        if isinstance(x, (list, tuple)):
+            _flatten(x, values)
+        elif x is not None:
+            values.append(x)
+    return values
+
+def _unflatten(template, values):
+    if isinstance(template, (list, tuple)):
+        return type(template)(_unflatten(t, values) for t in template)
+    if template is None:
+        return None
+    return next(values)
+
+class SharedSnapshot(object):
+    """Weights of a net (see ffann.Net.snapshot) with their version
+    in shared memory, published by the process which created it and
+    synchronized by the processes forked after it. Publishing must not
+    overlap synchronizing, e.g. workers are idle while published."""
+
+    def __init__(self, net):
+        import multiprocessing
+        context = multiprocessing.get_context("fork")
+        self._template = net.snapshot()
+        self._values = context.RawArray('d', len(_flatten(self._template,
+                                                          [])))
+        self._version = context.RawValue('q', -1)
+        self._synced = -1
+
+    def publish(self, net):
+        """Copies the weights of the net if its version changed."""
+
+        if net.version() != self._version.value:
+            self._values[:] = _flatten(net.snapshot(), [])
+            self._version.value = net.version()
+
+    def sync(self, net):
+        """Restores the published weights to the net (a copy in the
+        process) if not restored yet, returns the net."""
+
+        version = self._version.value
+        if version != self._synced:
+            net.restore(_unflatten(self._template, iter(self._values[:])))
+            self._synced = version
+        return net
@@ -1,9 +1,12 @@
-import sys
+import sys, argparse, contextlib
 
 from ghugh import ffann
 from ghugh import trainer
 from ghugh import backprop
-from data import read
+from ghugh import predict
+from ghugh import evaluation
+from ghugh import paramserver
+from data import read, binary, ingest
 
 
 def testXOR():
@@ -57,9 +60,11 @@ def testDATA():
     converged, error = trainer.supervised(algo, data, 0.1, 0.0, 500)
     print("Converged:", converged,)
     print("Error:", error)
-    for input, v in data:
-        print(v, list(net.feed(input)))
+    print(evaluation.evaluate(net, data))
 
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w") as f:
+            ffann.dump(net, f)
 
     ONE="""*********
 **** ****
@@ -86,6 +91,70 @@ def testDATA():
     print("1", [round(o) for o in net.feed(one)])
     print("2", [round(o) for o in net.feed(two)])
 
+def predictDATA(args):
+    parser = argparse.ArgumentParser(prog="main.py predict",
+                                     description="Scores glyph records "
+                                     "with a model saved by ffann.dump.")
+    parser.add_argument("model")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="records file, - for stdin")
+    parser.add_argument("output", nargs="?", default="-",
+                        help="results file, - for stdout")
+    parser.add_argument("--binary", action="store_true",
+                        help="records are in the binary format")
+    parser.add_argument("--batch", type=int, default=1024)
+    args = parser.parse_args(args)
+
+    with open(args.model) as f:
+        net = ffann.load(f)
+    with contextlib.ExitStack() as files:
+        if args.binary:
+            input = args.input == "-" and sys.stdin.buffer or \
+                    files.enter_context(open(args.input, "rb"))
+            records = binary.iread(input)
+        else:
+            input = args.input == "-" and sys.stdin or \
+                    files.enter_context(open(args.input))
+            records = read.iread(input)
+        output = args.output == "-" and sys.stdout or \
+                 files.enter_context(open(args.output, "w"))
+        throughput = predict.predict(net, records, output, args.batch)
+    print(throughput, file=sys.stderr)
+
+def ingestDATA(args):
+    parser = argparse.ArgumentParser(prog="main.py ingest",
+                                     description="Merges glyph shard "
+                                     "files into one binary records file.")
+    parser.add_argument("shards", help="directory or glob pattern")
+    parser.add_argument("output")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(args)
+
+    with open(args.output, "wb") as f:
+        ingested = ingest.ingest(args.shards, f, args.workers)
+    print(ingested, file=sys.stderr)
+    for value, count in ingested.labels.items():
+        print("%s\t%d" % (value, count), file=sys.stderr)
+
+def workDATA(args):
+    parser = argparse.ArgumentParser(prog="main.py worker",
+                                     description="Runs a worker node of "
+                                     "a paramserver.ParameterServer.")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    args = parser.parse_args(args)
+
+    paramserver.work((args.host, args.port))
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["predict"]:
+        predictDATA(sys.argv[2:])
+        sys.exit(0)
+    if sys.argv[1:2] == ["ingest"]:
+        ingestDATA(sys.argv[2:])
+        sys.exit(0)
+    if sys.argv[1:2] == ["worker"]:
+        workDATA(sys.argv[2:])
+        sys.exit(0)
     testDATA()
     #testXOR()
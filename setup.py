@@ -5,6 +5,6 @@ setup(name='ghugh',
       description='Machine Learning Library',
       author='khachik',
       url='https://github.com/khachik/ghugh',
-      packages=['ghugh'],
+      packages=['ghugh', 'ghugh.backends'],
       license='See LICENSE.txt'
      )
@@ -0,0 +1,32 @@
+import random
+
+from ghugh.ffann import *
+
+def randomWeights(seed):
+    r = random.Random(seed)
+    return lambda *args: r.uniform(-1, 1)
+
+def randomNet(seed, *sizes, bias=1, backend=None, **hidden):
+    # dense net of the layer sizes, (2, 3, 4, 1) by default, hidden
+    # are keyword arguments of the hidden layers
+    sizes = sizes or (2, 3, 4, 1)
+    w = randomWeights(seed)
+    layers = [InputLayer(sizes[0], sizes[1], iweights=w, bias=bias)]
+    for count, ocount in zip(sizes[1:-1], sizes[2:]):
+        layers.append(HiddenLayer(count, ocount, iweights=w, bias=bias,
+                                  **hidden))
+    layers.append(OutputLayer(sizes[-1]))
+    return Net(*layers, backend=backend)
+
+def convNet(seed, convs=2, backend=None):
+    # convs layers of two 2x2 kernels down to 3x3 images, a pooling,
+    # a hidden and an output layer
+    w = randomWeights(seed)
+    size = 3 + convs
+    layers = [ConvLayer((size, size), 2, 2, kweights=w)]
+    for s in range(size - 1, 3, -1):
+        layers.append(ConvLayer((s, s, 2), 2, 2, kweights=w))
+    layers.extend([PoolLayer((3, 3, 2), 2, ocount=3, iweights=w, bias=1),
+                   HiddenLayer(3, 2, iweights=w, bias=1),
+                   OutputLayer(2)])
+    return Net(*layers, backend=backend)
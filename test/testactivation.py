@@ -0,0 +1,72 @@
+import math, unittest
+
+from ghugh import activation
+from ghugh.activation import *
+
+class TestRegistry(unittest.TestCase):
+
+    def testNames(self):
+        for name in ("sigmoid", "tanh", "relu", "leakyRelu", "identity"):
+            self.assertTrue(name in names())
+            self.assertEqual(name, get(name).name)
+
+    def testUnknown(self):
+        self.assertRaises(ValueError, get, "nosuch")
+
+    def testFind(self):
+        self.assertTrue(get("sigmoid") is find(sigmoid))
+        self.assertTrue(get("sigmoid") is find(sigmoid, dsigmoid))
+        self.assertTrue(get("tanh") is find("tanh"))
+        f = lambda x: x
+        a = find(f, lambda y: 1)
+        self.assertEqual(None, a.name)
+        self.assertTrue(a.function is f)
+
+    def testRegister(self):
+        a = Activation("square", lambda x: x*x, lambda y: 2*math.sqrt(y))
+        register(a)
+        self.addCleanup(activation._registry.pop, "square")
+        self.assertTrue(a is get("square"))
+        self.assertRaises(ValueError, register,
+                          Activation(None, abs, abs))
+
+
+class TestVectorized(unittest.TestCase):
+
+    def setUp(self):
+        self.xs = [-50.0, -2.0, -0.5, 0.0, 0.5, 2.0, 50.0]
+
+    def testForms(self):
+        for name in names():
+            a = get(name)
+            ys = [a.function(x) for x in self.xs]
+            for y, vy in zip(ys, a.vfunction(self.xs)):
+                self.assertAlmostEqual(y, vy)
+            if name == "sigmoid":
+                # the scalar derivative rejects saturated values
+                ys = ys[1:-1]
+            for dy, vdy in zip((a.dfunction(y) for y in ys),
+                               a.vdfunction(ys)):
+                self.assertAlmostEqual(dy, vdy)
+
+    def testDerivatives(self):
+        for name in ("tanh", "sigmoid"):
+            a = get(name)
+            for x in self.xs[1:-1]:
+                h = 1e-6
+                d = (a.function(x + h) - a.function(x - h))/(2*h)
+                self.assertAlmostEqual(d, a.dfunction(a.function(x)))
+
+    def testRelu(self):
+        self.assertEqual([0.0, 0.0, 2.0],
+                         get("relu").vfunction([-1.0, 0.0, 2.0]))
+        self.assertEqual([0.0, 0.0, 1.0],
+                         get("relu").vdfunction([0.0, 0.0, 2.0]))
+        self.assertEqual([-0.01, 2.0],
+                         get("leakyRelu").vfunction([-1.0, 2.0]))
+        self.assertEqual([activation.LEAK, 1.0],
+                         get("leakyRelu").vdfunction([-0.01, 2.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
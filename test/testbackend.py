@@ -0,0 +1,150 @@
+import functools, io, os, random, subprocess, sys, threading, types, unittest
+
+from ghugh import backend
+from ghugh.ffann import *
+from ghugh.backprop import Backpropagation, ParallelBackpropagation
+
+from nets import randomNet, convNet
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# set (e.g. in CI) to fail instead of skipping the numpy backend tests
+REQUIRED = os.environ.get("GHUGH_TEST_NUMPY")
+skipNumpy = unittest.skipIf(numpy is None and not REQUIRED,
+                            "numpy is not installed")
+
+
+class TestBackend(unittest.TestCase):
+
+    def testGet(self):
+        self.assertEqual("array", backend.get("array").NAME)
+        self.assertIs(backend.get("array"), backend.get(backend.get("array")))
+        self.assertRaises(ValueError, backend.get, "fortran")
+        self.assertEqual(["array", "numpy", "pure"], backend.names())
+
+    def testEnvironment(self):
+        old = os.environ.get(backend.ENVIRONMENT)
+        os.environ[backend.ENVIRONMENT] = "array"
+        try:
+            self.assertEqual("array", randomNet(1, 3, 4, 2).backend().NAME)
+            net = randomNet(1, 3, 4, 2, backend="pure")
+            self.assertEqual("pure", net.backend().NAME)
+        finally:
+            if old is None:
+                del os.environ[backend.ENVIRONMENT]
+            else:
+                os.environ[backend.ENVIRONMENT] = old
+
+    def testLazy(self):
+        code = "import sys, ghugh; ghugh.ffann; " \
+               "print('numpy' in sys.modules, " \
+               "'ghugh.backends.array' in sys.modules, " \
+               "'ghugh.hogwild' in sys.modules)"
+        env = dict(os.environ)
+        env.pop(backend.ENVIRONMENT, None)
+        output = subprocess.check_output([sys.executable, "-c", code],
+                                         env=env)
+        self.assertEqual(b"False False False", output.strip())
+
+    def assertSameNets(self, name,
+                       build=functools.partial(randomNet, 3, 3, 4, 2),
+                       dataset=None, top=None):
+        net1 = build(backend="pure")
+        net2 = build(backend=name)
+        self.assertEqual(name, net2.backend().NAME)
+        dataset = dataset or [([1, 0, 1], [1, 0]), ([0, 1, 1], [0, 1])]
+        net1.setTrainable(top)
+        net2.setTrainable(top)
+        for batch in (False, True):
+            algo1 = Backpropagation(net1, batch)
+            algo2 = Backpropagation(net2, batch)
+            for _ in range(3):
+                self.assertAlmostEqual(algo1.train(dataset, 0.5, 0.3),
+                                       algo2.train(dataset, 0.5, 0.3))
+        # spatial nets are not compiled
+        dense = isinstance(net2.layers()[0], InputLayer)
+        for i, o in dataset:
+            for o1, o2 in zip(net1.feed(i), net2.feed(i)):
+                self.assertAlmostEqual(o1, o2)
+            if dense:
+                for o1, o2 in zip(net1.feed(i), net2.freeze()(i)):
+                    self.assertAlmostEqual(o1, o2)
+        f = io.StringIO()
+        dump(net2, f)
+        f.seek(0)
+        i = dataset[0][0]
+        self.assertEqual(list(net2.feed(i)), list(load(f, name).feed(i)))
+
+    def assertSameConvNets(self, name):
+        r = random.Random(5)
+        dataset = [([r.random() for _ in range(16)], [1, 0]),
+                   ([r.random() for _ in range(16)], [0, 1])]
+        build = functools.partial(convNet, 3, 1)
+        self.assertSameNets(name, build, dataset)
+        self.assertSameNets(name, build, dataset, top=2)
+
+    def testArray(self):
+        self.assertSameNets("array")
+        self.assertSameNets("array", top=1)
+        self.assertSameConvNets("array")
+
+    @skipNumpy
+    def testNumpy(self):
+        self.assertSameNets("numpy")
+        self.assertSameNets("numpy", top=1)
+        self.assertSameConvNets("numpy")
+
+    @skipNumpy
+    def testNumpyVectorized(self):
+        net = randomNet(3, 3, 4, 2, backend="numpy")
+        for batch in (False, True):
+            algo = Backpropagation(net, batch)
+            algo.train([([1, 0, 1], [1, 0])], 0.5, 0.3)
+            for t in algo.trainers():
+                self.assertIs(net.backend(), t._vectorized(None))
+                self.assertIsInstance(t._oldWDeltas, numpy.ndarray)
+
+    @skipNumpy
+    def testNumpyParallel(self):
+        # the pool threads compute the shards by the batch kernels on
+        # the weights of the net, which are never copied
+        calls = []
+        def traced(name, f):
+            def kernel(*args):
+                calls.append((name, threading.current_thread()))
+                return f(*args)
+            return kernel
+        module = backend.get("numpy")
+        kernels = dict(vars(module))
+        for name in ("matrix", "batchDot", "batchTdot", "outerSum"):
+            kernels[name] = traced(name, kernels[name])
+        net1 = randomNet(5, 3, 4, 2, backend="numpy")
+        net2 = randomNet(5, 3, 4, 2,
+                         backend=types.SimpleNamespace(**kernels))
+        weights = [l.weights() for l in net2.layers()[:-1]]
+        del calls[:]
+        r = random.Random(2)
+        dataset = [([r.random() for _ in range(3)], [r.randint(0, 1), 1])
+                   for _ in range(8)]
+        algo1 = Backpropagation(net1, batch=True)
+        with ParallelBackpropagation(net2, threads=2) as algo2:
+            for _ in range(3):
+                self.assertAlmostEqual(algo1.train(dataset, 0.5, 0.3),
+                                       algo2.train(dataset, 0.5, 0.3))
+        names = [name for name, _ in calls]
+        self.assertNotIn("matrix", names)
+        # two shards of two layers per epoch
+        self.assertEqual(3*2*2, names.count("batchDot"))
+        self.assertEqual(3*2*2, names.count("outerSum"))
+        self.assertNotIn(threading.current_thread(),
+                         [thread for _, thread in calls])
+        for ws, l1, l2 in zip(weights, net1.layers(), net2.layers()):
+            self.assertIs(ws, l2.weights())
+            self.assertTrue(numpy.allclose(l1.weights(), ws))
+
+
+if __name__ == "__main__":
+    unittest.main()
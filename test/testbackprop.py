@@ -1,8 +1,11 @@
-import math, unittest, collections
+import math, random, unittest, collections
 from ghugh import util
 
 from ghugh.ffann import *
 from ghugh.backprop import *
+from ghugh.dataset import compact
+
+from nets import randomNet, convNet
 
 class Layer(collections.Sequence):
     def __init__(self, outputs):
@@ -354,6 +357,17 @@ class TestBackpropagation(BackpropAlgo):
     def test0(self):
         self.algo.train(self.dataset, 0.1, 0.2)
 
+    def testCacheInvalidation(self):
+        cache = self.net.cache(10)
+        before = [tuple(self.net.feed(i)) for i, _ in self.dataset]
+        self.algo.train(self.dataset, 0.1, 0.2)
+        after = [tuple(self.net.feed(i)) for i, _ in self.dataset]
+        self.assertNotEqual(before, after)
+        self.assertEqual(0, cache.info()["hits"])
+        self.assertEqual(after, [tuple(self.net.feed(i))
+                                 for i, _ in self.dataset])
+        self.assertEqual(len(self.dataset), cache.info()["hits"])
+
 
 class TestBackpropagationOnlineNoBias(TestBackpropagation,
                                       unittest.TestCase):
@@ -383,5 +397,432 @@ class TestBackpropagationBatchBias(TestBackpropagation,
         super().init(1, True)
 
 
+def assertSameWeights(test, net1, net2):
+    for l1, l2 in zip(net1.layers()[:-1], net2.layers()[:-1]):
+        for ws1, ws2 in zip(l1._weights, l2._weights):
+            for w1, w2 in zip(ws1, ws2):
+                test.assertAlmostEqual(w1, w2)
+
+
+class TestGradients(unittest.TestCase):
+
+    def setUp(self):
+        self.net = randomNet(7)
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]]
+
+    def testStateless(self):
+        self.net.feed((1, 0))
+        outputs = [list(l) for l in self.net.layers()]
+        weights = self.net.state()
+        gradients(self.net, self.dataset)
+        self.assertEqual(outputs, [list(l) for l in self.net.layers()])
+        self.assertEqual(weights, self.net.state())
+
+    def testBatch(self):
+        # the gradients are the weight changes accumulated in batch mode
+        algo = Backpropagation(self.net, batch=True)
+        error = sum(algo.propagate(i, e, 1, 0) for i, e in self.dataset)
+        e, grads = gradients(self.net, self.dataset)
+        self.assertAlmostEqual(error, e)
+        for t, g in zip(algo.trainers(), grads):
+            for dws, gs in zip(t._wDeltas, g):
+                for dw, g in zip(dws, gs):
+                    self.assertAlmostEqual(dw, g)
+
+
+class TestWeighted(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[1, 0], [1]],
+                        [[0, 0], [0]],
+                        [[1, 0], [1]]]
+
+    def testBatch(self):
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        algo1 = Backpropagation(net1, batch=True)
+        algo2 = Backpropagation(net2, batch=True)
+        compacted = compact(self.dataset)
+        self.assertEqual(4, len(compacted))
+        for _ in range(5):
+            self.assertAlmostEqual(algo1.train(self.dataset, 0.5, 0.3),
+                                   algo2.train(compacted, 0.5, 0.3))
+        assertSameWeights(self, net1, net2)
+
+    def testParallel(self):
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        algo1 = Backpropagation(net1, batch=True)
+        with ParallelBackpropagation(net2, threads=2) as algo2:
+            for _ in range(5):
+                self.assertAlmostEqual(
+                    algo1.train(self.dataset, 0.5, 0.3),
+                    algo2.train(compact(self.dataset), 0.5, 0.3))
+        assertSameWeights(self, net1, net2)
+
+    def testOnline(self):
+        # weight scales the learning rate in online mode
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        algo1 = Backpropagation(net1)
+        algo2 = Backpropagation(net2)
+        error1 = algo1.propagate([1, 0], [1], 0.3, 0.0, 3)
+        error2 = algo2.propagate([1, 0], [1], 0.9, 0.0)
+        self.assertAlmostEqual(error1, 3*error2)
+        assertSameWeights(self, net1, net2)
+
+
+class TestMiningBackpropagation(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]]
+
+    def testFirstEpoch(self):
+        # all samples are propagated as in online mode
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        error1 = Backpropagation(net1).train(self.dataset, 0.5, 0.3)
+        algo2 = MiningBackpropagation(net2, threshold=1.0)
+        self.assertAlmostEqual(error1, algo2.train(self.dataset, 0.5, 0.3))
+        self.assertEqual(0, algo2.skipped)
+        assertSameWeights(self, net1, net2)
+
+    def testSkipped(self):
+        net = randomNet(5)
+        algo = MiningBackpropagation(net, threshold=1.0, every=3)
+        error = algo.train(self.dataset, 0.5, 0.3)
+        state = net.state()
+        # well-learned samples are skipped, their last errors reported
+        self.assertAlmostEqual(error, algo.train(self.dataset, 0.5, 0.3))
+        self.assertEqual(4, algo.skipped)
+        self.assertEqual(state, net.state())
+        algo.train(self.dataset, 0.5, 0.3)
+        # rechecked
+        algo.train(self.dataset, 0.5, 0.3)
+        self.assertEqual(0, algo.skipped)
+        self.assertNotEqual(state, net.state())
+
+    def testThreshold(self):
+        algo = MiningBackpropagation(randomNet(5), threshold=0.0)
+        for _ in range(3):
+            algo.train(self.dataset, 0.5, 0.3)
+            self.assertEqual(0, algo.skipped)
+
+    def testWeighted(self):
+        # the threshold applies per unit of weight
+        algo = MiningBackpropagation(randomNet(5))
+        algo.train(compact(self.dataset), 0.5, 0.3)
+        algo._errors = [0.003, 0.003, 0.001, 0.001]
+        algo.threshold = 0.001
+        algo.train([s + [2] for s in self.dataset], 0.5, 0.3)
+        self.assertEqual(4, algo.skipped)
+
+    def testLearns(self):
+        algo = MiningBackpropagation(randomNet(5), seed=1, keep=0.1)
+        skipped = 0
+        for _ in range(2000):
+            error = algo.train(self.dataset, 0.5, 0.3)
+            skipped += algo.skipped
+        self.assertLess(error, 0.001)
+        self.assertGreater(skipped, 0)
+
+
+class TestFrozen(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]]
+
+    def layerWeights(self, net):
+        return [[list(ws) for ws in l._weights] for l in net.layers()[:-1]]
+
+    def assertWeights(self, expected, net):
+        for ws1, ws2 in zip(expected, self.layerWeights(net)):
+            for w1, w2 in zip(ws1, ws2):
+                for a, b in zip(w1, w2):
+                    self.assertAlmostEqual(a, b)
+
+    def testFrozen(self):
+        # errors pass through the frozen hidden layer unchanged
+        for batch in (False, True):
+            net1 = randomNet(5)
+            net2 = randomNet(5)
+            initial = self.layerWeights(net2)
+            net2.layers()[1].setTrainable(False)
+            Backpropagation(net1, batch).train(self.dataset[:1], 0.5, 0.3)
+            algo = Backpropagation(net2, batch)
+            algo.train(self.dataset[:1], 0.5, 0.3)
+            trained = self.layerWeights(net1)
+            self.assertWeights([trained[0], initial[1], trained[2]], net2)
+            self.assertEqual(0, algo.footprint()[1]["momentum"] +
+                                algo.footprint()[1]["accumulator"])
+
+    def testLowest(self):
+        net = randomNet(5)
+        net.setTrainable(1)
+        initial = self.layerWeights(net)
+        algo = Backpropagation(net)
+        self.assertEqual(2, algo._lowest)
+        algo.train(self.dataset, 0.5, 0.3)
+        self.assertEqual(initial[:2], self.layerWeights(net)[:2])
+        self.assertNotEqual(initial[2], self.layerWeights(net)[2])
+
+    def testGradients(self):
+        # frozen layers get no gradients
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        net2.setTrainable(2)
+        _, grads1 = gradients(net1, self.dataset)
+        _, grads2 = gradients(net2, self.dataset)
+        self.assertEqual([None, grads1[1], grads1[2]], grads2)
+        net2.layers()[2].setTrainable(False)
+        _, grads2 = gradients(net2, self.dataset)
+        self.assertEqual([None, grads1[1], None], grads2)
+
+    def testParallel(self):
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        net1.setTrainable(1)
+        net2.setTrainable(1)
+        algo1 = Backpropagation(net1, batch=True)
+        with ParallelBackpropagation(net2, threads=2) as algo2:
+            for _ in range(3):
+                self.assertAlmostEqual(algo1.train(self.dataset, 0.5, 0.3),
+                                       algo2.train(self.dataset, 0.5, 0.3))
+            # no accumulator for the frozen layers
+            self.assertEqual([None, None],
+                             [t._wDeltas for t in algo2.trainers()[:2]])
+        assertSameWeights(self, net1, net2)
+
+    def testCache(self):
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        net1.setTrainable(2)
+        net2.setTrainable(2)
+        algo1 = Backpropagation(net1)
+        algo2 = Backpropagation(net2, cache=16)
+        self.assertTrue(algo1.cache() is None)
+        for _ in range(3):
+            self.assertAlmostEqual(algo1.train(self.dataset, 0.5, 0.3),
+                                   algo2.train(self.dataset, 0.5, 0.3))
+        self.assertEqual({"hits": 8, "misses": 4, "size": 16,
+                          "currsize": 4}, algo2.cache().info())
+        assertSameWeights(self, net1, net2)
+        # nothing to cache below the input layer
+        self.assertTrue(Backpropagation(randomNet(5), cache=16).cache()
+                        is None)
+
+    def testConvCache(self):
+        # the lowest trainable layer is convolutional, its inputs
+        # are cached
+        r = random.Random(3)
+        dataset = [([r.random() for _ in range(36)], [1, 0]),
+                   ([r.random() for _ in range(36)], [0, 1])]
+        net1 = convNet(5, 3)
+        net2 = convNet(5, 3)
+        net1.setTrainable(3)
+        net2.setTrainable(3)
+        algo1 = Backpropagation(net1)
+        algo2 = Backpropagation(net2, cache=16)
+        for _ in range(5):
+            self.assertAlmostEqual(algo1.train(dataset, 0.5, 0.3),
+                                   algo2.train(dataset, 0.5, 0.3))
+        self.assertEqual(8, algo2.cache().info()["hits"])
+        for ws1, ws2 in zip(net1.layers()[2].kernels(),
+                            net2.layers()[2].kernels()):
+            for w1, w2 in zip(ws1, ws2):
+                self.assertAlmostEqual(w1, w2)
+        # the layer below is the input layer
+        net = convNet(5, 3)
+        net.setTrainable(4)
+        self.assertTrue(Backpropagation(net, cache=16).cache() is None)
+
+
+class TestFootprint(unittest.TestCase):
+
+    def testOnline(self):
+        # no momentum: neither buffer is allocated
+        algo = Backpropagation(randomNet(5))
+        algo.train([([1, 0], [1])], 0.5, 0.0)
+        footprint = algo.footprint()
+        self.assertEqual(3, len(footprint))
+        for f in footprint:
+            self.assertGreater(f["weights"], 0)
+            self.assertEqual(0, f["momentum"])
+            self.assertEqual(0, f["accumulator"])
+        algo.train([([1, 0], [1])], 0.5, 0.3)
+        for f in algo.footprint():
+            self.assertGreater(f["momentum"], 0)
+            self.assertEqual(0, f["accumulator"])
+
+    def testSameWeights(self):
+        # lazy buffers train as buffers allocated up front
+        net1 = randomNet(5)
+        net2 = randomNet(5)
+        algo1 = Backpropagation(net1)
+        algo2 = Backpropagation(net2)
+        for t in algo2.trainers():
+            t.bindMomentum(util.Matrix.zeros(len(t._layer), t._cNextLayer))
+        for _ in range(3):
+            algo1.train([([1, 0], [1]), ([0, 0], [0])], 0.5, 0.3)
+            algo2.train([([1, 0], [1]), ([0, 0], [0])], 0.5, 0.3)
+        assertSameWeights(self, net1, net2)
+
+    def testBatch(self):
+        algo = Backpropagation(randomNet(5), batch=True)
+        algo.train([([1, 0], [1])], 0.5, 0.0)
+        for f in algo.footprint():
+            self.assertEqual(0, f["momentum"])
+            self.assertGreater(f["accumulator"], 0)
+
+    def testConv(self):
+        # kernel buffers are allocated on first use as well
+        r = random.Random(5)
+        net = convNet(5)
+        input = [r.random() for _ in range(25)]
+        algo = Backpropagation(net)
+        algo.train([(input, [1, 0])], 0.5, 0.0)
+        for f in algo.footprint():
+            self.assertEqual(0, f["momentum"])
+            self.assertEqual(0, f["accumulator"])
+        algo.train([(input, [1, 0])], 0.5, 0.3)
+        self.assertGreater(algo.footprint()[0]["momentum"], 0)
+        algo = Backpropagation(net, batch=True)
+        algo.train([(input, [1, 0])], 0.5, 0.0)
+        self.assertEqual(0, algo.footprint()[0]["momentum"])
+        self.assertGreater(algo.footprint()[0]["accumulator"], 0)
+
+
+class TestConv(unittest.TestCase):
+
+    def net(self):
+        return convNet(5)
+
+    def error(self, net):
+        outputs = net.activate(self.input)
+        return sum((e - o)**2 for o, e in zip(outputs, self.expected))/2
+
+    def numerical(self, weights, index):
+        # derivative of the error of a fresh net by the weight
+        net = self.net()
+        ws = weights(net)
+        w = ws[index]
+        ws[index] = w + 1e-6
+        e = self.error(net)
+        ws[index] = w - 1e-6
+        return (self.error(net) - e)/2e-6, w
+
+    def setUp(self):
+        r = random.Random(7)
+        self.input = [r.random() for _ in range(25)]
+        self.expected = [0.2, 0.9]
+
+    def testGradients(self):
+        # one batch update with LR=1 and M=0 is the negative gradient
+        net = self.net()
+        Backpropagation(net, True).train([(self.input, self.expected)],
+                                         1.0, 0.0)
+        weights = [lambda n: n.layers()[0].kernels()[1],
+                   lambda n: n.layers()[1].kernels()[0],
+                   lambda n: n.layers()[2].weightsTo(2),
+                   lambda n: n.layers()[3].weightsTo(1)]
+        for ws in weights:
+            for index in range(3):
+                g, w = self.numerical(ws, index)
+                self.assertAlmostEqual(g, ws(net)[index] - w)
+
+    def testFrozen(self):
+        # a frozen conv layer passes the errors with its kernels
+        net1 = self.net()
+        net2 = self.net()
+        net2.layers()[1].setTrainable(False)
+        kernels = [list(ws) for ws in net2.layers()[1].kernels()]
+        for net in (net1, net2):
+            Backpropagation(net, True).train([(self.input, self.expected)],
+                                             1.0, 0.0)
+        self.assertEqual(kernels,
+                         [list(ws) for ws in net2.layers()[1].kernels()])
+        for ws1, ws2 in zip(net1.layers()[0].kernels(),
+                            net2.layers()[0].kernels()):
+            for w1, w2 in zip(ws1, ws2):
+                self.assertAlmostEqual(w1, w2)
+
+    def testOnline(self):
+        # vertical and horizontal bars
+        dataset = [([x == 2 and 1 or 0 for y in range(5) for x in range(5)],
+                    [1, 0]),
+                   ([y == 2 and 1 or 0 for y in range(5) for x in range(5)],
+                    [0, 1])]
+        algo = Backpropagation(self.net())
+        errors = [algo.train(dataset, 0.5, 0.5) for _ in range(300)]
+        self.assertLess(errors[-1], errors[0]/4)
+
+
+class TestParallelBackpropagation(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]] * 3
+
+    def testBatch(self):
+        net1 = randomNet(11)
+        net2 = randomNet(11)
+        algo1 = Backpropagation(net1, batch=True)
+        with ParallelBackpropagation(net2, threads=3) as algo2:
+            for _ in range(5):
+                self.assertAlmostEqual(algo1.train(self.dataset, 0.5, 0.3),
+                                       algo2.train(self.dataset, 0.5, 0.3))
+        assertSameWeights(self, net1, net2)
+
+    def testMiniBatch(self):
+        # one sample mini-batches are the online mode
+        net1 = randomNet(13, bias=None)
+        net2 = randomNet(13, bias=None)
+        algo1 = Backpropagation(net1, batch=False)
+        with ParallelBackpropagation(net2, threads=2, batchSize=1) as algo2:
+            for _ in range(5):
+                self.assertAlmostEqual(algo1.train(self.dataset, 0.5, 0.3),
+                                       algo2.train(self.dataset, 0.5, 0.3))
+        assertSameWeights(self, net1, net2)
+
+    def testSingle(self):
+        # a single thread computes in the calling thread
+        net1 = randomNet(11)
+        net2 = randomNet(11)
+        algo1 = Backpropagation(net1, batch=True)
+        with ParallelBackpropagation(net2, threads=1) as algo2:
+            for _ in range(3):
+                self.assertAlmostEqual(algo1.train(self.dataset, 0.5, 0.3),
+                                       algo2.train(self.dataset, 0.5, 0.3))
+            self.assertIsNone(algo2._pool)
+        assertSameWeights(self, net1, net2)
+
+    def testShuffled(self):
+        # the dataset is read each epoch, changes in place are seen
+        net1 = randomNet(11)
+        net2 = randomNet(11)
+        algo1 = Backpropagation(net1, batch=True)
+        dataset = list(self.dataset)
+        with ParallelBackpropagation(net2, threads=2, batchSize=5) as algo2:
+            for seed in range(3):
+                random.Random(seed).shuffle(dataset)
+                for i in range(0, len(dataset), 5):
+                    algo1.train(dataset[i:i + 5], 0.5, 0.3)
+                algo2.train(dataset, 0.5, 0.3)
+        assertSameWeights(self, net1, net2)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,59 @@
+import functools, unittest
+
+from ghugh.trainer import Exponential
+from ghugh.crossvalidation import *
+
+from nets import randomNet
+
+
+# a fresh net of the same initial weights for each fold
+build = functools.partial(randomNet, 3, 2, 3, 2)
+
+
+class TestPartition(unittest.TestCase):
+
+    def testFolds(self):
+        folds = partition(range(10), 3, seed=1)
+        self.assertEqual([4, 3, 3], [len(f) for f in folds])
+        self.assertEqual(list(range(10)), sorted(sum(folds, [])))
+
+    def testOrdered(self):
+        self.assertEqual([[0, 2, 4], [1, 3]], partition(range(5), 2))
+
+    def testK(self):
+        self.assertRaises(ValueError, partition, range(5), 1)
+        self.assertRaises(ValueError, partition, range(5), 6)
+
+
+class TestCrossValidate(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [([1, 1], [1, 0]),
+                        ([1, 0], [0, 1]),
+                        ([0, 1], [0, 1]),
+                        ([0, 0], [1, 0])] * 3
+
+    def testSequential(self):
+        report = crossValidate(build, self.dataset, 3, 0.5, 0.1, 20,
+                               processes=1, seed=2)
+        self.assertEqual([0, 1, 2], [f.index for f in report.folds])
+        self.assertEqual([4, 4, 4],
+                         [f.evaluation.count for f in report.folds])
+        self.assertEqual(20, report.folds[0].epochs)
+        self.assertAlmostEqual(
+            sum(f.evaluation.error() for f in report.folds)/3,
+            report.error())
+
+    def testProcesses(self):
+        args = (build, self.dataset, 3, Exponential(0.5, 0.9), 0.1, 20)
+        report1 = crossValidate(*args, processes=1, seed=2, E=0.0)
+        report2 = crossValidate(*args, processes=3, seed=2, E=0.0)
+        for f1, f2 in zip(report1.folds, report2.folds):
+            self.assertAlmostEqual(f1.error, f2.error)
+            self.assertAlmostEqual(f1.evaluation.error(),
+                                   f2.evaluation.error())
+        self.assertAlmostEqual(report1.accuracy(), report2.accuracy())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import io, os, random, shutil, tempfile, unittest
+
+from data import read, binary, ingest, augment
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "data.txt")
+
+class TestRead(unittest.TestCase):
+
+    def testLazy(self):
+        with open(DATA) as f:
+            records = read.iread(f)
+            value, pixels = next(records)
+        self.assertEqual("1", value)
+        self.assertEqual(81, len(pixels))
+
+    def testRead(self):
+        with open(DATA) as f:
+            self.assertEqual(read.read(DATA), list(read.iread(f)))
+
+
+class TestBinary(unittest.TestCase):
+
+    def testRoundTrip(self):
+        records = read.read(DATA)
+        f = io.BytesIO()
+        self.assertEqual(len(records), binary.write(records, f))
+        f.seek(0)
+        self.assertEqual(records, list(binary.iread(f)))
+
+    def testPack(self):
+        self.assertEqual(b"\xa0\x80", binary.pack([1, 0, 1, 0, 0, 0, 0, 0, 1]))
+        self.assertEqual([1, 0, 1], binary.unpack(b"\xa0", 3))
+        self.assertRaises(ValueError, binary.pack, [2])
+
+    def testTruncated(self):
+        f = io.BytesIO()
+        binary.write([("1", [1, 0, 1])], f)
+        records = binary.iread(io.BytesIO(f.getvalue()[:-1]))
+        self.assertRaises(ValueError, list, records)
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        with open(DATA) as f:
+            self.text = f.read()
+        self.records = read.read(DATA)
+        # shards are ordered by name: shard10.txt before shard2.txt
+        for name in ("shard2.txt", "shard10.txt"):
+            with open(os.path.join(self.dir, name), "w") as f:
+                f.write(self.text)
+        with open(os.path.join(self.dir, "other.txt"), "w") as f:
+            f.write(self.text.split("\n\n")[0] + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testShards(self):
+        self.assertEqual(["other.txt", "shard10.txt", "shard2.txt"],
+                         [os.path.basename(f)
+                          for f in ingest.shards(self.dir)])
+        self.assertEqual(2, len(ingest.shards(os.path.join(self.dir,
+                                                           "shard*"))))
+
+    def testIngest(self):
+        pattern = os.path.join(self.dir, "shard*")
+        sequential = ingest.ingest(pattern, workers=1)
+        parallel = ingest.ingest(pattern, workers=2)
+        self.assertEqual(self.records * 2, sequential.records)
+        self.assertEqual(sequential.records, parallel.records)
+        self.assertEqual(2 * len(self.records), parallel.count)
+        self.assertEqual(2, parallel.files)
+        self.assertEqual(sequential.labels, parallel.labels)
+        self.assertEqual(parallel.count, sum(parallel.labels.values()))
+        self.assertEqual(list(range(len(parallel.labels))),
+                         sorted(parallel.index().values()))
+
+    def testBinary(self):
+        f = io.BytesIO()
+        ingested = ingest.ingest(self.dir, out=f, workers=2)
+        self.assertIsNone(ingested.records)
+        f.seek(0)
+        records = list(binary.iread(f))
+        self.assertEqual(ingested.count, len(records))
+        self.assertEqual(self.records[:1] + self.records * 2, records)
+
+
+class TestAugment(unittest.TestCase):
+
+    def setUp(self):
+        self.pixels = [1, 2, 3,
+                       4, 5, 6,
+                       7, 8, 9]
+
+    def testShift(self):
+        self.assertEqual([0, 1, 2,
+                          0, 4, 5,
+                          0, 7, 8], augment.shift(self.pixels, 3, 1, 0))
+        self.assertEqual([4, 5, 6,
+                          7, 8, 9,
+                          0, 0, 0], augment.shift(self.pixels, 3, 0, -1))
+
+    def testRotate(self):
+        self.assertEqual([7, 4, 1,
+                          8, 5, 2,
+                          9, 6, 3], augment.rotate(self.pixels, 3, 90))
+        self.assertEqual(self.pixels, augment.rotate(self.pixels, 3, 10))
+
+    def testNoise(self):
+        pixels = [0, 1] * 500
+        noisy = augment.noise(pixels, 0.1, random.Random(1))
+        flipped = sum(a != b for a, b in zip(pixels, noisy))
+        self.assertTrue(50 < flipped < 150, flipped)
+
+    def testAugmented(self):
+        records = read.read(DATA)
+        dataset = [(pixels, [value]) for value, pixels in records]
+        a = augment.Augmenter(9, shift=1, degrees=10, noise=0.05)
+        with augment.Augmented(dataset, a, chunkSize=5, queueSize=2,
+                               seed=3) as threads, \
+             augment.Augmented(dataset, a, processes=True, chunkSize=4,
+                               seed=3) as processes:
+            epoch1 = list(threads)
+            epoch2 = list(threads)
+            self.assertEqual([e for _, e in dataset], [e for _, e in epoch1])
+            self.assertNotEqual(epoch1, epoch2)
+            self.assertNotEqual([i for i, _ in dataset],
+                                [i for i, _ in epoch1])
+            self.assertEqual(epoch1, list(processes))
+            self.assertEqual(epoch2, list(processes))
+
+    def testSeed(self):
+        # no seed: fresh variants for each instance
+        dataset = [(list(self.pixels), [1])] * 8
+        a = augment.Augmenter(3, shift=1, degrees=0, noise=0.3)
+        with augment.Augmented(dataset, a) as augmented1, \
+             augment.Augmented(dataset, a) as augmented2:
+            self.assertNotEqual(augmented1.seed, augmented2.seed)
+            self.assertNotEqual(list(augmented1), list(augmented2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from ghugh.dataset import compact, weighted, size
+
+class TestCompact(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = [[[1, 0], [1]],
+                        [[0, 0], [0]],
+                        [(1, 0), (1,)],
+                        [[1, 0], [0]],
+                        [[1, 0], [1]]]
+
+    def testCompact(self):
+        self.assertEqual([([1, 0], [1], 3),
+                          ([0, 0], [0], 1),
+                          ([1, 0], [0], 1)], compact(self.dataset))
+
+    def testWeighted(self):
+        c = compact(self.dataset)
+        self.assertEqual(5, size(c))
+        self.assertEqual(5, size(self.dataset))
+        self.assertEqual(c, compact(c))
+        self.assertEqual([1] * 5, [w for _, _, w in weighted(self.dataset)])
+
+
+if __name__ == "__main__":
+    unittest.main()
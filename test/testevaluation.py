@@ -0,0 +1,88 @@
+import random, unittest
+
+from ghugh.ffann import *
+from ghugh.evaluation import *
+
+from nets import randomNet
+
+
+class TestEvaluation(unittest.TestCase):
+
+    def testScores(self):
+        e = Evaluation(2)
+        e.add([0.8, 0.2], [1, 0])
+        e.add([0.6, 0.4], [0, 1], 3)
+        self.assertEqual(4, e.count)
+        self.assertEqual([[1, 0], [3, 0]], e.confusion)
+        self.assertAlmostEqual(0.25, e.accuracy())
+        self.assertAlmostEqual((0.08 + 3*0.72)/2/4, e.error())
+
+    def testMerge(self):
+        e1 = Evaluation(2)
+        e1.add([0.8, 0.2], [1, 0])
+        e2 = Evaluation(2)
+        e2.add([0.1, 0.9], [0, 1])
+        e1.merge(e2)
+        self.assertEqual(2, e1.count)
+        self.assertEqual(1.0, e1.accuracy())
+
+    def testEmpty(self):
+        self.assertEqual(0.0, Evaluation(2).error())
+        self.assertEqual(0.0, Evaluation(2).accuracy())
+
+
+class TestEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        r = random.Random(3)
+        self.dataset = []
+        for _ in range(50):
+            expected = [0, 0, 0]
+            expected[r.randrange(3)] = 1
+            self.dataset.append(([r.random() for _ in range(3)], expected))
+
+    def expected(self, net):
+        e = Evaluation(3)
+        for input, expected in self.dataset:
+            e.add(list(net.feed(input)), expected)
+        return e
+
+    def assertSameEvaluation(self, e1, e2):
+        self.assertAlmostEqual(e1.error(), e2.error())
+        self.assertEqual(e1.confusion, e2.confusion)
+
+    def testEvaluate(self):
+        net = randomNet(5, 3, 4, 3)
+        self.assertSameEvaluation(self.expected(net),
+                                  evaluate(net, self.dataset, batchSize=7))
+
+    def testProcesses(self):
+        net = randomNet(5, 3, 4, 3)
+        with Evaluator(net, self.dataset, 8, processes=2) as evaluator:
+            self.assertSameEvaluation(self.expected(net), evaluator())
+            # changed weights are seen by the workers
+            net.layers()[1].weightsTo(2)[0] += 5
+            net.touch()
+            self.assertSameEvaluation(self.expected(net), evaluator())
+
+    def testRebind(self):
+        # the scoring function is generated once
+        net = randomNet(5, 3, 4, 3)
+        with Evaluator(net, self.dataset) as evaluator:
+            self.assertSameEvaluation(self.expected(net), evaluator())
+            feed = evaluator._feed
+            net.layers()[0].weightsTo(1)[2] -= 3
+            net.touch()
+            self.assertSameEvaluation(self.expected(net), evaluator())
+            self.assertTrue(feed is evaluator._feed)
+
+    def testSpatial(self):
+        net = Net(ConvLayer((2, 2), 1, 2),
+                  PoolLayer((2, 2, 2), 2, ocount=2, bias=1),
+                  OutputLayer(2))
+        dataset = [([0, 1, 1, 0], [1, 0]), ([1, 0, 0, 1], [0, 1])]
+        self.assertEqual(2, evaluate(net, dataset).count)
+
+
+if __name__ == "__main__":
+    unittest.main()
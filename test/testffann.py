@@ -1,4 +1,4 @@
-import math, unittest, collections
+import io, math, unittest, collections
 
 from ghugh.ffann import *
 from ghugh.util import transposed
@@ -138,6 +138,202 @@ class TestNetwork(unittest.TestCase):
                          (7*1 + 8*100 + 9*200)*13, output[0])
         
 
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        i = InputLayer(1, 1, iweights=iter([1, 2]), bias=1)
+        o = OutputLayer(1, function="identity")
+        self.net = Net(i, o)
+
+    def testHits(self):
+        cache = self.net.cache(2)
+        self.assertEqual((5,), tuple(self.net.feed((2,))))
+        self.assertEqual((5,), tuple(self.net.feed([2])))
+        self.assertEqual((7,), tuple(self.net.feed((3,))))
+        self.assertEqual({"hits": 1, "misses": 2, "size": 2, "currsize": 2},
+                         cache.info())
+
+    def testEviction(self):
+        cache = self.net.cache(1)
+        self.net.feed((2,))
+        self.net.feed((3,))
+        self.net.feed((2,))
+        self.assertEqual(0, cache.info()["hits"])
+
+    def testInvalidation(self):
+        cache = self.net.cache(10)
+        self.assertEqual((5,), tuple(self.net.feed((2,))))
+        self.net.layers()[0].weightsTo(0)[1] = 10
+        self.net.touch()
+        self.assertEqual((21,), tuple(self.net.feed((2,))))
+        self.assertEqual(0, cache.info()["hits"])
+
+    def testDisable(self):
+        self.net.cache(10)
+        self.assertEqual(None, self.net.cache(None))
+        self.assertTrue(self.net.feed((2,)) is self.net.layers()[-1])
+
+    def testOutputLayer(self):
+        # cached outputs are set to the output layer
+        cache = self.net.cache(10)
+        output = self.net.layers()[-1]
+        self.assertTrue(self.net.feed((2,)) is output)
+        self.net.feed((3,))
+        self.assertTrue(self.net.feed((2,)) is output)
+        self.assertEqual([5], list(output))
+        self.assertEqual(1, cache.info()["hits"])
+
+
+class TestFreeze(unittest.TestCase):
+
+    def testVersion(self):
+        net = Net(InputLayer(1, 1, iweights=iter([1, 2]), bias=1),
+                  OutputLayer(1, function="identity"))
+        feed = net.freeze()
+        self.assertEqual((5,), feed((2,)))
+        self.assertTrue(feed is net.freeze())
+        net.layers()[0].weightsTo(0)[1] = 10
+        net.touch()
+        self.assertFalse(feed is net.freeze())
+        self.assertEqual((21,), net.freeze()((2,)))
+        self.assertEqual((5,), feed((2,)))
+
+
+class TestActivationNames(unittest.TestCase):
+
+    def testNamed(self):
+        h = HiddenLayer(2, 1, iweights=1, function="tanh")
+        o = OutputLayer(1, function="relu")
+        self.assertEqual("tanh", h.activation().name)
+        self.assertEqual("relu", o.activation().name)
+        self.assertEqual("sigmoid", OutputLayer(1).activation().name)
+        self.assertRaises(ValueError, OutputLayer, 1, function="nosuch")
+
+    def testActivate(self):
+        o = OutputLayer(2, function="tanh")
+        response = list(o.activate(Weighted([1, 2], [[0.1, 0.2],
+                                                     [-0.3, -0.4]])))
+        self.assertAlmostEqual(math.tanh(0.5), response[0])
+        self.assertAlmostEqual(math.tanh(-1.1), response[1])
+
+
+class TestConvLayer(unittest.TestCase):
+
+    def setUp(self):
+        # 3x3 input, 2x2 kernel, 2 channels
+        self.conv = ConvLayer((3, 3), 2, 2,
+                              kweights=iter([0.5, 1, 0, 0, 1,
+                                             0, 0, 1, -1, 0]),
+                              function="identity")
+
+    def testShapes(self):
+        self.assertEqual((3, 3, 1), self.conv.inputShape())
+        self.assertEqual((2, 2, 2), self.conv.shape())
+        self.assertEqual(8, len(self.conv))
+        self.assertEqual([0, 1, 3, 4], self.conv.fields()[0])
+        self.assertEqual([4, 5, 7, 8], self.conv.fields()[3])
+        self.assertFalse(self.conv.dense())
+
+    def testActivate(self):
+        self.conv.activate(range(1, 10))
+        # channel 0: 0.5 + top-left + bottom-right
+        self.assertEqual([6.5, 8.5, 12.5, 14.5], list(self.conv[:4]))
+        # channel 1: top-right - bottom-left
+        self.assertEqual([-2, -2, -2, -2], list(self.conv[4:]))
+
+    def testStride(self):
+        conv = ConvLayer((5, 5, 2), 3, 1, stride=2)
+        self.assertEqual((2, 2, 1), conv.shape())
+        self.assertEqual(1 + 3*3*2, len(conv.kernels()[0]))
+        self.assertEqual(25 + 2, conv.fields()[1][9])
+
+    def testBias(self):
+        self.assertRaises(ValueError, ConvLayer, (3, 3), 2, 2, bias=1)
+        self.assertRaises(ValueError, ConvLayer, (3, 3), 4, 2)
+
+    def testInputs(self):
+        self.assertRaises(ValueError, self.conv.activate, range(8))
+
+
+class TestPoolLayer(unittest.TestCase):
+
+    def testActivate(self):
+        pool = PoolLayer((4, 5, 2), 2, ocount=1, iweights=1, bias=1)
+        self.assertEqual((2, 2, 2), pool.shape())
+        inputs = [0] * 40
+        inputs[6] = 3
+        inputs[20 + 18] = 2
+        pool.activate(inputs)
+        self.assertEqual([1, 3, 0, 0, 0, 0, 0, 0, 2], list(pool))
+        self.assertEqual(6, pool.argmax()[0])
+        self.assertEqual(38, pool.argmax()[7])
+        self.assertTrue(pool.dense())
+
+    def testNet(self):
+        net = Net(ConvLayer((4, 4), 3, 2),
+                  PoolLayer((2, 2, 2), 2, ocount=3, bias=1.0),
+                  OutputLayer(3))
+        self.assertEqual(3, len(net.feed([0.5] * 16)))
+
+
+class TestSerialisation(unittest.TestCase):
+
+    def setUp(self):
+        i = InputLayer(2, 3, iweights=iter(range(1, 10)), bias=1)
+        h = HiddenLayer(3, 2, iweights=iter(x/10 for x in range(8)),
+                        function="tanh", bias=0.5)
+        o = OutputLayer(2, function="leakyRelu")
+        self.net = Net(i, h, o)
+
+    def testRoundTrip(self):
+        f = io.StringIO()
+        dump(self.net, f)
+        f.seek(0)
+        net = load(f)
+        self.assertEqual(self.net.state(), net.state())
+        self.assertEqual(list(self.net.feed((0.1, 0.2))),
+                         list(net.feed((0.1, 0.2))))
+        self.assertEqual("tanh", net.layers()[1].activation().name)
+        self.assertEqual(0.5, net.layers()[1][0])
+
+    def testConvRoundTrip(self):
+        net = Net(ConvLayer((4, 4), 2, 3, stride=(1, 2), function="relu"),
+                  PoolLayer((3, 2, 3), 1, ocount=2, bias=0.5),
+                  OutputLayer(2))
+        f = io.StringIO()
+        dump(net, f)
+        f.seek(0)
+        loaded = load(f)
+        self.assertEqual(net.state(), loaded.state())
+        inputs = [x/16 for x in range(16)]
+        self.assertEqual(list(net.feed(inputs)), list(loaded.feed(inputs)))
+
+    def testWarmStart(self):
+        f = io.StringIO()
+        dump(self.net, f)
+        f.seek(0)
+        net = load(f, trainable=1)
+        self.assertEqual([False, True],
+                         [l.trainable() for l in net.layers()[:-1]])
+        net.setTrainable()
+        self.assertEqual([True, True],
+                         [l.trainable() for l in net.layers()[:-1]])
+        net.setTrainable(0)
+        self.assertEqual([False, False],
+                         [l.trainable() for l in net.layers()[:-1]])
+
+    def testActivateFrom(self):
+        outputs = list(self.net.activate((0.1, 0.2)))
+        hidden = list(self.net.layers()[1])
+        self.net.activate((0.7, 0.9))
+        self.assertEqual(outputs, list(self.net.activateFrom(1, hidden)))
+        self.assertEqual(hidden, list(self.net.layers()[1]))
+
+    def testUnregistered(self):
+        net = Net(InputLayer(1, 1), OutputLayer(1, function=lambda x: x))
+        self.assertRaises(ValueError, dump, net, io.StringIO())
+
+
 class TestInitialWeights(unittest.TestCase):
     
     def setUp(self):
@@ -0,0 +1,51 @@
+import unittest
+
+from ghugh.ffann import *
+from ghugh.hogwild import Hogwild
+from ghugh import trainer, util
+
+from nets import randomNet
+
+class TestHogwild(unittest.TestCase):
+
+    def setUp(self):
+        self.net = randomNet(3, 2, 3, 1)
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]] * 4
+
+    def testConverges(self):
+        with Hogwild(self.net, workers=4, every=5) as algo:
+            converged, error = trainer.supervised(algo, self.dataset,
+                                                  0.5, 0.3, 500, E=0.01)
+            self.assertEqual(error, algo.error(self.dataset))
+        self.assertTrue(converged)
+        for input, expected in self.dataset:
+            self.assertEqual(expected[0], round(self.net.feed(input)[0]))
+
+    def testClose(self):
+        state = self.net.state()
+        algo = Hogwild(self.net, workers=2)
+        algo.train(self.dataset, 0.1, 0.0)
+        self.assertNotEqual(state, self.net.state())
+        algo.close()
+        self.assertTrue(algo._shm is None)
+        for l in self.net.layers()[:-1]:
+            for ws in l._weights:
+                self.assertTrue(isinstance(ws, list))
+
+    def testBackend(self):
+        # the weights are moved back to the storage of the backend
+        state = self.net.state()
+        net = Net.fromState(state, backend="array")
+        with Hogwild(net, workers=2) as algo:
+            algo.train(self.dataset, 0.1, 0.0)
+        self.assertNotEqual(state, net.state())
+        for l in net.layers()[:-1]:
+            self.assertEqual("array", l.backend().NAME)
+            self.assertTrue(isinstance(l.weights(), util.Matrix))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import os, random, tempfile, unittest
+
+from ghugh.ffann import *
+from ghugh import inference, prune
+
+from nets import randomNet
+
+DATASET = [[[1, 0, 0, 1], [1, 0]],
+           [[0, 1, 1, 0], [0, 1]],
+           [[1, 1, 0, 0], [1, 0]]]
+
+
+class TestSparse(unittest.TestCase):
+
+    def setUp(self):
+        self.net = randomNet(1, 4, 3, 2, bias=0.5, function="tanh")
+
+    def testDense(self):
+        model = inference.Sparse(self.net)
+        self.assertEqual(1.0, model.density())
+        for input, _ in DATASET:
+            for a, b in zip(self.net.feed(input), model.feed(input)):
+                self.assertAlmostEqual(a, b)
+
+    def testPruned(self):
+        prune.magnitude(self.net, topk=2)
+        model = inference.Sparse(self.net)
+        self.assertEqual(2*3 + 3 + 2*2 + 2, model.nnz())
+        for input, _ in DATASET:
+            for a, b in zip(self.net.feed(input), model.feed(input)):
+                self.assertAlmostEqual(a, b)
+
+
+class TestFloat32(unittest.TestCase):
+
+    def testFeed(self):
+        net = randomNet(4, 4, 3, 2, bias=0.5, function="tanh")
+        model = inference.Float32(net)
+        self.assertEqual(4*(5*3 + 4*2), model.nbytes())
+        for input, _ in DATASET:
+            for a, b in zip(net.feed(input), model.feed(input)):
+                self.assertAlmostEqual(a, b, places=6)
+
+    def testFeedMany(self):
+        model = inference.Float32(randomNet(4, 4, 3, 2, bias=0.5,
+                                            function="tanh"))
+        inputs = [i for i, _ in DATASET]
+        for a, b in zip([model.feed(i) for i in inputs],
+                        model.feedMany(inputs)):
+            for x, y in zip(a, b):
+                self.assertAlmostEqual(x, y)
+        self.assertEqual([], model.feedMany([]))
+
+
+class TestInt8(unittest.TestCase):
+
+    def testFeed(self):
+        net = randomNet(5, 4, 3, 2, bias=0.5, function="tanh")
+        model = inference.Int8(net, DATASET)
+        self.assertEqual(5*3 + 4*2, model.nbytes())
+        report = inference.compare(net, model, DATASET)
+        self.assertTrue(report["maxDifference"] < 0.05)
+        self.assertEqual(1.0, report["agreement"])
+
+    def testFeedMany(self):
+        net = randomNet(6, 4, 3, 2, bias=0.5, function="tanh")
+        model = inference.Int8(net, DATASET)
+        inputs = [i for i, _ in DATASET]
+        self.assertEqual([model.feed(i) for i in inputs],
+                         model.feedMany(inputs))
+
+
+class TestMapped(unittest.TestCase):
+
+    def setUp(self):
+        self.net = randomNet(7, 4, 3, 2, bias=0.5, function="tanh")
+
+    def testAnonymous(self):
+        with inference.Mapped(self.net) as model:
+            self.assertEqual(8*(5*3 + 4*2), model.nbytes())
+            for input, _ in DATASET:
+                self.assertEqual(tuple(self.net.feed(input)),
+                                 model.feed(input))
+
+    def testFeedMany(self):
+        inputs = [i for i, _ in DATASET]
+        with inference.Mapped(self.net) as model:
+            for a, b in zip(model.feedMany(inputs),
+                            map(self.net.feed, inputs)):
+                for x, y in zip(a, b):
+                    self.assertAlmostEqual(x, y)
+
+    def testFile(self):
+        d = tempfile.mkdtemp()
+        path = os.path.join(d, "model")
+        self.addCleanup(os.rmdir, d)
+        self.addCleanup(os.remove, path)
+        inference.save(self.net, path)
+        with inference.load(path) as model:
+            for input, _ in DATASET:
+                self.assertEqual(tuple(self.net.feed(input)),
+                                 model.feed(input))
+
+    def testInvalid(self):
+        net = Net(InputLayer(1, 1), OutputLayer(1, function=abs))
+        self.assertRaises(ValueError, inference.Mapped, net)
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b"not a model")
+            f.flush()
+            self.assertRaises(ValueError, inference.load, f.name)
+
+
+class TestCompile(unittest.TestCase):
+
+    def testActivations(self):
+        r = random.Random(3)
+        w = lambda: r.uniform(-1, 1)
+        for f in ("sigmoid", "tanh", "relu", "leakyRelu", "identity",
+                  lambda x: x*x):
+            net = Net(InputLayer(4, 3, iweights=w, bias=1),
+                      HiddenLayer(3, 2, iweights=w, function=f),
+                      OutputLayer(2, function=f))
+            feed = inference.compile(net)
+            for input, _ in DATASET:
+                self.assertEqual(tuple(net.feed(input)), feed(input))
+
+    def testInputFunction(self):
+        net = Net(InputLayer(2, 1, iweights=iter([2, 3]),
+                             function=lambda x: x + 1),
+                  OutputLayer(1, function="identity"))
+        self.assertEqual((2*2 + 3*3,), inference.compile(net)((1, 2)))
+
+    def testZeroWeights(self):
+        net = Net(InputLayer(2, 1, iweights=iter([0, 3])),
+                  OutputLayer(1, function="identity"))
+        feed = inference.compile(net)
+        self.assertFalse("x0*" in feed.source)
+        self.assertEqual((6,), feed((1, 2)))
+
+    def testBound(self):
+        net = randomNet(2, 4, 3, 2, bias=0.5, function="tanh")
+        feed = inference.compile(net, bound=True)
+        source = feed.source
+        for input, _ in DATASET:
+            for o1, o2 in zip(net.feed(input), feed(input)):
+                self.assertAlmostEqual(o1, o2)
+        # zero weights are kept, set by bind
+        net.layers()[0].weightsTo(1)[2] = 0.0
+        net.layers()[1].weightsTo(0)[1] += 1
+        feed.bind(net)
+        self.assertEqual(source, feed.source)
+        for input, _ in DATASET:
+            for o1, o2 in zip(net.feed(input), feed(input)):
+                self.assertAlmostEqual(o1, o2)
+
+
+class TestCompare(unittest.TestCase):
+
+    def testSame(self):
+        net = randomNet(2, 4, 3, 2, bias=0.5, function="tanh")
+        report = inference.compare(net, inference.Sparse(net), DATASET)
+        self.assertEqual(report["referenceAccuracy"], report["accuracy"])
+        self.assertEqual(0.0, report["accuracyDelta"])
+        self.assertEqual(1.0, report["agreement"])
+        self.assertAlmostEqual(report["referenceError"], report["error"])
+        self.assertAlmostEqual(0.0, report["maxDifference"])
+
+
+if __name__ == "__main__":
+    unittest.main()
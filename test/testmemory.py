@@ -0,0 +1,71 @@
+import sys, tracemalloc, unittest
+
+from ghugh.backprop import Backpropagation
+from ghugh.dataset import compact
+from ghugh.memory import *
+from ghugh import trainer
+
+from nets import randomNet
+
+class TestSizeof(unittest.TestCase):
+
+    def testShared(self):
+        row = [0.5, 1.5]
+        self.assertEqual(sys.getsizeof([row, row]) + sizeof(row),
+                         sizeof([row, row]))
+        self.assertLess(sizeof([row, row]), sizeof([row, list(row)]))
+
+    def testDataset(self):
+        dataset = [([1.0, 0.0], [1.0])] * 3
+        self.assertLess(sizeof(compact(dataset)),
+                        sizeof([([1.0, 0.0], [1.0]) for _ in range(3)]))
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        self.net = randomNet(3, 2, 3, 1)
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]]
+
+    def testNet(self):
+        report = Report(self.net)
+        self.assertEqual(3, len(report.layers))
+        self.assertEqual(repr(self.net.layers()[0]),
+                         report.layers[0]["layer"])
+        for l in report.layers[:-1]:
+            self.assertGreater(l["weights"], 0)
+            self.assertGreater(l["views"], 0)
+            self.assertEqual(0, l["momentum"])
+        self.assertEqual(0, report.layers[-1]["weights"])
+        self.assertEqual(0, report.components["dataset"])
+        self.assertEqual(sum(report.components.values()), report.total())
+        self.assertTrue(repr(report).startswith("layer"))
+
+    def testAlgo(self):
+        with Profiled(Backpropagation(self.net, batch=True)) as algo:
+            trainer.supervised(algo, self.dataset, 0.5, 0.3, 3)
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(3, len(algo.peaks))
+        self.assertEqual(3, len(algo.retained))
+        self.assertTrue(all(p > 0 for p in algo.peaks))
+        report = Report(self.net, algo, self.dataset)
+        self.assertEqual(algo.peaks, report.peaks)
+        for l in report.layers[:-1]:
+            self.assertGreater(l["momentum"], 0)
+            self.assertGreater(l["accumulator"], 0)
+        self.assertEqual(sizeof(self.dataset), report.components["dataset"])
+        self.assertIn("epoch peaks", repr(report))
+
+    def testMeasure(self):
+        result, peak = measure(lambda n: [0.0] * n, 10000)
+        self.assertEqual(10000, len(result))
+        self.assertGreaterEqual(peak, 10000 * 8)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == "__main__":
+    unittest.main()
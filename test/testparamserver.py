@@ -0,0 +1,83 @@
+import threading, unittest
+
+from ghugh.backprop import Backpropagation
+from ghugh.paramserver import *
+from ghugh import trainer
+
+from nets import randomNet
+
+class TestParameterServer(unittest.TestCase):
+
+    def setUp(self):
+        self.net = randomNet(3, 2, 3, 1)
+        self.dataset = [[[1, 1], [0]],
+                        [[1, 0], [1]],
+                        [[0, 1], [1]],
+                        [[0, 0], [0]]] * 2
+
+    def assertLearned(self, net):
+        for input, expected in self.dataset:
+            self.assertEqual(expected[0], round(net.feed(input)[0]))
+
+    def testSync(self):
+        # one update per epoch is batch backpropagation
+        net = randomNet(3, 2, 3, 1)
+        algo = Backpropagation(net, batch=True)
+        with ParameterServer(self.net, workers=3) as server:
+            for _ in range(5):
+                self.assertAlmostEqual(algo.train(self.dataset, 0.5, 0.3),
+                                       server.train(self.dataset, 0.5, 0.3))
+        for l1, l2 in zip(net.layers()[:-1], self.net.layers()[:-1]):
+            for ws1, ws2 in zip(l1._weights, l2._weights):
+                for w1, w2 in zip(ws1, ws2):
+                    self.assertAlmostEqual(w1, w2)
+
+    def testFrozen(self):
+        # frozen layers are not pushed
+        net = randomNet(3, 2, 3, 1)
+        net.setTrainable(1)
+        self.net.setTrainable(1)
+        algo = Backpropagation(net, batch=True)
+        with ParameterServer(self.net, workers=2) as server:
+            for _ in range(3):
+                self.assertAlmostEqual(algo.train(self.dataset, 0.5, 0.3),
+                                       server.train(self.dataset, 0.5, 0.3))
+            self.assertIsNone(server._algo.trainers()[0]._wDeltas)
+        l1, l2 = net.layers()[0], self.net.layers()[0]
+        self.assertEqual(l1._weightsState(), l2._weightsState())
+        for ws1, ws2 in zip(net.layers()[1]._weights,
+                            self.net.layers()[1]._weights):
+            for w1, w2 in zip(ws1, ws2):
+                self.assertAlmostEqual(w1, w2)
+
+    def testConverges(self):
+        for mode, staleness in ((SYNC, 0), (ASYNC, 0), (ASYNC, 2)):
+            net = randomNet(3, 2, 3, 1)
+            with ParameterServer(net, workers=2, mode=mode,
+                                 staleness=staleness,
+                                 batchSize=1) as server:
+                converged, error = trainer.supervised(server, self.dataset,
+                                                      0.5, 0.3, 3000,
+                                                      E=0.01)
+            self.assertTrue(converged)
+            self.assertLearned(net)
+
+    def testRemote(self):
+        # a worker node started separately
+        server = ParameterServer(self.net, workers=1, spawn=False)
+        with server:
+            server.start(self.dataset)
+            node = threading.Thread(target=work, args=(server.address,))
+            node.start()
+            converged, error = trainer.supervised(server, self.dataset,
+                                                  0.5, 0.3, 3000, E=0.01)
+        node.join()
+        self.assertTrue(converged)
+        self.assertLearned(self.net)
+
+    def testMode(self):
+        self.assertRaises(ValueError, ParameterServer, self.net, mode="x")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import io, unittest
+
+from ghugh.ffann import *
+from ghugh import inference
+from ghugh.predict import predict
+
+class TestPredict(unittest.TestCase):
+
+    def setUp(self):
+        i = InputLayer(2, 2, iweights=iter([1, -1, -1, 1]))
+        o = OutputLayer(2, function="identity")
+        self.net = Net(i, o)
+        self.records = [("a", (1, 0)), ("b", (0, 2)), ("c", (3, 1))]
+
+    def testOutput(self):
+        out = io.StringIO()
+        throughput = predict(self.net, iter(self.records), out, batchSize=2)
+        self.assertEqual(3, throughput.count)
+        # the compiled feed function outputs floats
+        self.assertEqual(["a\t0\t1.0 -1.0",
+                          "b\t1\t-2.0 2.0",
+                          "c\t0\t2.0 -2.0"], out.getvalue().splitlines())
+        self.assertTrue(0 < throughput.scoring <= throughput.seconds)
+
+    def testLabels(self):
+        out = io.StringIO()
+        predict(self.net, self.records, out, labels="xy")
+        self.assertEqual(["x", "y", "x"],
+                         [l.split("\t")[1]
+                          for l in out.getvalue().splitlines()])
+
+    def testModel(self):
+        out = io.StringIO()
+        predict(inference.Float32(self.net), self.records, out)
+        self.assertEqual(["a\t0\t1.0 -1.0",
+                          "b\t1\t-2.0 2.0",
+                          "c\t0\t2.0 -2.0"], out.getvalue().splitlines())
+
+    def testEmpty(self):
+        out = io.StringIO()
+        self.assertEqual(0, predict(self.net, [], out).count)
+        self.assertEqual("", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
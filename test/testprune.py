@@ -0,0 +1,104 @@
+import unittest
+
+from ghugh.ffann import *
+from ghugh.backprop import Backpropagation
+from ghugh import prune
+
+class TestMagnitude(unittest.TestCase):
+
+    def setUp(self):
+        i = InputLayer(3, 2, iweights=iter([9, 0.1, -5, 0.2,
+                                            8, -3, 0.3, 4]), bias=1)
+        o = OutputLayer(2)
+        self.net = Net(i, o)
+
+    def testThreshold(self):
+        mask = prune.magnitude(self.net, threshold=1)
+        self.assertEqual([[9, 0.0, -5, 0.0], [8, -3, 0.0, 4]],
+                         self.net.layers()[0]._weights)
+        self.assertEqual([[[True, False, True, False],
+                           [True, True, False, True]]], mask)
+        self.assertEqual(3/8, prune.sparsity(mask))
+
+    def testTopK(self):
+        prune.magnitude(self.net, topk=1)
+        # bias weights are kept
+        self.assertEqual([[9, 0.0, -5, 0.0], [8, 0.0, 0.0, 4]],
+                         self.net.layers()[0]._weights)
+
+    def testArguments(self):
+        self.assertRaises(ValueError, prune.magnitude, self.net)
+
+
+class TestMasked(unittest.TestCase):
+
+    def testFineTune(self):
+        net = network(2, 3, 1, bias=1)
+        dataset = [[[1, 1], [0]], [[1, 0], [1]],
+                   [[0, 1], [1]], [[0, 0], [0]]]
+        mask = prune.magnitude(net, topk=1)
+        algo = prune.Masked(Backpropagation(net), mask)
+        for _ in range(3):
+            algo.train(dataset, 0.5, 0.5)
+        for l, rows in zip(net.layers(), mask):
+            for ws, keep in zip(l._weights, rows):
+                for w, k in zip(ws, keep):
+                    if not k:
+                        self.assertEqual(0.0, w)
+
+    def testUpdates(self):
+        # the mask is kept by each update, not by the epoch only
+        dataset = [[[1, 1], [0]], [[1, 0], [1]],
+                   [[0, 1], [1]], [[0, 0], [0]]]
+        for batch in (False, True):
+            net = network(2, 3, 1, bias=1)
+            mask = prune.magnitude(net, topk=1)
+            algo = prune.Masked(Backpropagation(net, batch), mask)
+            for _ in range(3):
+                algo.algo.train(dataset, 0.5, 0.5)
+            for t, l, rows in zip(algo.algo.trainers(), net.layers(), mask):
+                for j, (ws, keep) in enumerate(zip(l._weights, rows)):
+                    for i, (w, k) in enumerate(zip(ws, keep)):
+                        if not k:
+                            self.assertEqual(0.0, w)
+                            self.assertEqual(0.0, t._oldWDeltas[i][j])
+
+
+class TestNeurons(unittest.TestCase):
+
+    def setUp(self):
+        i = InputLayer(1, 3, iweights=iter([1, 2,
+                                            3, 4,
+                                            5, 6]), bias=1)
+        # outbound weight norms: 3, 0, 6
+        h = HiddenLayer(3, 1, iweights=iter([7, 3, 0, 6]),
+                        function="identity", bias=1)
+        o = OutputLayer(1, function="identity")
+        self.net = Net(i, h, o)
+
+    def testScores(self):
+        self.assertEqual([[3.0, 0.0, 6.0]], prune.scores(self.net))
+        dataset = [[[1], [0]], [[-1], [0]]]
+        # mean absolute outputs: 2, 4, 6
+        self.assertEqual([[6.0, 0.0, 36.0]],
+                         prune.scores(self.net, "activations", dataset))
+        self.assertRaises(ValueError, prune.scores, self.net, "activations")
+
+    def testNeurons(self):
+        net = prune.neurons(self.net, 1)
+        self.assertEqual("input[2, bias=True] hidden[3, bias=True] "
+                         "output[1] x->identity", repr(net))
+        self.assertEqual([[1, 2], [5, 6]], net.layers()[0]._weights)
+        self.assertEqual([[7, 3, 6]], net.layers()[1]._weights)
+        # the removed neuron did not contribute
+        for x in (-1, 0, 2):
+            self.assertEqual(list(self.net.feed([x])), list(net.feed([x])))
+
+    def testKeepOne(self):
+        net = prune.neurons(self.net, [10])
+        self.assertEqual(2, len(net.layers()[1]))
+        self.assertEqual([[7, 6]], net.layers()[1]._weights)
+
+
+if __name__ == "__main__":
+    unittest.main()
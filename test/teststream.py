@@ -0,0 +1,95 @@
+import itertools, random, unittest
+
+from ghugh.ffann import *
+from ghugh.backprop import Backpropagation
+from ghugh.trainer import Algo
+from ghugh.stream import *
+
+
+class Recording(Algo):
+    """Records the trained batches, returns the first input."""
+
+    def __init__(self):
+        self.batches = []
+
+    def train(self, dataset, LR, M):
+        self.batches.append(list(dataset))
+        return dataset[0][0]
+
+
+class TestReservoir(unittest.TestCase):
+
+    def testCapacity(self):
+        r = Reservoir(10, seed=1)
+        for i in range(1000):
+            r.add(i)
+        self.assertEqual(10, len(r))
+        self.assertEqual(1000, r.seen)
+        self.assertEqual(10, len(set(r.sample(20))))
+
+    def testUniform(self):
+        # each item is kept with probability capacity/seen
+        counts = [0] * 10
+        for seed in range(1000):
+            r = Reservoir(2, seed=seed)
+            for i in range(10):
+                r.add(i)
+            for i in r.sample(2):
+                counts[i] += 1
+        for c in counts:
+            self.assertTrue(120 < c < 280, counts)
+
+
+class TestProgress(unittest.TestCase):
+
+    def testRolling(self):
+        p = Progress(2)
+        self.assertIsNone(p.error())
+        p.add(1.0, 1)
+        p.add(0.5, 2)
+        self.assertAlmostEqual(2.0/3, p.error())
+        p.add(0.0, 1)
+        self.assertAlmostEqual(1.0/3, p.error())
+        self.assertEqual(4, p.samples)
+        self.assertEqual(3, p.updates)
+
+
+class TestTrain(unittest.TestCase):
+
+    def testReplay(self):
+        algo = Recording()
+        stream = ((i, [0]) for i in range(10))
+        progress = train(algo, stream, 0.1, 0, batchSize=3, replay=1.0,
+                         window=1)
+        self.assertEqual(10, progress.samples)
+        self.assertEqual(4, progress.updates)
+        # no replay before the first batch
+        self.assertEqual([[(0, [0]), (1, [0]), (2, [0])]], algo.batches[:1])
+        self.assertEqual(3, len(algo.batches[2]))
+        self.assertTrue(all(s[0] < 3 for s in algo.batches[2]))
+        self.assertEqual(1, len(algo.batches[-1]))
+        self.assertEqual(9, progress.error())
+
+    def testCallback(self):
+        reports = []
+        train(Recording(), ((i, [0]) for i in range(10)), 0.1, 0,
+              replay=0, every=4, callback=lambda p: reports.append(p.samples))
+        self.assertEqual([4, 8], reports)
+
+    def testUnbounded(self):
+        r = random.Random(1)
+        w = lambda: r.uniform(-1, 1)
+        net = Net(InputLayer(2, 3, iweights=w, bias=1),
+                  HiddenLayer(3, 1, iweights=w, bias=1),
+                  OutputLayer(1))
+        xor = [([1, 1], [0]), ([1, 0], [1]), ([0, 1], [1]), ([0, 0], [0])]
+        stream = (r.choice(xor) for _ in itertools.count())
+        errors = []
+        train(Backpropagation(net), itertools.islice(stream, 8000), 0.5, 0.3,
+              batchSize=4, capacity=64, window=50, every=100,
+              callback=lambda p: errors.append(p.error()))
+        self.assertLess(errors[-1], errors[0]/4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import math, unittest
+
+from ghugh.ffann import *
+from ghugh.trainer import *
+from ghugh.evaluation import Evaluation
+
+
+class Scripted(Algo):
+    """Returns the given errors and records learning rates."""
+
+    def __init__(self, errors, net=None):
+        self.errors = iter(errors)
+        self.rates = []
+        self.net = net
+
+    def train(self, dataset, LR, M):
+        self.rates.append(LR)
+        e = next(self.errors)
+        if self.net is not None:
+            # the weights remember the epoch error
+            self.net.layers()[0].weightsTo(0)[0] = e
+        return e
+
+
+class Validation(object):
+    """Returns evaluations with the given errors."""
+
+    def __init__(self, errors):
+        self.errors = iter(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        e = Evaluation(1)
+        e.add([0], [math.sqrt(2*next(self.errors))])
+        return e
+
+
+class TestSchedules(unittest.TestCase):
+
+    def testStep(self):
+        s = Step(1.0, 2, 0.1)
+        self.assertEqual([1.0, 1.0, 0.1, 0.1],
+                         [round(s.rate(i, None), 6) for i in range(4)])
+
+    def testExponential(self):
+        self.assertAlmostEqual(0.25, Exponential(1.0, 0.5).rate(2, None))
+
+    def testCosine(self):
+        s = Cosine(1.0, 10, 0.1)
+        self.assertAlmostEqual(1.0, s.rate(0, None))
+        self.assertAlmostEqual(0.55, s.rate(5, None))
+        self.assertAlmostEqual(0.1, s.rate(10, None))
+        self.assertAlmostEqual(0.1, s.rate(20, None))
+
+    def testPlateau(self):
+        s = Plateau(1.0, factor=0.5, patience=2, minimum=0.3)
+        rates = [s.rate(i, e) for i, e in
+                 enumerate([None, 1.0, 0.5, 0.5, 0.6, 0.5, 0.5, 0.5, 0.5])]
+        self.assertEqual([1.0, 1.0, 1.0, 1.0, 0.5, 0.5, 0.3, 0.3, 0.3],
+                         rates)
+
+
+class TestSupervised(unittest.TestCase):
+
+    def testConverged(self):
+        result = supervised(Scripted([0.5, 0.1, 0.0001]), [], 0.1, 0, 10)
+        converged, e = result
+        self.assertTrue(converged)
+        self.assertEqual(0.0001, e)
+        self.assertEqual(CONVERGED, result.reason)
+        self.assertEqual(3, result.epochs)
+
+    def testEpoches(self):
+        result = supervised(Scripted([0.5, 0.4, 0.3]), [], 0.1, 0, 3)
+        self.assertEqual((False, 0.3), result)
+        self.assertEqual(EPOCHES, result.reason)
+
+    def testSchedule(self):
+        algo = Scripted([0.5] * 3)
+        supervised(algo, [], Exponential(1.0, 0.5), 0, 3)
+        self.assertEqual([1.0, 0.5, 0.25], algo.rates)
+
+    def testPlateau(self):
+        algo = Scripted([0.5, 0.4, 0.399, 0.41, 0.4, 0.3])
+        result = supervised(algo, [], 0.1, 0, 6, patience=3, minDelta=0.01)
+        self.assertEqual(PLATEAU, result.reason)
+        self.assertEqual(5, result.epochs)
+        self.assertEqual(0.399, result.best)
+
+    def testDiverged(self):
+        result = supervised(Scripted([0.5, 0.4, 0.9, 0.1]), [], 0.1, 0, 4,
+                            divergence=2)
+        self.assertEqual(DIVERGED, result.reason)
+        self.assertEqual(3, result.epochs)
+        result = supervised(Scripted([0.5, math.nan]), [], 0.1, 0, 2,
+                            divergence=2)
+        self.assertEqual(DIVERGED, result.reason)
+
+    def testRestore(self):
+        net = Net(InputLayer(1, 1, iweights=0), OutputLayer(1))
+        algo = Scripted([0.5, 0.2, 0.3, 0.4], net)
+        result = supervised(algo, [], 0.1, 0, 4, restore=True)
+        self.assertEqual((False, 0.2), result)
+        self.assertTrue(result.restored)
+        self.assertEqual(0.2, net.layers()[0].weightsTo(0)[0])
+        self.assertEqual(1, net.version())
+
+    def testValidation(self):
+        # the training error keeps improving, the validation does not
+        validation = Validation([0.5, 0.3, 0.4, 0.45])
+        result = supervised(Scripted([0.9 - i/10 for i in range(8)]), [],
+                            0.1, 0, 8, patience=4, every=2,
+                            validation=validation)
+        self.assertEqual(PLATEAU, result.reason)
+        self.assertEqual(8, result.epochs)
+        self.assertEqual(4, validation.calls)
+        self.assertAlmostEqual(0.3, result.best)
+        self.assertAlmostEqual(0.45, result.validation.error())
+
+    def testValidationRestore(self):
+        net = Net(InputLayer(1, 1, iweights=0), OutputLayer(1))
+        result = supervised(Scripted([0.5, 0.4, 0.3], net), [], 0.1, 0, 3,
+                            restore=True, validation=Validation([1, 2, 3]))
+        self.assertTrue(result.restored)
+        self.assertEqual((False, 0.5), result)
+        self.assertAlmostEqual(1, result.validation.error())
+        self.assertEqual(0.5, net.layers()[0].weightsTo(0)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
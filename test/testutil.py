@@ -1,6 +1,7 @@
 import unittest
 
 from ghugh.util import compose, _Cursor, _Transposed, transposed
+from ghugh.util import LRUCache, digest, Matrix, nbytes
 
 class TestCompose(unittest.TestCase):
         
@@ -74,5 +75,73 @@ class TestTransposed(unittest.TestCase):
                 self.assertEqual(c, tt[i][j])
 
 
+class TestLRUCache(unittest.TestCase):
+
+    def testEviction(self):
+        c = LRUCache(2)
+        c.put("a", 1)
+        c.put("b", 2)
+        self.assertEqual(1, c.get("a"))
+        c.put("c", 3)
+        self.assertEqual(None, c.get("b"))
+        self.assertEqual(1, c.get("a"))
+        self.assertEqual(3, c.get("c"))
+        self.assertEqual(2, len(c))
+        self.assertEqual(3, c.hits)
+        self.assertEqual(1, c.misses)
+
+    def testDigest(self):
+        self.assertEqual(digest([1, 0, 1]), digest((1.0, 0.0, 1.0)))
+        self.assertNotEqual(digest([1, 0, 1]), digest([1, 1, 0]))
+        self.assertEqual(16, len(digest([1, 0, 1])))
+
+
+class TestMatrix(unittest.TestCase):
+    def setUp(self):
+        self.m = Matrix([[1, 2, 3],
+                         [4, 5, 6]])
+
+    def testViews(self):
+        self.assertEqual((2, 3), self.m.shape)
+        self.assertEqual([[1, 2, 3], [4, 5, 6]], self.m)
+        self.m[0][1] = 7
+        self.assertEqual([7, 5], list(self.m.column(1)))
+        self.m.column(2)[1] = 8
+        self.assertEqual([4, 5, 8], list(self.m[1]))
+        self.assertEqual([1, 7, 3, 4, 5, 8], list(self.m.data()))
+
+    def testTransposed(self):
+        t = transposed(self.m)
+        self.assertEqual(3, len(t))
+        self.assertEqual([3, 6], list(t[2]))
+        t[0][1] = 9
+        self.assertEqual(9, self.m[1][0])
+
+    def testHelpers(self):
+        self.assertEqual([14, 32], self.m.dot([1, 2, 3]))
+        self.assertEqual([9, 12, 15], self.m.tdot([1, 2]))
+        self.m.axpy(2, Matrix([[1, 0, 0], [0, 0, 1]]))
+        self.assertEqual([[3, 2, 3], [4, 5, 8]], self.m)
+        self.m.fill(0.5)
+        self.assertEqual([[0.5] * 3] * 2, self.m)
+        self.assertRaises(ValueError, self.m.axpy, 1, Matrix([[1]]))
+
+    def testZeros(self):
+        self.assertEqual([[0, 0]] * 3, Matrix.zeros(3, 2))
+        self.assertEqual(0, len(transposed(Matrix([]))))
+        self.assertRaises(ValueError, Matrix, [[1, 2], [3]])
+
+    def testEquality(self):
+        self.assertNotEqual([[1, 2, 3]], self.m)
+        self.assertNotEqual([[1, 2, 3], [4, 5]], self.m)
+        self.assertEqual(Matrix([[1, 2, 3], [4, 5, 6]]), self.m)
+
+    def testNBytes(self):
+        self.assertEqual(0, nbytes(None))
+        self.assertEqual(6 * 8, nbytes(self.m))
+        self.assertGreater(nbytes([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]),
+                           nbytes(self.m))
+
+
 if __name__ == "__main__":
     unittest.main()